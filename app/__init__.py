@@ -1,6 +1,6 @@
 from flask import Flask
 from config import config_by_name
-from .extensions import db, migrate, jwt
+from .extensions import db, migrate, jwt, configure_sqlite
 
 # 1. TAMBAHKAN IMPORT INI
 from flask_cors import CORS 
@@ -11,10 +11,19 @@ def create_app(config_name):
 
     # 2. AKTIFKAN CORS DI SINI
     # Ini mengizinkan semua domain (*) mengakses API. Aman untuk development.
-    CORS(app, resources={r"/*": {"origins": "*"}})
+    # Header cursor pagination & ETag struk perlu di-expose agar terbaca oleh browser.
+    CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=['X-Next-Cursor', 'ETag'])
+
+    # Metrik per endpoint (latensi, SQL, tunggu pool) -> /admin/metrics.
+    # Sebelum db.init_app karena memasang pool koneksi bertimer.
+    from app.services.metrics import metrics
+    metrics.init_app(app)
 
     db.init_app(app)
     migrate.init_app(app, db)
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        with app.app_context():
+            configure_sqlite(db.engine)
     jwt.init_app(app)
 
     from app import models
@@ -31,6 +40,17 @@ def create_app(config_name):
     from app.modules.production.routes import production_bp
     app.register_blueprint(production_bp)
 
+    from app.modules.events import events_bp
+    app.register_blueprint(events_bp)
+
+    from app.commands import register_commands
+    register_commands(app)
+
+    # Panaskan cache resep (BOM) agar transaksi pertama tidak membaca tabel recipes
+    from app.services.bom_cache import bom_cache
+    with app.app_context():
+        bom_cache.warm()
+
     @app.route('/')
     def hello():
         return "Mini-ERP Backend is Running!"
@@ -0,0 +1,74 @@
+import click
+from flask import Flask
+
+# =====================================================
+# PERINTAH CLI PERAWATAN (flask <perintah>)
+# =====================================================
+
+def register_commands(app: Flask):
+    @app.cli.command('purge-idempotency')
+    @click.option('--batch-size', default=1000, show_default=True, help='Jumlah baris per DELETE.')
+    def purge_idempotency(batch_size):
+        """Hapus Idempotency-Key yang sudah kedaluwarsa (jalankan via cron)."""
+        from app.services.idempotency import purge_expired
+        total = purge_expired(batch_size)
+        click.echo(f'{total} idempotency key kedaluwarsa dihapus.')
+
+    @app.cli.command('prune-cache-versions')
+    def prune_cache_versions():
+        """Buang baris cache_invalidations lama (sisakan yang terbaru per nama)."""
+        from app.services.cache_version import prune
+        click.echo(f'{prune()} baris cache_invalidations dihapus.')
+
+    @app.cli.command('purge-events')
+    @click.option('--days', default=1, show_default=True, help='Simpan event n hari terakhir.')
+    def purge_events(days):
+        """Hapus event SSE lama (resume Last-Event-ID hanya butuh yang baru)."""
+        from app.services.events import purge_older_than
+        click.echo(f'{purge_older_than(days)} event lama dihapus.')
+
+    @app.cli.command('snapshot-stock')
+    @click.option('--keep', default=400, show_default=True, help='Jumlah snapshot terbaru yang disimpan.')
+    def snapshot_stock(keep):
+        """Foto stok & avg_cost semua bahan (jalankan harian via cron saat toko tutup)."""
+        from app.services import stock_snapshot
+        snapshot = stock_snapshot.take()
+        pruned = stock_snapshot.prune(keep)
+        click.echo(f'Snapshot stok #{snapshot.id} ({snapshot.taken_at:%Y-%m-%d %H:%M:%S}) disimpan, '
+                   f'{pruned} snapshot lama dihapus.')
+
+    @app.cli.command('archive-orders')
+    @click.option('--keep-days', default=None, type=int, help='Hari terakhir yang tetap di tabel panas (default ARCHIVE_KEEP_DAYS).')
+    @click.option('--batch-size', default=1000, show_default=True, help='Jumlah order/log per commit.')
+    def archive_orders(keep_days, batch_size):
+        """Pindahkan order, item & inventory log periode tertutup ke tabel arsip."""
+        from app.services import archive
+        keep_days = keep_days if keep_days is not None else app.config['ARCHIVE_KEEP_DAYS']
+        archive_run, (orders, items, logs) = archive.run(archive.default_before(keep_days), batch_size)
+        cutoff = archive_run.cutoff if archive_run else f'{archive.cutoff()} (tidak berubah)'
+        click.echo(f'Arsip s/d {cutoff}: {orders} order, {items} item, {logs} log dipindahkan.')
+
+    @app.cli.command('rebuild-sales-rollup')
+    @click.option('--from', 'start', default=None, type=click.DateTime(formats=['%Y-%m-%d']), help='Hari awal (default: semua).')
+    @click.option('--to', 'end', default=None, type=click.DateTime(formats=['%Y-%m-%d']), help='Hari akhir, inklusif (default: semua).')
+    def rebuild_sales_rollup(start, end):
+        """Hitung ulang daily_sales_rollup dari orders + orders_archive (backfill / perbaikan)."""
+        from datetime import timedelta
+        from app.extensions import db
+        from app.services import sales_rollup
+        from app.services.cache_version import bump
+        from app.services.response_cache import ORDERS_TAG
+        total = sales_rollup.rebuild(start.date() if start else None,
+                                     end.date() + timedelta(days=1) if end else None)
+        bump(ORDERS_TAG) # Dashboard & laporan yang di-cache dihitung ulang
+        db.session.commit()
+        click.echo(f'{total} baris rollup (hari x metode bayar) ditulis ulang.')
+
+    @app.cli.command('reset-metrics')
+    def reset_metrics():
+        """Kosongkan file metrik semua worker (jalankan saat worker berhenti, mis. deploy)."""
+        from app.services.metrics import metrics
+        if not app.config.get('METRICS_ENABLED', True):
+            click.echo('Metrik tidak aktif (METRICS_ENABLED=0).')
+            return
+        click.echo(f'{metrics.reset()} file metrik worker dihapus.')
@@ -1,6 +1,7 @@
+import hashlib
 from functools import wraps
-from flask import jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from flask import jsonify, request, make_response
+from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_identity
 
 # Decorator Khusus ADMIN
 def admin_required():
@@ -39,4 +40,87 @@ def kitchen_required():
                 return jsonify({'message': 'Akses Ditolak! Hanya Staff Dapur.'}), 403
             return fn(*args, **kwargs)
         return decorator
-    return wrapper
\ No newline at end of file
+    return wrapper
+# Decorator Semua STAFF (Admin/Kasir/Dapur)
+def staff_required():
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            verify_jwt_in_request()
+            claims = get_jwt()
+            if claims.get('role') not in ['admin', 'cashier', 'kitchen']:
+                return jsonify({'message': 'Akses Ditolak! Hanya Staff.'}), 403
+            return fn(*args, **kwargs)
+        return decorator
+    return wrapper
+
+# Decorator IDEMPOTENCY-KEY (pasang DI BAWAH decorator role)
+# Retry dengan header & body yang sama mendapat respons tersimpan tanpa menjalankan ulang route.
+def idempotent():
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            key = request.headers.get('Idempotency-Key')
+            if not key:
+                return fn(*args, **kwargs)
+            if len(key) > 100:
+                return jsonify({'message': 'Idempotency-Key maksimal 100 karakter.'}), 400
+
+            from app.services.idempotency import idempotency_store, IdempotencyConflict, IdempotencyMismatch
+            user_id = int(get_jwt_identity())
+            request_hash = hashlib.sha256(request.get_data()).hexdigest()
+            try:
+                started = idempotency_store.begin(user_id, key, request.endpoint, request_hash)
+            except IdempotencyMismatch as e:
+                return jsonify({'message': str(e)}), 422
+            except IdempotencyConflict as e:
+                return jsonify({'message': str(e)}), 409
+
+            if isinstance(started, tuple):
+                _, _, status_code, body = started
+                response = make_response(body, status_code)
+                response.mimetype = 'application/json'
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+
+            try:
+                response = make_response(fn(*args, **kwargs))
+            except Exception:
+                idempotency_store.abandon(started, user_id, key, request.endpoint, request_hash)
+                raise
+            if 200 <= response.status_code < 300:
+                idempotency_store.complete(started, user_id, key, request.endpoint, request_hash,
+                                           response.status_code, response.get_data(as_text=True))
+            else:
+                idempotency_store.abandon(started, user_id, key, request.endpoint, request_hash,
+                                          response.status_code, response.get_data(as_text=True))
+            return response
+        return decorator
+    return wrapper
+
+# Decorator ANGGARAN QUERY (pasang DI BAWAH @route)
+# Batas statement SQL per request (jalur dingin, cache in-process kosong).
+# Tidak ada biaya saat runtime: angka ini dibaca & diuji oleh
+# `python -m benchmarks.check_query_budgets` (gagal jika melebihi anggaran
+# atau jumlah query ikut naik bersama jumlah baris = pola N+1).
+def query_budget(max_queries):
+    def wrapper(fn):
+        fn.query_budget = max_queries
+        return fn
+    return wrapper
+
+# Decorator CACHE RESPON (pasang DI BAWAH decorator role)
+# Respons 200 disimpan per URL & dibuang otomatis saat salah satu tag-nya
+# di-bump oleh route tulis (lihat services.response_cache). Hanya untuk
+# respons yang isinya sama untuk semua user yang lolos decorator role.
+# ttl (detik) opsional untuk data yang ikut berubah karena waktu (mis. "hari ini").
+# per_day=True: hari bisnis (WIB) ikut jadi kunci, untuk respons yang rentangnya
+# berakhir "hari ini" (mis. laporan Semua Waktu) agar tidak basi lewat tengah malam.
+def cached_response(*tags, ttl=None, per_day=False):
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            from app.services.response_cache import response_cache
+            return response_cache.serve(tags, ttl, lambda: fn(*args, **kwargs), per_day)
+        return decorator
+    return wrapper
@@ -4,4 +4,22 @@ from flask_jwt_extended import JWTManager  # <--- Tambahan
 
 db = SQLAlchemy()
 migrate = Migrate()
-jwt = JWTManager()  # <--- Tambahan
\ No newline at end of file
+jwt = JWTManager()  # <--- Tambahan
+
+def configure_sqlite(engine):
+    """
+    Khusus SQLite (benchmark & pengecekan lokal):
+    - WAL agar transaksi baca tidak memblokir koneksi lain yang menulis;
+    - resep resmi SQLAlchemy untuk pysqlite: SQLAlchemy yang mengirim BEGIN
+      agar SAVEPOINT (db.session.begin_nested) berjalan benar.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+    @event.listens_for(engine, "begin")
+    def do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
@@ -1,5 +1,6 @@
 from app.extensions import db
 from datetime import datetime, timedelta  # <--- Tambahkan timedelta
+from app.services.business_time import now as storage_now
 
 
 
@@ -55,6 +56,11 @@ class Ingredient(db.Model):
 
     current_stock = db.Column(db.Numeric(10, 2), default=0) # Disimpan dalam 'unit' (gr/ml)
     avg_cost = db.Column(db.Numeric(15, 2), default=0) # Harga per 'unit' (per gram)
+
+    # 4. BATAS PESAN ULANG (dalam 'unit'). is_low dirawat oleh services.stock
+    # di setiap UPDATE stok: current_stock < reorder_point.
+    reorder_point = db.Column(db.Numeric(10, 2), default=5, server_default='5')
+    is_low = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False, index=True)
     
     updated_at = db.Column(db.DateTime, default=get_wib_now, onupdate=get_wib_now)
     logs = db.relationship('InventoryLog', backref='ingredient', lazy=True)
@@ -88,7 +94,18 @@ class InventoryLog(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     change_type = db.Column(db.Enum('purchase', 'production', 'waste', 'adjustment'), nullable=False)
     quantity_change = db.Column(db.Numeric(10, 2), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Harga beli per satuan dasar (khusus 'purchase'): cukup untuk memutar ulang avg_cost
+    unit_cost = db.Column(db.Numeric(15, 4), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class StockSnapshot(db.Model):
+    __tablename__ = 'stock_snapshots'
+
+    # Foto stok berkala, 1 baris ringkas: JSON {ingredient_id: [qty, avg_cost]}.
+    # Stok per tanggal = snapshot terdekat + mutasi inventory_logs sesudahnya.
+    id = db.Column(db.Integer, primary_key=True)
+    taken_at = db.Column(db.DateTime, nullable=False, index=True)
+    items = db.Column(db.Text, nullable=False)
 
 # ==========================================
 # 3. MODUL SALES (SHIFT & TRANSAKSI)
@@ -98,7 +115,7 @@ class SalesSession(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    start_time = db.Column(db.DateTime, default=datetime.utcnow)
+    start_time = db.Column(db.DateTime, default=storage_now) # waktu tersimpan (services.business_time)
     end_time = db.Column(db.DateTime, nullable=True) 
     
     start_cash = db.Column(db.Numeric(15, 2), default=0) 
@@ -127,9 +144,19 @@ class Order(db.Model):
     # Tambahkan 'pending' ke dalam Enum
     payment_method = db.Column(db.Enum('cash', 'qris', 'transfer', 'pending'), default='pending')
     customer_name = db.Column(db.String(100), default='Pelanggan Umum')
-    transaction_date = db.Column(db.DateTime, default=datetime.utcnow)
+    transaction_date = db.Column(db.DateTime, default=storage_now) # waktu tersimpan (services.business_time)
 
     items = db.relationship('OrderItem', backref='order', lazy=True)
+
+    __table_args__ = (
+        # Open bill (payment_method='pending') terbaru-dulu, keyset (tanggal, id)
+        db.Index('ix_orders_payment_date', 'payment_method', 'transaction_date'),
+        # Riwayat order: urutan global & per filter, semua berakhiran transaction_date
+        db.Index('ix_orders_transaction_date', 'transaction_date'),
+        db.Index('ix_orders_status_date', 'status', 'transaction_date'),
+        db.Index('ix_orders_session_date', 'session_id', 'transaction_date'),
+        db.Index('ix_orders_user_date', 'user_id', 'transaction_date'),
+    )
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
 
@@ -142,6 +169,149 @@ class OrderItem(db.Model):
 
     product = db.relationship('Product')
 
+class OrderConsumption(db.Model):
+    __tablename__ = 'order_consumptions'
+
+    # Bahan yang benar-benar dipotong saat order dibuat (resep saat itu),
+    # 1 baris ringkas per order: JSON {ingredient_id: qty}. Dipakai void/hapus.
+    order_id = db.Column(db.Integer, primary_key=True) # Tanpa FK: ikut dihapus manual saat hard delete
+    movements = db.Column(db.Text, nullable=False)
+
+class ShiftLedger(db.Model):
+    __tablename__ = 'shift_ledger'
+
+    # Buku besar shift (append-only): total shift = SUM(amount) per sesi.
+    # entry_type: 'sale', 'payment' (pelunasan open bill), 'void', 'delete', 'legacy'
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('sales_sessions.id'), nullable=False)
+    order_id = db.Column(db.Integer, nullable=True) # Tanpa FK: order bisa dihapus permanen
+    payment_method = db.Column(db.String(20), nullable=False)
+    amount = db.Column(db.Numeric(15, 2), nullable=False)
+    entry_type = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_shift_ledger_session_method', 'session_id', 'payment_method'),
+    )
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+
+    # Header 'Idempotency-Key' per user. response_body NULL = masih diproses.
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    key = db.Column(db.String(100), nullable=False)
+    endpoint = db.Column(db.String(100), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=True) # sha256 body; NULL = baris lama, tidak dicek
+    status_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_user_key'),
+    )
+
+class Event(db.Model):
+    __tablename__ = 'events'
+
+    # Outbox event real-time (SSE). id = Last-Event-ID untuk resume stream.
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(30), nullable=False)
+    payload = db.Column(db.Text, nullable=False) # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class CacheInvalidation(db.Model):
+    __tablename__ = 'cache_invalidations'
+
+    # Append-only: tiap baris = 1 sinyal "cache <name> basi" untuk semua worker.
+    # Versi cache = MAX(id) per name (insert saja, tidak ada baris panas).
+    # Baris lama (id < MAX per name) dibuang berkala oleh poll services.cache_version.
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_cache_invalidations_name_id', 'name', 'id'),
+    )
+
+class InvoiceSequence(db.Model):
+    __tablename__ = 'invoice_sequences'
+
+    # Nomor urut invoice per hari ('YYYYMMDD'). Dibagikan per blok ke tiap worker.
+    day = db.Column(db.String(8), primary_key=True)
+    next_value = db.Column(db.Integer, nullable=False, default=1)
+
+class DailySalesRollup(db.Model):
+    __tablename__ = 'daily_sales_rollup'
+
+    # Agregat penjualan per hari & metode bayar (tetap di DB panas walau
+    # order hari itu sudah diarsipkan). revenue/trx_count/cogs hanya order
+    # lunas & tidak batal; void_* = order berstatus 'cancelled'.
+    # Dirawat di transaksi order/pelunasan/void/hapus (services.sales_rollup).
+    day = db.Column(db.Date, primary_key=True)
+    payment_method = db.Column(db.String(20), primary_key=True)
+    revenue = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    trx_count = db.Column(db.Integer, nullable=False, default=0)
+    cogs = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    void_count = db.Column(db.Integer, nullable=False, default=0)
+    void_amount = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+
+# ==========================================
+# 3.B. ARSIP (DATA DINGIN, PERIODE TERTUTUP)
+# ==========================================
+# Salinan kolom tabel panas tanpa FK. Di MySQL disimpan ROW_FORMAT=COMPRESSED.
+class ArchiveRun(db.Model):
+    __tablename__ = 'archive_runs'
+
+    # Semua order/log dengan tanggal < cutoff sudah pindah ke tabel *_archive
+    id = db.Column(db.Integer, primary_key=True)
+    cutoff = db.Column(db.Date, nullable=False, index=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    order_items = db.Column(db.Integer, nullable=False, default=0)
+    inventory_logs = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class OrderArchive(db.Model):
+    __tablename__ = 'orders_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    invoice_no = db.Column(db.String(50), nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    session_id = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(20))
+    total_amount = db.Column(db.Numeric(15, 2), nullable=False)
+    payment_method = db.Column(db.String(20))
+    customer_name = db.Column(db.String(100))
+    transaction_date = db.Column(db.DateTime, index=True)
+
+    __table_args__ = {'mysql_row_format': 'COMPRESSED'}
+
+class OrderItemArchive(db.Model):
+    __tablename__ = 'order_items_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, nullable=False, index=True)
+    product_id = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    price_at_sale = db.Column(db.Numeric(15, 2), nullable=False)
+    cogs_at_sale = db.Column(db.Numeric(15, 2), nullable=False)
+
+    __table_args__ = {'mysql_row_format': 'COMPRESSED'}
+
+class InventoryLogArchive(db.Model):
+    __tablename__ = 'inventory_logs_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    ingredient_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer)
+    change_type = db.Column(db.String(20), nullable=False)
+    quantity_change = db.Column(db.Numeric(10, 2), nullable=False)
+    unit_cost = db.Column(db.Numeric(15, 4), nullable=True)
+    created_at = db.Column(db.DateTime, index=True)
+
+    __table_args__ = {'mysql_row_format': 'COMPRESSED'}
+
 # ==========================================
 # 4. MODUL ACCOUNTING (BIAYA LAIN)
 # ==========================================
@@ -6,4 +6,5 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 from . import user_routes
 from . import master_routes
 from . import dashboard_routes
-from . import report_routes
\ No newline at end of file
+from . import report_routes
+from . import metrics_routes
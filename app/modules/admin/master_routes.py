@@ -1,7 +1,12 @@
 from flask import request, jsonify
 from app.extensions import db  
 from app.models import Ingredient, Product, Recipe
-from app.decorators import admin_required
+from app.decorators import admin_required, query_budget, cached_response
+from app.services.bom_cache import bom_cache, BOM_VERSION
+from app.services.cache_version import bump
+from app.services.search_index import CATALOG_VERSION
+from app.services.response_cache import INGREDIENTS_TAG, PRODUCTS_TAG, RECIPES_TAG
+from app.services import stock
 from . import admin_bp
 
 # =====================================================
@@ -25,14 +30,19 @@ def create_ingredient():
         purchase_unit=data.get('purchase_unit', data['unit']),   # Satuan Beli (Karung)
         conversion_rate=data.get('conversion_rate', 1),          # 1 Karung = X Gram
         current_stock=0,
-        avg_cost=0
+        avg_cost=0,
+        reorder_point=data.get('reorder_point', 5),              # Batas stok menipis (satuan dasar)
+        is_low=float(data.get('reorder_point', 5)) > 0           # Stok awal 0
     )
     db.session.add(new_ing)
+    bump(CATALOG_VERSION, INGREDIENTS_TAG)
     db.session.commit()
     return jsonify({'message': 'Bahan baku berhasil ditambahkan', 'id': new_ing.id}), 201
 
 @admin_bp.route('/ingredients', methods=['GET'])
+@query_budget(4)
 @admin_required()
+@cached_response(INGREDIENTS_TAG)
 def get_ingredients():
     items = Ingredient.query.order_by(Ingredient.name).all()
     return jsonify([{
@@ -43,7 +53,9 @@ def get_ingredients():
         'purchase_unit': i.purchase_unit or i.unit, 
         'conversion_rate': float(i.conversion_rate or 1), 
         'stock': float(i.current_stock or 0), 
-        'avg_cost': float(i.avg_cost or 0)
+        'avg_cost': float(i.avg_cost or 0),
+        'reorder_point': float(i.reorder_point or 0),
+        'is_low': i.is_low
     } for i in items]), 200
 
 @admin_bp.route('/ingredients/<int:id>', methods=['PUT'])
@@ -56,6 +68,9 @@ def update_ingredient(id):
     if 'unit' in data: ing.unit = data['unit']
     if 'purchase_unit' in data: ing.purchase_unit = data['purchase_unit']
     if 'conversion_rate' in data: ing.conversion_rate = data['conversion_rate']
+    if 'reorder_point' in data: stock.set_reorder_point(ing.id, data['reorder_point']) # is_low ikut dihitung ulang
+    if 'name' in data: bump(CATALOG_VERSION) # Index pencarian dimuat ulang
+    bump(INGREDIENTS_TAG) # Cache respon daftar & stok bahan
     
     db.session.commit()
     return jsonify({'message': 'Bahan diperbarui'}), 200
@@ -68,6 +83,7 @@ def delete_ingredient(id):
     if Recipe.query.filter_by(ingredient_id=id).first():
         return jsonify({'message': 'Gagal! Bahan ini dipakai di sebuah Resep.'}), 400
     db.session.delete(ing)
+    bump(CATALOG_VERSION, INGREDIENTS_TAG)
     db.session.commit()
     return jsonify({'message': 'Bahan dihapus'}), 200
 # =====================================================
@@ -88,10 +104,12 @@ def create_product():
         is_active=True
     )
     db.session.add(new_prod)
+    bump(CATALOG_VERSION, PRODUCTS_TAG)
     db.session.commit()
     return jsonify({'message': f"Menu '{new_prod.name}' siap dijual!", 'id': new_prod.id}), 201
 
 @admin_bp.route('/products', methods=['GET'])
+@query_budget(3)
 @admin_required()
 def get_products():
     products = Product.query.all()
@@ -115,6 +133,7 @@ def update_product(id):
     if 'price' in data: prod.price = data['price']
     if 'category' in data: prod.category = data['category']
     if 'is_active' in data: prod.is_active = data['is_active']
+    bump(BOM_VERSION, CATALOG_VERSION, PRODUCTS_TAG)
     db.session.commit()
     return jsonify({'message': 'Data menu diperbarui', 'name': prod.name}), 200
 
@@ -123,6 +142,7 @@ def update_product(id):
 def delete_product(id):
     prod = Product.query.get_or_404(id)
     db.session.delete(prod)
+    bump(BOM_VERSION, CATALOG_VERSION, PRODUCTS_TAG)
     db.session.commit()
     return jsonify({'message': 'Menu dihapus permanen'}), 200
 
@@ -150,6 +170,7 @@ def add_recipe_item():
         quantity_needed=data['quantity_needed']
     )
     db.session.add(new_recipe)
+    bump(BOM_VERSION, RECIPES_TAG)
     db.session.commit()
     
     return jsonify({
@@ -158,19 +179,27 @@ def add_recipe_item():
     }), 201
 
 @admin_bp.route('/recipes/<int:product_id>', methods=['GET'])
+@query_budget(6)
 @admin_required()
 def get_product_recipe(product_id):
     product = Product.query.get_or_404(product_id)
-    recipes = Recipe.query.filter_by(product_id=product_id).all()
+    bom = bom_cache.get(product_id)
+
+    # Nama & satuan bahan diambil sekaligus (bukan lazy-load per baris)
+    ingredients = {}
+    if bom:
+        ingredient_ids = {line.ingredient_id for line in bom}
+        ingredients = {i.id: i for i in Ingredient.query.filter(Ingredient.id.in_(ingredient_ids)).all()}
     
     recipe_list = []
-    for r in recipes:
+    for line in bom:
+        ingredient = ingredients[line.ingredient_id]
         recipe_list.append({
-            'recipe_id': r.id,
-            'ingredient_id': r.ingredient.id,
-            'ingredient_name': r.ingredient.name,
-            'quantity': float(r.quantity_needed),
-            'unit': r.ingredient.unit
+            'recipe_id': line.recipe_id,
+            'ingredient_id': ingredient.id,
+            'ingredient_name': ingredient.name,
+            'quantity': float(line.quantity_needed),
+            'unit': ingredient.unit
         })
         
     return jsonify({
@@ -183,5 +212,6 @@ def get_product_recipe(product_id):
 def delete_recipe_item(recipe_id):
     item = Recipe.query.get_or_404(recipe_id)
     db.session.delete(item)
+    bump(BOM_VERSION, RECIPES_TAG)
     db.session.commit()
     return jsonify({'message': 'Item resep dihapus'}), 200
\ No newline at end of file
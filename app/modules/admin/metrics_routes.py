@@ -0,0 +1,18 @@
+from flask import jsonify, current_app, Response
+from app.decorators import admin_required
+from app.services.metrics import metrics
+from . import admin_bp
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# =====================================================
+# METRIK PROMETHEUS (GABUNGAN SEMUA WORKER)
+# =====================================================
+# Scrape dengan bearer token admin. Angka worker lain paling lambat
+# METRICS_FLUSH_SECONDS di belakang; worker yang melayani scrape selalu terkini.
+@admin_bp.route('/metrics', methods=['GET'])
+@admin_required()
+def prometheus_metrics():
+    if not current_app.config.get('METRICS_ENABLED', True):
+        return jsonify({'message': 'Metrik tidak aktif (METRICS_ENABLED=0).'}), 404
+    return Response(metrics.render(), mimetype=None, content_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,17 +1,42 @@
 from flask import request, jsonify
 from sqlalchemy import func
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 from app.extensions import db
 from app.models import Ingredient, Order, OrderItem, OperationalExpense
-from app.decorators import admin_required
+from app.decorators import admin_required, query_budget, cached_response
+from app.services import stock_snapshot, archive, sales_rollup, sales_report, business_time
+from app.services.cache_version import bump
+from app.services.response_cache import ORDERS_TAG, INGREDIENTS_TAG, EXPENSES_TAG
 from . import admin_bp
 
+GRANULARITY_TITLES = {'hour': 'per Jam', 'day': 'Harian', 'week': 'Mingguan', 'month': 'Bulanan'}
+
 # =====================================================
 # 1. LAPORAN STOK (Asset Value) - TIDAK ADA PERUBAHAN (SUDAH BENAR)
 # =====================================================
+# ?as_of=2026-10-01 (akhir hari itu) atau ?as_of=2026-10-01T08:00 = stok & nilai
+# pada waktu tsb: snapshot terdekat + mutasi sesudahnya (services.stock_snapshot)
+def _parse_as_of(value):
+    for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return datetime.combine(datetime.strptime(value, '%Y-%m-%d'), time.max)
+
+
 @admin_bp.route('/reports/stock', methods=['GET'])
 @admin_required()
+@cached_response(INGREDIENTS_TAG)
 def report_stock():
+    as_of_str = request.args.get('as_of')
+    if as_of_str:
+        try:
+            as_of = _parse_as_of(as_of_str)
+        except ValueError:
+            return jsonify({'message': 'Format as_of harus YYYY-MM-DD atau YYYY-MM-DDTHH:MM'}), 400
+        return _report_stock_as_of(as_of)
+
     items = Ingredient.query.all()
     output = []
     total_asset_value = 0
@@ -30,7 +55,38 @@ def report_stock():
         
     return jsonify({
         'title': 'Laporan Nilai Aset Stok',
-        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M'),
+        'generated_at': datetime.now(business_time.business_tz()).strftime('%Y-%m-%d %H:%M'),
+        'total_asset_value': total_asset_value,
+        'items': output
+    }), 200
+
+
+def _report_stock_as_of(as_of):
+    # as_of = waktu WIB, inventory_logs & snapshot stok ber-created_at UTC
+    state, snapshot_at, replayed = stock_snapshot.as_of(business_time.to_utc(as_of))
+    ingredients = db.session.query(Ingredient.id, Ingredient.name, Ingredient.unit)\
+        .filter(Ingredient.id.in_(state.keys())).order_by(Ingredient.name).all() if state else []
+
+    output = []
+    total_asset_value = 0
+    for ingredient_id, name, unit in ingredients:
+        qty, avg_cost = state[ingredient_id]
+        asset_value = float(qty) * float(avg_cost)
+        total_asset_value += asset_value
+        output.append({
+            'name': name,
+            'unit': unit,
+            'current_stock': float(qty),
+            'avg_cost': float(avg_cost),
+            'total_value': asset_value
+        })
+
+    return jsonify({
+        'title': 'Laporan Nilai Aset Stok',
+        'as_of': as_of.strftime('%Y-%m-%d %H:%M:%S'),
+        'snapshot_at': business_time.from_utc(snapshot_at).strftime('%Y-%m-%d %H:%M:%S') if snapshot_at else None,
+        'replayed_movements': replayed,
+        'generated_at': datetime.now(business_time.business_tz()).strftime('%Y-%m-%d %H:%M'),
         'total_asset_value': total_asset_value,
         'items': output
     }), 200
@@ -39,62 +95,52 @@ def report_stock():
 # 2. LAPORAN PENJUALAN (Sales Recap) - LOGIC FIX (WIB)
 # =====================================================
 @admin_bp.route('/reports/sales', methods=['GET'])
+@query_budget(5)
 @admin_required()
+@cached_response(ORDERS_TAG, per_day=True) # Semua Waktu berakhir di hari ini (WIB)
 def report_sales():
+    # ?granularity=hour|day|week|month (default day), start_date/end_date = hari WIB (inklusif)
+    granularity = request.args.get('granularity', 'day')
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date')
-    
-    query = db.session.query(
-        func.date(Order.transaction_date).label('date'),
-        func.count(Order.id).label('total_trx'),
-        func.sum(Order.total_amount).label('total_revenue')
-    )
 
-    # 1. FILTER STATUS VALID (Hanya Lunas & Tidak Batal)
-    query = query.filter(Order.status != 'cancelled')
-    query = query.filter(Order.payment_method != 'pending')
+    try:
+        if start_date_str and end_date_str:
+            start_day = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+            end_day = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        else:
+            # Semua Waktu: hari penjualan pertama s/d hari ini (WIB)
+            end_day = business_time.today()
+            start_day = sales_report.first_day() or end_day
+        series = sales_report.build(start_day, end_day, granularity)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
-    # 2. FILTER TANGGAL (WIB RANGE 00:00 - 23:59)
-    # Ini kuncinya agar data hari ini terbaca
-    if start_date_str and end_date_str:
-        # Konversi string ke object Date
-        start_date_obj = datetime.strptime(start_date_str, '%Y-%m-%d')
-        end_date_obj = datetime.strptime(end_date_str, '%Y-%m-%d')
-        
-        # Buat Range Jam Lengkap (WIB)
-        start_full = datetime.combine(start_date_obj, time.min) # 00:00:00
-        end_full = datetime.combine(end_date_obj, time.max)     # 23:59:59
-        
-        # Filter berdasarkan kolom DateTime langsung (Lebih Akurat)
-        query = query.filter(Order.transaction_date >= start_full)
-        query = query.filter(Order.transaction_date <= end_full)
-        
-    # Grouping tetap by Date untuk grafik
-    sales_data = query.group_by(func.date(Order.transaction_date)).all()
-    
-    output = []
-    grand_total = 0
-    
-    for row in sales_data:
-        grand_total += float(row.total_revenue)
-        output.append({
-            'date': row.date.strftime('%Y-%m-%d'),
-            'total_transactions': row.total_trx,
-            'revenue': float(row.total_revenue)
-        })
-        
-    return jsonify({
-        'title': 'Laporan Penjualan Harian',
-        'period': f"{start_date_str} s/d {end_date_str}" if start_date_str else "Semua Waktu",
-        'grand_total_revenue': grand_total,
-        'daily_data': output
-    }), 200
+    grand_total = sum(row['revenue'] for row in series)
+    response = {
+        'title': f"Laporan Penjualan {GRANULARITY_TITLES.get(granularity, '')}".strip(),
+        'period': f"{start_date_str} s/d {end_date_str}" if start_date_str and end_date_str else "Semua Waktu",
+        'granularity': granularity,
+        'timezone': business_time.business_tz().key,
+        'grand_total_revenue': float(grand_total),
+        'grand_total_transactions': sum(row['total_transactions'] for row in series),
+        'series': [{**row, 'revenue': float(row['revenue'])} for row in series]
+    }
+    if granularity == 'day':
+        # Kontrak lama (klien dashboard yang ada): hanya hari yang ada transaksinya, kunci 'date'
+        response['daily_data'] = [{
+            'date': row['period'],
+            'total_transactions': row['total_transactions'],
+            'revenue': float(row['revenue'])
+        } for row in series if row['total_transactions']]
+    return jsonify(response), 200
 
 # =====================================================
 # 3. LAPORAN LABA RUGI (Profit & Loss) - LOGIC FIX (WIB)
 # =====================================================
 @admin_bp.route('/reports/profit-loss', methods=['GET'])
 @admin_required()
+@cached_response(ORDERS_TAG, EXPENSES_TAG, per_day=True)
 def report_profit_loss():
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date')
@@ -109,8 +155,25 @@ def report_profit_loss():
         start_d_obj = datetime.strptime(start_date_str, '%Y-%m-%d')
         end_d_obj = datetime.strptime(end_date_str, '%Y-%m-%d')
         
-        start_full = datetime.combine(start_d_obj, time.min) # 00:00:00
-        end_full = datetime.combine(end_d_obj, time.max)     # 23:59:59
+        # 00:00 WIB hari awal s/d sebelum 00:00 WIB hari setelah hari akhir (waktu tersimpan)
+        start_full = business_time.day_start(start_d_obj.date())
+        end_full = business_time.day_start(end_d_obj.date() + timedelta(days=1))
+
+    # 1.B. PERIODE YANG SUDAH DIARSIPKAN: omzet & HPP hari < cutoff dari daily_sales_rollup,
+    # query tabel order panas dibatasi mulai cutoff
+    cold_revenue = 0
+    cold_cogs = 0
+    hot_start = None
+    boundary = archive.cutoff()
+    if boundary:
+        hot_start = business_time.day_start(boundary)
+        if not start_full or start_d_obj.date() < boundary:
+            cold_end = boundary - timedelta(days=1) # Rollup hari >= cutoff juga terisi, dibaca dari tabel panas
+            if start_full:
+                cold_end = min(end_d_obj.date(), cold_end)
+            cold_days = sales_rollup.by_day(start_d_obj.date() if start_full else None, cold_end)
+            cold_revenue = float(sum(revenue for revenue, _, _ in cold_days.values()))
+            cold_cogs = float(sum(cogs for _, _, cogs in cold_days.values()))
 
     # 2. HITUNG OMZET (Revenue)
     # Filter Status & Payment
@@ -120,9 +183,11 @@ def report_profit_loss():
     
     # Filter Waktu
     if start_full:
-        rev_query = rev_query.filter(Order.transaction_date >= start_full, Order.transaction_date <= end_full)
+        rev_query = rev_query.filter(Order.transaction_date >= start_full, Order.transaction_date < end_full)
+    if hot_start:
+        rev_query = rev_query.filter(Order.transaction_date >= hot_start)
     
-    revenue = float(rev_query.scalar() or 0)
+    revenue = float(rev_query.scalar() or 0) + cold_revenue
 
     # 3. HITUNG HPP (COGS)
     # Join Order agar bisa filter status transaksi
@@ -132,9 +197,11 @@ def report_profit_loss():
         .filter(Order.payment_method != 'pending')
 
     if start_full:
-        cogs_query = cogs_query.filter(Order.transaction_date >= start_full, Order.transaction_date <= end_full)
+        cogs_query = cogs_query.filter(Order.transaction_date >= start_full, Order.transaction_date < end_full)
+    if hot_start:
+        cogs_query = cogs_query.filter(Order.transaction_date >= hot_start)
 
-    cogs = float(cogs_query.scalar() or 0)
+    cogs = float(cogs_query.scalar() or 0) + cold_cogs
 
     # 4. HITUNG BIAYA OPERASIONAL
     # Menggunakan filter tanggal (Date) karena expense_date bertipe Date (bukan DateTime)
@@ -177,6 +244,7 @@ def add_expense():
         description=data.get('description', '-')
     )
     db.session.add(new_expense)
+    bump(EXPENSES_TAG)
     db.session.commit()
     
     return jsonify({'message': 'Biaya operasional dicatat.'}), 201
\ No newline at end of file
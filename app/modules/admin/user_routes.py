@@ -2,7 +2,9 @@ from flask import request, jsonify
 from werkzeug.security import generate_password_hash
 from app.extensions import db
 from app.models import User
-from app.decorators import admin_required  # <--- IMPOR INI
+from app.services.cache_version import bump
+from app.services.response_cache import USERS_TAG
+from app.decorators import admin_required, query_budget  # <--- IMPOR INI
 from . import admin_bp
 
 # --- ENDPOINT BUAT USER BARU ---
@@ -27,12 +29,14 @@ def create_user():
         role=data['role']
     )
     db.session.add(new_user)
+    bump(USERS_TAG) # Jumlah staff di dashboard admin
     db.session.commit()
 
     return jsonify({'message': f'User {new_user.username} berhasil dibuat!'}), 201
 
 # --- ENDPOINT LIHAT SEMUA USER ---
 @admin_bp.route('/users', methods=['GET'])
+@query_budget(3)
 @admin_required() # Hanya admin yang boleh lihat daftar pegawai
 def get_all_users():
     users = User.query.filter(User.role.in_(["kitchen", "cashier"])).all()
@@ -79,6 +83,7 @@ def update_user(user_id):
 
     # 5. Simpan Perubahan
     try:
+        bump(USERS_TAG)
         db.session.commit()
         return jsonify({
             'message': 'Data user berhasil diperbarui.',
@@ -98,5 +103,6 @@ def update_user(user_id):
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     db.session.delete(user)
+    bump(USERS_TAG)
     db.session.commit()
     return jsonify({'message': 'User dihapus.'}), 200
\ No newline at end of file
@@ -0,0 +1,76 @@
+import queue
+from flask import request, Response, current_app, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from app.extensions import db
+from app.decorators import staff_required
+from app.services.events import (broadcaster, replay, format_sse, resync_event, make_stream_token,
+                                 read_stream_token, ROLE_EVENTS, DEFAULT_TOKEN_SECONDS)
+from . import events_bp
+
+# Komentar SSE berkala agar proxy/browser tidak menutup koneksi idle
+HEARTBEAT_SECONDS = 15
+
+# =====================================================
+# STREAM EVENT REAL-TIME (SERVER-SENT EVENTS)
+# =====================================================
+# Pengganti polling layar dapur & kasir:
+#   const {token} = await (await fetch('/events/token', {method: 'POST', headers: {Authorization: 'Bearer ' + jwt}})).json();
+#   const es = new EventSource('/events/stream?token=' + token);
+#   es.addEventListener('order_created', e => ...);
+#   es.addEventListener('resync', e => ...); // muat ulang state via REST
+# Event: order_created, status_changed, paid (kasir/admin), voided, deleted, low_stock, resync.
+# Reconnect otomatis browser mengirim Last-Event-ID -> event yang terlewat diputar ulang.
+# Stream token berumur pendek: setelah token kedaluwarsa reconnect otomatis ditolak (401),
+# ambil token baru lalu buka ulang dengan ?last_event_id=<id terakhir>.
+@events_bp.route('/token', methods=['POST'])
+@staff_required()
+def stream_token():
+    token = make_stream_token(current_app, int(get_jwt_identity()), get_jwt().get('role'))
+    return jsonify({
+        'token': token,
+        'expires_in': current_app.config.get('EVENTS_TOKEN_SECONDS', DEFAULT_TOKEN_SECONDS)
+    }), 200
+
+@events_bp.route('/stream', methods=['GET'])
+def stream():
+    claims = read_stream_token(current_app, request.args.get('token', ''))
+    if claims is None:
+        return jsonify({'message': 'Stream token tidak valid atau kedaluwarsa.'}), 401
+    event_types = ROLE_EVENTS.get(claims.get('role'))
+    if event_types is None:
+        return jsonify({'message': 'Akses Ditolak! Hanya Staff.'}), 403
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+    # Daftar dulu, baru putar ulang riwayat s/d posisi subscribe: tanpa celah & tanpa dobel
+    subscriber = broadcaster.subscribe(current_app._get_current_object(), event_types)
+    backlog = []
+    if last_event_id and last_event_id.isdigit():
+        backlog = replay(int(last_event_id), subscriber.start_id, event_types)
+        if backlog is None: # Riwayat tidak utuh: jangan kirim sebagian, minta client resync
+            backlog = [resync_event(subscriber.start_id)]
+        else:
+            backlog = [format_sse(*event) for event in backlog]
+    # Koneksi DB dikembalikan ke pool: subscriber idle tidak memegang koneksi
+    db.session.remove()
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            for chunk in backlog:
+                yield chunk
+            while True:
+                try:
+                    event = subscriber.queue.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                if event is None: # Terlalu lambat, diputus broadcaster
+                    return
+                yield format_sse(*event)
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no' # Nginx: jangan buffer stream
+    })
@@ -1,8 +1,17 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app, Response, stream_with_context
+import csv
+import io
 from datetime import datetime, date
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import insert
 from app.extensions import db
 from app.models import Ingredient, InventoryLog, Order
-from app.decorators import kitchen_required
+from app.decorators import kitchen_required, idempotent, query_budget, cached_response
+from app.services import stock, events
+from app.services.kitchen_queue import kitchen_queue, KITCHEN_VERSION
+from app.services.search_index import search_index
+from app.services.cache_version import bump
+from app.services.response_cache import INGREDIENTS_TAG
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from . import production_bp
 
@@ -10,9 +19,10 @@ from . import production_bp
 # DASHBOARD PRODUCTION (GUDANG & DAPUR)
 # =====================================================
 @production_bp.route('/dashboard', methods=['GET'])
+@query_budget(3)
 @kitchen_required()
 def kitchen_dashboard():
-    low_stock_count = Ingredient.query.filter(Ingredient.current_stock < 5).count()
+    low_stock_count = stock.low_stock_count() # is_low = stok < reorder_point per bahan
     
     return jsonify({
         "title": "DAPUR & GUDANG (PRODUCTION)",
@@ -31,16 +41,20 @@ def kitchen_dashboard():
 # 1. CEK STOK REAL-TIME (DETAIL MONITORING)
 # =====================================================
 @production_bp.route('/stocks', methods=['GET'])
+@query_budget(4)
 @kitchen_required()
+@cached_response(INGREDIENTS_TAG)
 def get_stocks():
-    # Fitur tambahan: Bisa cari nama bahan (?q=tepung)
+    # Fitur tambahan: Bisa cari nama bahan (?q=tepung), urut relevansi.
+    # Pencarian lewat index n-gram di memori, DB hanya dibaca by primary key.
     search_query = request.args.get('q')
     
-    query = Ingredient.query
     if search_query:
-        query = query.filter(Ingredient.name.ilike(f"%{search_query}%"))
-        
-    ingredients = query.all()
+        ids = search_index.ingredients(search_query, limit=current_app.config['SEARCH_RESULT_LIMIT'])
+        found = {item.id: item for item in Ingredient.query.filter(Ingredient.id.in_(ids)).all()} if ids else {}
+        ingredients = [found[i] for i in ids if i in found]
+    else:
+        ingredients = Ingredient.query.all()
     output = []
     
     for item in ingredients:
@@ -50,7 +64,7 @@ def get_stocks():
         status = "Aman"
         if qty <= 0:
             status = "HABIS!"
-        elif qty < 5: 
+        elif item.is_low: 
             status = "Menipis"
 
         output.append({
@@ -61,6 +75,7 @@ def get_stocks():
             # [FIX 2] Handle harga NULL
             'avg_cost': float(item.avg_cost or 0),
             'status': status,
+            'reorder_point': float(item.reorder_point or 0),
             
             # [FIX 3] Masukkan Data Konversi (PENTING untuk Frontend Baru)
             'purchase_unit': item.purchase_unit or item.unit,
@@ -77,10 +92,20 @@ def get_stocks():
 # 1.B. DAFTAR BAHAN (SIMPLE LIST UNTUK DROPDOWN)
 # =====================================================
 @production_bp.route('/ingredients', methods=['GET'])
+@query_budget(4)
 @kitchen_required()
+@cached_response(INGREDIENTS_TAG)
 def get_ingredient_list():
     # Endpoint ini ringan, khusus untuk mengisi 'Select Option' di form Restock/Opname
-    ingredients = Ingredient.query.order_by(Ingredient.name).all()
+    # Typeahead: ?q=gul -> hanya bahan yang cocok, urut relevansi
+    search_query = request.args.get('q')
+    if search_query:
+        ids = search_index.ingredients(search_query, limit=current_app.config['SEARCH_RESULT_LIMIT'])
+        found = {row.id: row for row in db.session.query(Ingredient.id, Ingredient.name, Ingredient.unit)
+                 .filter(Ingredient.id.in_(ids)).all()} if ids else {}
+        ingredients = [found[i] for i in ids if i in found]
+    else:
+        ingredients = db.session.query(Ingredient.id, Ingredient.name, Ingredient.unit).order_by(Ingredient.name).all()
     
     data = []
     for item in ingredients:
@@ -92,6 +117,70 @@ def get_ingredient_list():
         
     return jsonify({'list': data}), 200
 
+# =====================================================
+# 1.C. BAHAN MENIPIS (STOK < REORDER POINT)
+# =====================================================
+@production_bp.route('/low-stock', methods=['GET'])
+@query_budget(3)
+@kitchen_required()
+def get_low_stock():
+    # Hanya baris is_low (index), urut dari yang paling kritis
+    ingredients = Ingredient.query.filter(Ingredient.is_low == True)\
+        .order_by(Ingredient.current_stock - Ingredient.reorder_point, Ingredient.name).all()
+
+    data = []
+    for item in ingredients:
+        qty = float(item.current_stock or 0)
+        reorder_point = float(item.reorder_point or 0)
+        data.append({
+            'id': item.id,
+            'name': item.name,
+            'stock': qty,
+            'unit': item.unit,
+            'reorder_point': reorder_point,
+            'shortage': round(reorder_point - qty, 2),
+            'status': "HABIS!" if qty <= 0 else "Menipis",
+            'purchase_unit': item.purchase_unit or item.unit,
+            'conversion_rate': float(item.conversion_rate or 1)
+        })
+
+    return jsonify({'count': len(data), 'data': data}), 200
+
+# =====================================================
+# 1.D. KONTENSI STOK (MONITORING REBUTAN BAHAN)
+# =====================================================
+@production_bp.route('/stocks/contention', methods=['GET'])
+@kitchen_required()
+def get_stock_contention():
+    # Counter per bahan di worker ini: UPDATE, ditolak (bahan ini kurang), ikut UPDATE yang menunggu lock.
+    # Lama tunggu hanya per statement (1 UPDATE memotong banyak bahan sekaligus).
+    stats, statements = stock.contention_stats.snapshot()
+    names = {}
+    if stats:
+        names = dict(db.session.query(Ingredient.id, Ingredient.name).filter(Ingredient.id.in_(stats.keys())).all())
+
+    data = []
+    ranked = sorted(stats.items(), key=lambda kv: (kv[1]['rejections'], kv[1]['lock_waits']), reverse=True)
+    for ingredient_id, stat in ranked:
+        data.append({
+            'id': ingredient_id,
+            'name': names.get(ingredient_id),
+            'updates': stat['updates'],
+            'rejections': stat['rejections'],
+            'lock_waits': stat['lock_waits']
+        })
+
+    return jsonify({
+        'statements': {
+            'count': statements['count'],
+            'rejections': statements['rejections'],
+            'lock_waits': statements['lock_waits'],
+            'avg_wait_ms': round(statements['total_wait_ms'] / statements['count'], 3) if statements['count'] else 0
+        },
+        'count': len(data),
+        'data': data
+    }), 200
+
 # =====================================================
 # 2. INPUT PEMBELIAN (RESTOCK)
 # =====================================================
@@ -109,28 +198,21 @@ def restock_ingredient():
     if not ingredient:
         return jsonify({'message': 'Bahan baku tidak ditemukan'}), 404
 
-    # WEIGHTED AVERAGE COST
-    old_val = float(ingredient.current_stock) * float(ingredient.avg_cost)
-    new_val = qty_bought * price_per_unit
-    total_stock = float(ingredient.current_stock) + qty_bought
-    
-    if total_stock > 0:
-        new_avg_cost = (old_val + new_val) / total_stock
-    else:
-        new_avg_cost = price_per_unit
-
-    ingredient.current_stock = total_stock
-    ingredient.avg_cost = new_avg_cost
+    # WEIGHTED AVERAGE COST (dihitung atomik di database)
+    stock.purchase(ingredient.id, qty_bought, price_per_unit)
     
     log = InventoryLog(
         ingredient_id=ingredient.id,
         user_id=user_id,
         change_type='purchase',
-        quantity_change=qty_bought
+        quantity_change=qty_bought,
+        unit_cost=price_per_unit
     )
     
     db.session.add(log)
+    bump(INGREDIENTS_TAG)
     db.session.commit()
+    new_avg_cost = float(ingredient.avg_cost) # Nilai baru dimuat ulang setelah commit
 
     return jsonify({
         'message': 'Restock berhasil dicatat.',
@@ -140,6 +222,99 @@ def restock_ingredient():
         'new_avg_cost': round(new_avg_cost, 2)
     }), 200
 
+# =====================================================
+# 2.B. RESTOCK BATCH (1 KIRIMAN SUPPLIER)
+# =====================================================
+@production_bp.route('/restock/batch', methods=['POST'])
+@kitchen_required()
+@idempotent()
+def restock_batch():
+    # Format: {'items': [{'ingredient_id', 'qty', 'price'}, ...]}
+    # qty & price dalam SATUAN BELI (Karung, Botol); dikonversi lewat conversion_rate.
+    # Semua baris masuk dalam 1 transaksi: gagal 1 = batal semua.
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    items_req = data.get('items') or []
+    if not items_req:
+        return jsonify({'message': 'Tidak ada barang untuk di-restock.'}), 400
+
+    max_items = current_app.config.get('RESTOCK_BATCH_MAX', 500)
+    if len(items_req) > max_items:
+        return jsonify({'message': f'Maksimal {max_items} baris per kiriman.'}), 400
+
+    lines = []
+    for index, item in enumerate(items_req):
+        try:
+            ingredient_id = int(item['ingredient_id'])
+            qty = Decimal(str(item['qty']))
+            price = Decimal(str(item['price']))
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            return jsonify({'message': f'Baris {index + 1}: ingredient_id, qty & price wajib diisi angka.'}), 400
+        if qty <= 0 or price < 0:
+            return jsonify({'message': f'Baris {index + 1}: qty harus > 0 dan price tidak boleh minus.'}), 400
+        lines.append((ingredient_id, qty, price))
+
+    ingredients = {
+        row.id: row for row in db.session.query(
+            Ingredient.id, Ingredient.unit, Ingredient.purchase_unit, Ingredient.conversion_rate
+        ).filter(Ingredient.id.in_({ingredient_id for ingredient_id, _, _ in lines})).all()
+    }
+    missing = sorted({ingredient_id for ingredient_id, _, _ in lines if ingredient_id not in ingredients})
+    if missing:
+        return jsonify({'message': f"Bahan ID {', '.join(map(str, missing))} tidak ditemukan"}), 404
+
+    # A. Konversi ke satuan dasar; bahan yang muncul 2x digabung (qty & total biaya)
+    purchases = {}
+    log_rows = []
+    for ingredient_id, qty, price in lines:
+        rate = Decimal(ingredients[ingredient_id].conversion_rate or 1)
+        base_qty = qty * rate
+        total_qty, total_cost = purchases.get(ingredient_id, (Decimal('0'), Decimal('0')))
+        purchases[ingredient_id] = (total_qty + base_qty, total_cost + qty * price)
+        log_rows.append({
+            'ingredient_id': ingredient_id,
+            'user_id': int(user_id),
+            'change_type': 'purchase',
+            'quantity_change': base_qty,
+            'unit_cost': price / rate
+        })
+
+    # B. Kunci sekali (urut id), WAC semua bahan, 1 UPDATE + 1 bulk insert log
+    try:
+        before = stock.purchase_many(purchases)
+    except ValueError as e: # Bahan terhapus di tengah jalan
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 404
+    db.session.execute(insert(InventoryLog), log_rows)
+    bump(INGREDIENTS_TAG)
+    db.session.commit()
+
+    updated = {
+        row.id: row for row in db.session.query(
+            Ingredient.id, Ingredient.current_stock, Ingredient.avg_cost
+        ).filter(Ingredient.id.in_(purchases.keys())).all()
+    }
+    results = []
+    for ingredient_id, (base_qty, total_cost) in purchases.items():
+        ing = ingredients[ingredient_id]
+        results.append({
+            'ingredient_id': ingredient_id,
+            'item': before[ingredient_id].name,
+            'added_qty': float(base_qty),
+            'unit': ing.unit,
+            'total_cost': float(total_cost),
+            'total_stock': float(updated[ingredient_id].current_stock),
+            'old_avg_cost': float(before[ingredient_id].avg_cost or 0),
+            'new_avg_cost': float(updated[ingredient_id].avg_cost)
+        })
+
+    return jsonify({
+        'message': f'Restock {len(results)} bahan berhasil dicatat.',
+        'lines': len(log_rows),
+        'total_cost': float(sum(total_cost for _, total_cost in purchases.values())),
+        'items': results
+    }), 200
+
 # =====================================================
 # 3. STOCK OPNAME (PENYESUAIAN MANUAL)
 # =====================================================
@@ -157,12 +332,11 @@ def adjust_stock():
     if not ingredient:
         return jsonify({'message': 'Bahan baku tidak ditemukan'}), 404
 
-    ingredient.current_stock = float(ingredient.current_stock) + qty_change
+    stock.adjust(ingredient.id, qty_change)
+    if qty_change < 0:
+        events.publish_low_stock({ingredient.id: -qty_change})
     
-    change_type = 'adjustment'
-    reason_lower = reason.lower()
-    if qty_change < 0 and ('busuk' in reason_lower or 'rusak' in reason_lower or 'buang' in reason_lower):
-        change_type = 'waste' 
+    change_type = stock.classify_adjustment(qty_change, reason) # 'waste' jika busuk/rusak/buang
     
     log = InventoryLog(
         ingredient_id=ingredient.id,
@@ -172,6 +346,7 @@ def adjust_stock():
     )
     
     db.session.add(log)
+    bump(INGREDIENTS_TAG)
     db.session.commit()
     
     return jsonify({
@@ -181,48 +356,168 @@ def adjust_stock():
         'change_type': change_type
     }), 200
 # =====================================================
+# 3.B. STOCK OPNAME MASSAL (UPLOAD LEMBAR HITUNG)
+# =====================================================
+OPNAME_REPORT_FIELDS = ['ingredient_id', 'name', 'unit', 'system_qty', 'counted_qty',
+                        'variance', 'variance_value', 'change_type']
+
+
+def _read_count_sheet():
+    """
+    Lembar hitung dari JSON {'items': [{'ingredient_id', 'counted', 'reason'}], 'reason'}
+    atau CSV (upload 'file' / body text/csv) berkolom ingredient_id,counted[,reason].
+    Return (reason default, [(baris, ingredient_id, counted, reason), ...]).
+    """
+    upload = request.files.get('file')
+    if upload is not None or request.mimetype == 'text/csv':
+        text = upload.read().decode('utf-8-sig') if upload is not None else request.get_data(as_text=True)
+        rows = list(csv.DictReader(io.StringIO(text)))
+        default_reason = request.form.get('reason') or request.args.get('reason')
+    else:
+        data = request.get_json(silent=True) or {}
+        rows = data.get('items') or []
+        default_reason = data.get('reason')
+
+    lines = []
+    for index, row in enumerate(rows):
+        try:
+            ingredient_id = int(row['ingredient_id'])
+            counted = Decimal(str(row['counted']).strip())
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            raise ValueError(f'Baris {index + 1}: ingredient_id & counted wajib diisi angka.')
+        if counted < 0:
+            raise ValueError(f'Baris {index + 1}: hasil hitung tidak boleh minus.')
+        lines.append((index + 1, ingredient_id, counted, row.get('reason') or None))
+    return default_reason or 'Stock opname', lines
+
+
+@production_bp.route('/opname', methods=['POST'])
+@kitchen_required()
+def bulk_opname():
+    # Hitung fisik seluruh gudang -> selisih dengan stok sistem -> 1 transaksi.
+    # Bahan yang tidak ada di lembar tidak disentuh. Bahan yang muncul >1x
+    # (mis. dihitung di 2 rak) dijumlahkan. Kirim ulang lembar yang sama aman:
+    # selisih kedua kalinya 0. ?dry_run=1 = hanya laporan selisih, tanpa simpan.
+    # ?format=csv = laporan selisih di-stream sebagai CSV.
+    user_id = get_jwt_identity()
+    try:
+        default_reason, lines = _read_count_sheet()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    if not lines:
+        return jsonify({'message': 'Lembar hitung kosong.'}), 400
+
+    max_lines = current_app.config.get('OPNAME_MAX_LINES', 10000)
+    if len(lines) > max_lines:
+        return jsonify({'message': f'Maksimal {max_lines} baris per lembar hitung.'}), 400
+
+    counted = {}
+    reasons = {}
+    for _, ingredient_id, qty, reason in lines:
+        counted[ingredient_id] = counted.get(ingredient_id, Decimal('0')) + qty
+        reasons.setdefault(ingredient_id, reason or default_reason)
+
+    # A. Stok sistem semua bahan di lembar: 1 query, dikunci urut id
+    system = {
+        row.id: row for row in db.session.query(
+            Ingredient.id, Ingredient.name, Ingredient.unit, Ingredient.current_stock, Ingredient.avg_cost,
+            Ingredient.reorder_point
+        ).filter(Ingredient.id.in_(counted.keys())).order_by(Ingredient.id).with_for_update().all()
+    }
+    missing = sorted(ingredient_id for ingredient_id in counted if ingredient_id not in system)
+    if missing:
+        db.session.rollback()
+        return jsonify({'message': f"Bahan ID {', '.join(map(str, missing))} tidak ditemukan"}), 404
+
+    # B. Selisih per bahan + laporan
+    deltas = {}
+    report = []
+    log_rows = []
+    crossed_low = [] # Stok sudah terkunci: cek lewat batas menipis di Python, bukan CASE raksasa
+    for ingredient_id in sorted(counted):
+        row = system[ingredient_id]
+        system_qty = Decimal(row.current_stock or 0)
+        variance = counted[ingredient_id] - system_qty
+        change_type = stock.classify_adjustment(variance, reasons[ingredient_id]) if variance else None
+        if variance:
+            deltas[ingredient_id] = variance
+            log_rows.append({
+                'ingredient_id': ingredient_id,
+                'user_id': int(user_id),
+                'change_type': change_type,
+                'quantity_change': variance
+            })
+            reorder_point = Decimal(row.reorder_point or 0)
+            if counted[ingredient_id] < reorder_point <= system_qty:
+                crossed_low.append((events.LOW_STOCK, {
+                    'ingredient_id': ingredient_id, 'name': row.name, 'stock': float(counted[ingredient_id])
+                }))
+        report.append({
+            'ingredient_id': ingredient_id,
+            'name': row.name,
+            'unit': row.unit,
+            'system_qty': float(system_qty),
+            'counted_qty': float(counted[ingredient_id]),
+            'variance': float(variance),
+            'variance_value': float((variance * Decimal(row.avg_cost or 0)).quantize(Decimal('0.01'))),
+            'change_type': change_type
+        })
+
+    # C. Terapkan: 1 executemany UPDATE stok + 1 bulk insert log, 1 commit
+    dry_run = request.args.get('dry_run') in ('1', 'true')
+    if dry_run:
+        db.session.rollback()
+    else:
+        stock.adjust_many(deltas)
+        if log_rows:
+            db.session.execute(insert(InventoryLog), log_rows)
+        events.publish_many(crossed_low)
+        bump(INGREDIENTS_TAG)
+        db.session.commit()
+
+    summary = {
+        'lines': len(lines),
+        'ingredients': len(report),
+        'adjusted': len(deltas),
+        'total_variance_value': round(sum(item['variance_value'] for item in report), 2),
+        'applied': not dry_run
+    }
+
+    if request.args.get('format') == 'csv':
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=OPNAME_REPORT_FIELDS)
+            writer.writeheader()
+            for start in range(0, len(report), 500):
+                writer.writerows(report[start:start + 500])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+
+        filename = f"opname_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        return Response(stream_with_context(generate()), mimetype='text/csv', headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'X-Opname-Adjusted': str(summary['adjusted']),
+            'X-Opname-Applied': '1' if summary['applied'] else '0'
+        })
+
+    return jsonify({
+        'message': 'Stock opname selesai.' if not dry_run else 'Pratinjau selisih (belum disimpan).',
+        **summary,
+        'variance': [item for item in report if item['variance']]
+    }), 200
+
+# =====================================================
 # 4. ANTRIAN MASAK (PRODUCTION QUEUE) - REVISI ID
 # =====================================================
 @production_bp.route('/queue', methods=['GET'])
+@query_budget(4)
 @kitchen_required()
 def production_queue():
-    # Ambil hanya yang belum selesai (Pending / Cooking)
-    orders = Order.query.filter(
-        Order.status.in_(['pending', 'cooking'])
-    ).order_by(Order.transaction_date.asc()).all()
-    
-    kitchen_tasks = {}
-    
-    for order in orders:
-        for item in order.items:
-            menu_name = item.product.name
-            
-            if menu_name not in kitchen_tasks:
-                kitchen_tasks[menu_name] = {
-                    'total_qty': 0, 
-                    'orders': [] # Sekarang list of objects, bukan string doang
-                }
-            
-            kitchen_tasks[menu_name]['total_qty'] += item.quantity
-            
-            # Cek duplikasi di list (agar 1 invoice tidak muncul 2x di menu yg sama)
-            exists = False
-            for o in kitchen_tasks[menu_name]['orders']:
-                if o['id'] == order.id:
-                    exists = True
-                    break
-            
-            if not exists:
-                kitchen_tasks[menu_name]['orders'].append({
-                    'id': order.id,           # PENTING: Untuk tombol klik
-                    'invoice': order.invoice_no,
-                    'status': order.status,
-                    'customer': order.customer_name # PENTING: Untuk warna tombol
-                })
-    
+    # Ambil hanya yang belum selesai (Pending / Cooking), dihitung ulang hanya jika ada perubahan
     return jsonify({
         'date': date.today().strftime('%Y-%m-%d'),
-        'tasks': kitchen_tasks
+        'tasks': kitchen_queue.tasks()
     }), 200
 # =====================================================
 # 5. UPDATE STATUS MASAKAN (KITCHEN ACTION)
@@ -243,6 +538,8 @@ def update_order_status(order_id):
 
     # Update Status
     order.status = new_status
+    bump(KITCHEN_VERSION)
+    events.publish(events.STATUS_CHANGED, events.order_payload(order))
     db.session.commit()
 
     return jsonify({
@@ -1,15 +1,27 @@
-from flask import request, jsonify
-from datetime import datetime
+from flask import request, jsonify, current_app
+from datetime import datetime, timedelta
 from app.extensions import db
-from app.models import User, SalesSession, Product, Order, OrderItem, Recipe, Ingredient, InventoryLog
-from app.decorators import cashier_required
+from app.models import User, SalesSession, Product, Order, OrderItem, Ingredient, InventoryLog
+from app.decorators import cashier_required, idempotent, query_budget, cached_response
+from app.services.order_posting import post_order, post_order_chunk
+from app.services import shift_ledger, consumption, events, sales_rollup, business_time
+from app.services.receipt_cache import receipt_cache, make_etag, RECEIPT_VERSION
+from app.services.cache_version import bump
+from app.services.kitchen_queue import KITCHEN_VERSION
+from app.services.search_index import search_index
+from app.services.bom_cache import bom_cache
+from app.services.response_cache import ORDERS_TAG, INGREDIENTS_TAG, PRODUCTS_TAG, RECIPES_TAG
+from app.services.pagination import page_args, keyset_page, PaginationError
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func, update, delete
+from sqlalchemy.orm import joinedload
 from . import sales_bp
 
 # =====================================================
 # DASHBOARD KASIR (Info Umum)
 # =====================================================
 @sales_bp.route('/dashboard', methods=['GET'])
+@query_budget(4)
 @cashier_required()
 def sales_dashboard():
     user_id = get_jwt_identity()
@@ -18,10 +30,12 @@ def sales_dashboard():
     status = "Shift Aktif" if active_session else "Shift Belum Dibuka"
     session_info = None
     if active_session:
+        per_method = shift_ledger.totals(active_session.id)
         session_info = {
             "id": active_session.id,
-            "start_cash": float(active_session.start_cash),   # Modal Awal
-            "total_sales": float(active_session.total_system) # Omset Sementara
+            "start_cash": float(active_session.start_cash),        # Modal Awal
+            "total_sales": float(sum(per_method.values())),        # Omset Sementara
+            "sales_by_method": {m: float(v) for m, v in per_method.items()}
         }
     return jsonify({
         "title": "KASIR / POS",
@@ -51,7 +65,7 @@ def open_shift():
     new_session = SalesSession(
         user_id=user_id,
         start_cash=start_cash,
-        start_time=datetime.now()
+        start_time=business_time.now()
     )
     db.session.add(new_session)
     db.session.commit()
@@ -67,6 +81,7 @@ def open_shift():
 # =====================================================
 @sales_bp.route('/orders', methods=['POST'])
 @cashier_required()
+@idempotent()
 def create_order():
     user_id = get_jwt_identity()
     
@@ -82,88 +97,18 @@ def create_order():
     if not items_req:
         return jsonify({'message': 'Keranjang belanja kosong!'}), 400
 
-    # B. Buat Invoice Baru
-    invoice_no = f"INV-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
-
     try:
-        total_amount = 0
-        new_order = Order(
-            invoice_no=invoice_no,
-            user_id=user_id,
-            session_id=active_session.id,
-            payment_method=payment_method,
-            status='pending',
-            customer_name=customer_name,
-            total_amount=0, # Nanti diupdate
-            transaction_date=datetime.now()
-        )
-        db.session.add(new_order)
-        db.session.flush() # Agar new_order.id terbentuk
-
-        # C. Loop Barang & Potong Stok
-        for item in items_req:
-            product = Product.query.get(item['product_id'])
-            qty_sold = int(item['qty'])
-            
-            if not product: raise Exception(f"Produk ID {item['product_id']} tidak ditemukan")
-
-            # --- LOGIC POTONG STOK BAHAN (Resep) ---
-            menu_cogs = 0
-            recipes = Recipe.query.filter_by(product_id=product.id).all()
-            
-            if not recipes:
-                # Optional: Warning jika produk tidak punya resep (Misal: Kerupuk titipan)
-                print(f"Info: Produk {product.name} tidak memiliki resep.")
-
-            for r in recipes:
-                ingredient = r.ingredient
-                required_qty = r.quantity_needed * qty_sold
-                
-                # Cek Stok Cukup?
-                if ingredient.current_stock < required_qty:
-                     raise Exception(f"Stok '{ingredient.name}' tidak cukup! Sisa: {ingredient.current_stock}, Butuh: {required_qty}")
-
-                # KURANGI STOK
-                ingredient.current_stock -= required_qty
-                
-                # Catat Log Gudang
-                log = InventoryLog(
-                    ingredient_id=ingredient.id,
-                    user_id=user_id,
-                    change_type='production', 
-                    quantity_change= -required_qty 
-                )
-                db.session.add(log)
-
-                # Hitung HPP saat ini
-                menu_cogs += (float(ingredient.avg_cost) * float(r.quantity_needed))
-
-            # Simpan Item Transaksi
-            price_at_sale = float(product.price)
-            order_item = OrderItem(
-                order_id=new_order.id,
-                product_id=product.id,
-                quantity=qty_sold,
-                price_at_sale=price_at_sale,
-                cogs_at_sale=menu_cogs 
-            )
-            db.session.add(order_item)
-            
-            total_amount += (price_at_sale * qty_sold)
-
-        # D. Finalisasi
-        new_order.total_amount = total_amount
-        
-        # Update Total Penjualan di Shift ini
-        if payment_method != 'pending':
-            active_session.total_system = float(active_session.total_system) + total_amount
-        
+        # B. Invoice, potong stok, item & total shift (lihat services.order_posting)
+        new_order, plan = post_order(user_id, active_session, items_req, payment_method, customer_name)
+        bump(KITCHEN_VERSION, ORDERS_TAG, INGREDIENTS_TAG) # Antrian dapur & cache respon dihitung ulang
+        events.publish(events.ORDER_CREATED, events.order_payload(new_order))
+        events.publish_low_stock(plan.demand)
         db.session.commit() 
 
         return jsonify({
             'message': 'Transaksi berhasil!',
-            'invoice': invoice_no,
-            'total': total_amount,
+            'invoice': new_order.invoice_no,
+            'total': float(plan.total_amount),
             'customer': customer_name,
             'date': new_order.transaction_date.strftime('%d-%m-%Y %H:%M')
         }), 201
@@ -173,33 +118,160 @@ def create_order():
         return jsonify({'message': f'Gagal: {str(e)}'}), 400
 
 # =====================================================
-# 3. CETAK STRUK (DATA)
+# 2.B. INPUT PESANAN BATCH (REPLAY TABLET OFFLINE)
 # =====================================================
-@sales_bp.route('/orders/<string:invoice_no>', methods=['GET'])
+def _parse_client_time(value):
+    # Waktu transaksi dari tablet: 'YYYY-MM-DD HH:MM:SS' atau ISO 8601
+    # tanpa zona = waktu bisnis (WIB) tablet
+    if not value:
+        return business_time.now()
+    client_time = datetime.fromisoformat(value)
+    if not client_time.tzinfo:
+        client_time = client_time.replace(tzinfo=business_time.business_tz())
+    return business_time.to_storage(client_time)
+
+@sales_bp.route('/orders/batch', methods=['POST'])
 @cashier_required()
-def get_receipt(invoice_no):
-    order = Order.query.filter_by(invoice_no=invoice_no).first_or_404()
-    
-    items_data = []
-    for item in order.items:
-        items_data.append({
-            'product': item.product.name, 
-            'qty': item.quantity,
-            'price': float(item.price_at_sale),
-            'subtotal': float(item.price_at_sale) * item.quantity
-        })
+@idempotent()
+def create_orders_batch():
+    user_id = get_jwt_identity()
+
+    # JWT & shift aktif cukup dicek sekali untuk seluruh batch
+    active_session = SalesSession.query.filter_by(user_id=user_id, end_time=None).first()
+    if not active_session:
+        return jsonify({'message': 'Shift belum dibuka! Silakan Buka Shift dulu.'}), 403
 
+    data = request.get_json() or {}
+    orders_req = data.get('orders') or [] # Format: [{'client_ref', 'client_time', 'items', ...}, ...]
+    if not orders_req:
+        return jsonify({'message': 'Tidak ada pesanan untuk dikirim.'}), 400
+
+    max_orders = current_app.config.get('ORDER_BATCH_MAX', 500)
+    if len(orders_req) > max_orders:
+        return jsonify({'message': f'Maksimal {max_orders} pesanan per batch.'}), 400
+
+    results = [None] * len(orders_req)
+
+    # A. Urutkan sesuai waktu di tablet agar stok terpotong secara kronologis
+    queue = []
+    for index, order_req in enumerate(orders_req):
+        client_ref = order_req.get('client_ref')
+        try:
+            client_time = _parse_client_time(order_req.get('client_time'))
+        except (TypeError, ValueError):
+            results[index] = {'client_ref': client_ref, 'status': 'error', 'message': 'Format client_time tidak valid'}
+            continue
+        if not order_req.get('items'):
+            results[index] = {'client_ref': client_ref, 'status': 'error', 'message': 'Keranjang belanja kosong!'}
+            continue
+        queue.append((client_time, index, order_req))
+    queue.sort(key=lambda entry: (entry[0], entry[1]))
+
+    # B. Posting per chunk: 1 commit per chunk (lihat services.order_posting).
+    # Chunk yang gagal tidak menghentikan batch: chunk sebelumnya sudah commit,
+    # jadi respons harus selalu berisi hasil parsial (disimpan Idempotency-Key).
+    chunk_size = current_app.config.get('ORDER_BATCH_CHUNK', 50)
+    for start in range(0, len(queue), chunk_size):
+        chunk = queue[start:start + chunk_size]
+        try:
+            with db.session.begin_nested():
+                outcomes = post_order_chunk(user_id, active_session, [(
+                    client_time,
+                    order_req['items'],
+                    order_req.get('payment_method', 'cash'),
+                    order_req.get('customer_name', 'Pelanggan Umum')
+                ) for client_time, _, order_req in chunk])
+        except Exception as e:
+            outcomes = [e] * len(chunk)
+
+        posted = []
+        created, chunk_demand = [], {}
+        for (_, index, order_req), outcome in zip(chunk, outcomes):
+            client_ref = order_req.get('client_ref')
+            if isinstance(outcome, Exception):
+                results[index] = {'client_ref': client_ref, 'status': 'error', 'message': f'Gagal: {str(outcome)}'}
+                continue
+            order, plan = outcome
+            created.append((events.ORDER_CREATED, events.order_payload(order)))
+            for ingredient_id, qty in plan.demand.items():
+                chunk_demand[ingredient_id] = chunk_demand.get(ingredient_id, 0) + qty
+            posted.append((index, {
+                'client_ref': client_ref,
+                'status': 'ok',
+                'invoice': order.invoice_no,
+                'total': float(plan.total_amount)
+            }))
+
+        try:
+            if posted:
+                bump(KITCHEN_VERSION, ORDERS_TAG, INGREDIENTS_TAG)
+                events.publish_many(created)
+                events.publish_low_stock(chunk_demand)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            posted = [(index, {'client_ref': result['client_ref'], 'status': 'error', 'message': f'Gagal: {str(e)}'})
+                      for index, result in posted]
+
+        for index, result in posted:
+            results[index] = result
+
+    success = sum(1 for result in results if result['status'] == 'ok')
     return jsonify({
-        'store_name': 'Kerupuk Mekar Sari',
-        'invoice': order.invoice_no,
-        'date': order.transaction_date.strftime('%Y-%m-%d %H:%M'),
-        'cashier': order.cashier.username,
-        'customer': order.customer_name,
-        'items': items_data,
-        'total': float(order.total_amount),
-        'payment': order.payment_method
+        'message': f'{success} dari {len(results)} pesanan berhasil diposting.',
+        'success': success,
+        'failed': len(results) - success,
+        'results': results
     }), 200
 
+# =====================================================
+# 3. CETAK STRUK (DATA)
+# =====================================================
+@sales_bp.route('/orders/<string:invoice_no>', methods=['GET'])
+@query_budget(4)
+@cashier_required()
+def get_receipt(invoice_no):
+    # Cetak ulang: struk lunas/batal dilayani dari cache, 304 jika ETag sama
+    cached = receipt_cache.get(invoice_no)
+    if cached is None:
+        # 1 query: order + item + produk + kasir (tanpa lazy-load per baris)
+        order = Order.query.options(
+            joinedload(Order.items).joinedload(OrderItem.product),
+            joinedload(Order.cashier)
+        ).filter_by(invoice_no=invoice_no).first_or_404()
+
+        items_data = []
+        for item in order.items:
+            items_data.append({
+                'product': item.product.name, 
+                'qty': item.quantity,
+                'price': float(item.price_at_sale),
+                'subtotal': float(item.price_at_sale) * item.quantity
+            })
+
+        body = jsonify({
+            'store_name': 'Kerupuk Mekar Sari',
+            'invoice': order.invoice_no,
+            'date': order.transaction_date.strftime('%Y-%m-%d %H:%M'),
+            'cashier': order.cashier.username,
+            'customer': order.customer_name,
+            'items': items_data,
+            'total': float(order.total_amount),
+            'payment': order.payment_method
+        }).get_data()
+        cached = (make_etag(body), body)
+        if order.payment_method != 'pending':
+            receipt_cache.put(invoice_no, *cached)
+
+    etag, body = cached
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, status=200, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 # =====================================================
 # 4. TUTUP SHIFT (END DAY)
 # =====================================================
@@ -214,9 +286,11 @@ def close_shift():
     if not active_session:
         return jsonify({'message': 'Tidak ada shift aktif.'}), 400
 
-    # Update Sesi
-    active_session.end_time = datetime.now()
+    # Update Sesi (total_system = snapshot buku besar shift saat ditutup)
+    per_method = shift_ledger.totals(active_session.id)
+    active_session.end_time = business_time.now()
     active_session.end_cash_actual = end_cash_actual
+    active_session.total_system = sum(per_method.values())
     
     # Hitung Selisih (Uang Fisik - (Modal Awal + Penjualan Sistem))
     expected_cash = float(active_session.start_cash) + float(active_session.total_system)
@@ -229,6 +303,7 @@ def close_shift():
         'summary': {
             'modal_awal': float(active_session.start_cash),
             'total_penjualan_sistem': float(active_session.total_system),
+            'penjualan_per_metode': {m: float(v) for m, v in per_method.items()},
             'seharusnya_ada': expected_cash,
             'uang_fisik': float(end_cash_actual),
             'selisih': difference 
@@ -240,19 +315,26 @@ def close_shift():
 # 5. DAFTAR MENU (KATALOG PRODUK)
 # =====================================================
 @sales_bp.route('/menu', methods=['GET'])
+@query_budget(7)
 @cashier_required()
+@cached_response(PRODUCTS_TAG, RECIPES_TAG)
 def get_menu_list():
     # Ambil parameter filter dari URL (opsional)
-    # Contoh: /sales/menu?category=Makanan
+    # Contoh: /sales/menu?category=Makanan, /sales/menu?q=kopi (cari nama, urut relevansi)
     category_filter = request.args.get('category')
-
-    query = Product.query.filter_by(is_active=True)
-    
-    if category_filter:
-        query = query.filter(Product.category.ilike(f"%{category_filter}%"))
-    
-    products = query.all()
+    search_query = request.args.get('q')
+
+    if category_filter or search_query:
+        # Index n-gram di memori (tanpa LIKE '%..%'), DB hanya dibaca by primary key
+        ids = search_index.products(search_query, category=category_filter)
+        found = {p.id: p for p in Product.query.filter(Product.id.in_(ids)).all()} if ids else {}
+        products = [found[i] for i in ids if i in found and found[i].is_active]
+    else:
+        products = Product.query.filter_by(is_active=True).all()
     
+    # Resep dari cache BOM (bukan lazy-load p.recipes per produk)
+    boms = bom_cache.get_many([p.id for p in products])
+
     menu_data = []
     for p in products:
         menu_data.append({
@@ -262,7 +344,7 @@ def get_menu_list():
             'price': float(p.price),
             # Optional: Cek apakah produk ini punya resep? 
             # (Hanya info, validasi stok tetap saat transaksi)
-            'has_recipe': bool(p.recipes) 
+            'has_recipe': bool(boms[p.id])
         })
 
     return jsonify({
@@ -273,10 +355,37 @@ def get_menu_list():
 # 6. LIHAT PESANAN BELUM LUNAS (OPEN BILL)
 # =====================================================
 @sales_bp.route('/orders/pending', methods=['GET'])
+@query_budget(3)
 @cashier_required()
 def get_pending_orders():
-    # Ambil order yang payment_method nya 'pending' (belum bayar)
-    orders = Order.query.filter_by(payment_method='pending').order_by(Order.transaction_date.desc()).all()
+    # Ambil order yang payment_method nya 'pending' (belum bayar), terbaru dulu.
+    # Opsional: ?session_id= / ?cashier_id=. Default SEMUA open bill (klien lama tidak
+    # mengikuti X-Next-Cursor, open bill tidak boleh hilang dari layar kasir);
+    # paginasi hanya jika ?limit= / ?cursor= dikirim (halaman berikut via header X-Next-Cursor).
+    try:
+        cursor, limit = page_args(default_limit=None)
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+
+    # Jumlah item dihitung di query yang sama (subquery per baris halaman, bukan N+1)
+    items_count = db.session.query(func.count(OrderItem.id))\
+        .filter(OrderItem.order_id == Order.id)\
+        .correlate(Order)\
+        .scalar_subquery()
+
+    query = db.session.query(
+        Order.id, Order.invoice_no, Order.customer_name, Order.transaction_date,
+        Order.total_amount, items_count.label('items_count')
+    ).filter(Order.payment_method == 'pending')
+
+    session_id = request.args.get('session_id', type=int)
+    if session_id:
+        query = query.filter(Order.session_id == session_id)
+    cashier_id = request.args.get('cashier_id', type=int)
+    if cashier_id:
+        query = query.filter(Order.user_id == cashier_id)
+
+    orders, next_cursor = keyset_page(query, Order.transaction_date, Order.id, cursor, limit)
     
     output = []
     for o in orders:
@@ -285,16 +394,20 @@ def get_pending_orders():
             'customer': o.customer_name,    
             'time': o.transaction_date.strftime('%H:%M'),
             'total': float(o.total_amount),
-            'items_count': len(o.items)
+            'items_count': o.items_count
         })
         
-    return jsonify(output), 200
+    response = jsonify(output)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
 
 # =====================================================
 # 7. BAYAR TAGIHAN (PELUNASAN)
 # =====================================================
 @sales_bp.route('/orders/<string:invoice>/pay', methods=['POST'])
 @cashier_required()
+@idempotent()
 def pay_pending_order(invoice):
     data = request.get_json()
     method = data.get('payment_method', 'cash')
@@ -306,16 +419,27 @@ def pay_pending_order(invoice):
     if order.payment_method != 'pending':
         return jsonify({'message': 'Pesanan ini sudah lunas!'}), 400
         
-    # Update Status Pembayaran
-    order.payment_method = method
+    # Update Status Pembayaran: UPDATE bersyarat, hanya 1 dari 2 pelunasan
+    # bersamaan yang lolos (yang lain tidak boleh mencatat uang masuk 2x)
+    paid = db.session.execute(
+        update(Order)
+        .where(Order.id == order.id, Order.payment_method == 'pending')
+        .values(payment_method=method)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if paid != 1:
+        db.session.rollback()
+        return jsonify({'message': 'Pesanan ini sudah lunas!'}), 400
+    db.session.refresh(order) # Baris sudah terkunci: status terbaru (mis. di-void bersamaan)
     
-    # Update Total Sales di Session (Karena baru uang masuk sekarang)
-    if order.session_id:
-        session = SalesSession.query.get(order.session_id)
-        if session:
-            session.total_system = float(session.total_system) + float(order.total_amount)
+    # Catat ke buku besar Shift (Karena baru uang masuk sekarang)
+    shift_ledger.record(order, order.total_amount, 'payment')
+    sales_rollup.record_payment(order)
+    bump(ORDERS_TAG)
+    events.publish(events.PAID, events.order_payload(order))
             
     db.session.commit()
+    receipt_cache.invalidate(order.invoice_no)
     
     return jsonify({'message': 'Pembayaran berhasil!', 'invoice': order.invoice_no}), 200
 # =====================================================
@@ -323,6 +447,7 @@ def pay_pending_order(invoice):
 # =====================================================
 @sales_bp.route('/orders/<string:invoice>/void', methods=['POST'])
 @cashier_required()
+@idempotent()
 def void_order(invoice):
     user_id = get_jwt_identity()
     order = Order.query.filter_by(invoice_no=invoice).first()
@@ -331,35 +456,33 @@ def void_order(invoice):
     if order.status == 'cancelled': return jsonify({'message': 'Pesanan sudah dibatalkan sebelumnya'}), 400
 
     try:
-        # 1. Tandai Order sebagai Cancelled
-        order.status = 'cancelled'
+        # 1. Tandai Order sebagai Cancelled: UPDATE bersyarat, void ganda bersamaan
+        # tidak boleh mengembalikan uang/stok 2x
+        voided = db.session.execute(
+            update(Order)
+            .where(Order.id == order.id, Order.status != 'cancelled')
+            .values(status='cancelled')
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if voided != 1:
+            db.session.rollback()
+            return jsonify({'message': 'Pesanan sudah dibatalkan sebelumnya'}), 400
+        db.session.refresh(order) # Baris sudah terkunci: metode bayar terbaru (mis. dilunasi bersamaan)
         
-        # 2. Kembalikan Uang ke Shift (Jika sudah lunas)
-        if order.payment_method != 'pending' and order.session_id:
-            session = SalesSession.query.get(order.session_id)
-            if session:
-                session.total_system = float(session.total_system) - float(order.total_amount)
-
-        # 3. Kembalikan Stok Bahan Baku (Restoration)
-        for item in order.items:
-            recipes = Recipe.query.filter_by(product_id=item.product_id).all()
-            for r in recipes:
-                ingredient = r.ingredient
-                restore_qty = r.quantity_needed * item.quantity
-                
-                # Tambah stok balik
-                ingredient.current_stock += restore_qty
-                
-                # Catat Log Pengembalian
-                log = InventoryLog(
-                    ingredient_id=ingredient.id,
-                    user_id=user_id,
-                    change_type='adjustment', # Dianggap penyesuaian/pembatalan
-                    quantity_change=restore_qty
-                )
-                db.session.add(log)
-
+        # 2. Kembalikan Uang ke Shift (Jika sudah lunas) & keluarkan dari rollup harian
+        was_paid = order.payment_method != 'pending'
+        if was_paid:
+            shift_ledger.record(order, -order.total_amount, 'void')
+        sales_rollup.record_void(order, was_paid)
+
+        # 3. Kembalikan Stok Bahan Baku sesuai konsumsi saat order dibuat
+        # (1 UPDATE stok + 1 bulk insert log 'adjustment' = penyesuaian/pembatalan)
+        consumption.reverse(order, user_id)
+
+        bump(RECEIPT_VERSION, KITCHEN_VERSION, ORDERS_TAG, INGREDIENTS_TAG) # Struk, antrian dapur & cache respon di worker lain ikut dibuang
+        events.publish(events.VOIDED, events.order_payload(order))
         db.session.commit()
+        receipt_cache.invalidate(invoice)
         return jsonify({'message': f'Transaksi {invoice} berhasil dibatalkan (Refund). Stok dikembalikan.'}), 200
 
     except Exception as e:
@@ -369,12 +492,40 @@ def void_order(invoice):
 # 8. DATA RIWAYAT TRANSAKSI (ALL TIME - LIMIT 50)
 # =====================================================
 @sales_bp.route('/orders/history', methods=['GET'])
+@query_budget(3)
 @cashier_required()
 def get_order_history():
     # REVISI: Jangan filter 'today' agar data tidak hilang saat pergantian hari/jam server beda.
-    # Ambil 50 transaksi terakhir secara global.
-    
-    orders = Order.query.order_by(Order.transaction_date.desc()).limit(50).all()
+    # Terbaru dulu, per halaman (?limit=, default 50). Halaman berikut: ?cursor= dari header X-Next-Cursor.
+    # Filter opsional: status, payment, session_id, cashier_id, date_from & date_to (YYYY-MM-DD).
+    try:
+        cursor, limit = page_args()
+        date_from = _parse_day(request.args.get('date_from'))
+        date_to = _parse_day(request.args.get('date_to'))
+    except (PaginationError, ValueError) as e:
+        return jsonify({'message': str(e)}), 400
+
+    query = db.session.query(
+        Order.id, Order.invoice_no, Order.customer_name, Order.total_amount,
+        Order.status, Order.payment_method, Order.transaction_date
+    )
+    if request.args.get('status'):
+        query = query.filter(Order.status == request.args['status'])
+    if request.args.get('payment'):
+        query = query.filter(Order.payment_method == request.args['payment'])
+    session_id = request.args.get('session_id', type=int)
+    if session_id:
+        query = query.filter(Order.session_id == session_id)
+    cashier_id = request.args.get('cashier_id', type=int)
+    if cashier_id:
+        query = query.filter(Order.user_id == cashier_id)
+    # Rentang tanggal sargable (hari bisnis WIB, sama dengan laporan): >= awal hari & < hari setelah date_to
+    if date_from:
+        query = query.filter(Order.transaction_date >= business_time.day_start(date_from))
+    if date_to:
+        query = query.filter(Order.transaction_date < business_time.day_start(date_to + timedelta(days=1)))
+
+    orders, next_cursor = keyset_page(query, Order.transaction_date, Order.id, cursor, limit)
     
     output = []
     for o in orders:
@@ -384,43 +535,71 @@ def get_order_history():
             'total': float(o.total_amount),
             'status': o.status,
             'payment': o.payment_method,
-            # Format tanggal lebih lengkap: Tgl-Blan Jam:Menit
-            'time': o.transaction_date.strftime('%d/%m %H:%M') 
+            # Format tanggal lebih lengkap: Tgl-Blan Jam:Menit (WIB, sama dengan filter tanggal)
+            'time': business_time.from_storage(o.transaction_date).strftime('%d/%m %H:%M') 
         })
-    return jsonify(output), 200
+
+    response = jsonify(output)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+
+def _parse_day(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Format tanggal '{value}' harus YYYY-MM-DD.")
+
 # =====================================================
 # 9. HAPUS RIWAYAT TRANSAKSI (HARD DELETE)
 # =====================================================
 @sales_bp.route('/orders/<string:invoice>', methods=['DELETE'])
 @cashier_required()
 def delete_order_permanently(invoice):
-    order = Order.query.filter_by(invoice_no=invoice).first()
+    user_id = get_jwt_identity()
+    # Kunci baris order (MySQL): void/pelunasan/hapus bersamaan menunggu, lalu membaca status terbaru
+    order = Order.query.filter_by(invoice_no=invoice).with_for_update().first()
     if not order: 
         return jsonify({'message': 'Invoice tidak ditemukan'}), 404
 
     try:
+        was_cancelled = order.status == 'cancelled'
+        seen_payment = order.payment_method
+
         # A. KEMBALIKAN UANG KE SHIFT (Jika Lunas & Belum Cancel)
         # Supaya omset hari ini tidak kelebihan
-        if order.payment_method != 'pending' and order.status != 'cancelled' and order.session_id:
-            session = SalesSession.query.get(order.session_id)
-            if session:
-                session.total_system = float(session.total_system) - float(order.total_amount)
+        if order.payment_method != 'pending' and order.status != 'cancelled':
+            shift_ledger.record(order, -order.total_amount, 'delete')
+        sales_rollup.record_delete(order) # Omzet / hitungan void di rollup harian ikut dikurangi
 
         # B. KEMBALIKAN STOK (Jika Belum Cancel)
         # Jika status 'cancelled', stok sudah dikembalikan saat void, jadi skip langkah ini.
         if order.status != 'cancelled':
-            for item in order.items:
-                recipes = Recipe.query.filter_by(product_id=item.product_id).all()
-                for r in recipes:
-                    ingredient = r.ingredient
-                    restore_qty = r.quantity_needed * item.quantity
-                    ingredient.current_stock += restore_qty # Balikin stok
+            consumption.reverse(order, user_id) # Balikin stok + log
 
         # C. HAPUS DATA PERMANEN
-        # Hapus item dulu (child), baru order (parent)
+        # Hapus item & catatan konsumsi dulu (child), baru order (parent).
+        # DELETE bersyarat: stok/uang di atas hanya dikembalikan jika status batal &
+        # metode bayar masih sama dengan yang dibaca (void/pelunasan/hapus bersamaan ditolak)
         OrderItem.query.filter_by(order_id=order.id).delete()
-        db.session.delete(order)
+        consumption.forget(order.id)
+        events.publish(events.DELETED, events.order_payload(order))
+        deleted = db.session.execute(
+            delete(Order)
+            .where(Order.id == order.id, Order.payment_method == seen_payment,
+                   Order.status == 'cancelled' if was_cancelled else Order.status != 'cancelled')
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if deleted != 1:
+            db.session.rollback()
+            return jsonify({'message': 'Pesanan sedang diubah/dihapus oleh request lain, muat ulang lalu coba lagi.'}), 409
+        db.session.expunge(order)
+        bump(RECEIPT_VERSION, KITCHEN_VERSION, ORDERS_TAG, INGREDIENTS_TAG)
         db.session.commit()
+        receipt_cache.invalidate(invoice)
 
         return jsonify({'message': 'Data transaksi berhasil dihapus permanen.'}), 200
 
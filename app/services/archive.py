@@ -0,0 +1,129 @@
+from datetime import datetime, time, timedelta
+from sqlalchemy import insert, delete, select, func, and_, not_
+from app.extensions import db
+from app.models import (Order, OrderItem, OrderConsumption, InventoryLog, OrderArchive, OrderItemArchive,
+                        InventoryLogArchive, ArchiveRun)
+from app.services import business_time, sales_rollup
+
+# =====================================================
+# ARSIP DATA DINGIN (ORDER, ITEM & LOG PERIODE TERTUTUP)
+# =====================================================
+# `flask archive-orders` memindahkan order yang sudah final (bukan open bill),
+# item-nya & inventory_logs dengan tanggal < cutoff ke tabel *_archive.
+# Urutannya:
+#   A. 1 transaksi: hitung ulang daily_sales_rollup (services.sales_rollup)
+#      untuk hari-hari yang akan diarsipkan dari sumbernya + catat
+#      ArchiveRun(cutoff). Sejak commit ini laporan membaca hari < cutoff
+#      dari rollup, jadi hasilnya langsung konsisten.
+#   B. Pindahkan baris per batch (INSERT ... SELECT lalu DELETE, 1 commit per
+#      batch). Bisa diulang kapan saja jika terhenti di tengah jalan.
+# Laporan (report_routes) menggabungkan rollup (hari < cutoff) dengan query
+# tabel panas (hari >= cutoff); stok per tanggal ikut membaca log arsip.
+# Cutoff adalah hari bisnis (WIB): batas order = 00:00 WIB dalam waktu
+# tersimpan (business_time.day_start), batas log = 00:00 WIB dalam UTC
+# (created_at), sama dengan batas yang dipakai laporan & rollup.
+
+DEFAULT_BATCH = 1000
+
+ORDER_COLUMNS = [column.name for column in OrderArchive.__table__.columns]
+ITEM_COLUMNS = [column.name for column in OrderItemArchive.__table__.columns]
+LOG_COLUMNS = [column.name for column in InventoryLogArchive.__table__.columns]
+
+
+def cutoff():
+    """Batas arsip: semua order/log sebelum tanggal ini sudah di arsip (None = belum pernah)."""
+    return db.session.query(func.max(ArchiveRun.cutoff)).scalar()
+
+
+def cutoff_datetime():
+    """Batas arsip order (transaction_date, waktu tersimpan)."""
+    day = cutoff()
+    return business_time.day_start(day) if day else None
+
+
+def log_cutoff_datetime():
+    """Batas arsip inventory_logs (created_at, UTC)."""
+    day = cutoff()
+    return business_time.to_utc(datetime.combine(day, time.min)) if day else None
+
+
+def _is_open_bill(model):
+    return and_(model.payment_method == 'pending', model.status != 'cancelled')
+
+
+# =====================================================
+# PEMINDAHAN KE ARSIP
+# =====================================================
+def run(before, batch_size=DEFAULT_BATCH):
+    """
+    Arsipkan periode < `before` (date). Batas otomatis dimundurkan ke hari
+    open bill tertua (periode belum tertutup).
+    Return (ArchiveRun baru atau None jika batas tidak maju, (orders, items, logs) dipindah).
+    """
+    oldest_open = db.session.query(func.min(Order.transaction_date)).filter(_is_open_bill(Order)).scalar()
+    if oldest_open is not None:
+        before = min(before, business_time.business_day(oldest_open))
+
+    previous = cutoff()
+    archive_run = None
+    if previous is None or before > previous:
+        # A. Rollup hari yang diarsipkan + batas baru, 1 commit
+        sales_rollup.rebuild(previous, before)
+        archive_run = ArchiveRun(cutoff=before)
+        db.session.add(archive_run)
+        db.session.commit()
+
+    # B. Pindahkan per batch sampai batas terbaru (juga melanjutkan run yang terhenti)
+    moved = move_pending(batch_size)
+    if archive_run is not None:
+        archive_run.orders, archive_run.order_items, archive_run.inventory_logs = moved
+        db.session.commit()
+    return archive_run, moved
+
+
+def move_pending(batch_size=DEFAULT_BATCH):
+    """Pindahkan baris panas yang tanggalnya < cutoff. Return (orders, order_items, inventory_logs)."""
+    boundary = cutoff_datetime()
+    if boundary is None:
+        return 0, 0, 0
+    log_boundary = log_cutoff_datetime()
+
+    orders_moved = items_moved = logs_moved = 0
+    while True:
+        ids = [row_id for (row_id,) in db.session.query(Order.id)
+               .filter(Order.transaction_date < boundary, not_(_is_open_bill(Order)))
+               .order_by(Order.id).limit(batch_size).all()]
+        if not ids:
+            break
+        items_moved += _move(OrderItem, OrderItemArchive, ITEM_COLUMNS, OrderItem.order_id.in_(ids))
+        orders_moved += _move(Order, OrderArchive, ORDER_COLUMNS, Order.id.in_(ids),
+                              cleanup=[delete(OrderConsumption).where(OrderConsumption.order_id.in_(ids))])
+        db.session.commit()
+
+    while True:
+        ids = [row_id for (row_id,) in db.session.query(InventoryLog.id)
+               .filter(InventoryLog.created_at < log_boundary)
+               .order_by(InventoryLog.id).limit(batch_size).all()]
+        if not ids:
+            break
+        logs_moved += _move(InventoryLog, InventoryLogArchive, LOG_COLUMNS, InventoryLog.id.in_(ids))
+        db.session.commit()
+
+    return orders_moved, items_moved, logs_moved
+
+
+def _move(hot_model, archive_model, columns, condition, cleanup=()):
+    hot_table = hot_model.__table__
+    db.session.execute(
+        insert(archive_model.__table__).from_select(
+            columns, select(*[hot_table.c[name] for name in columns]).where(condition)
+        )
+    )
+    for statement in cleanup:
+        db.session.execute(statement)
+    return db.session.execute(delete(hot_table).where(condition)).rowcount
+
+
+def default_before(keep_days):
+    """Batas default: simpan `keep_days` hari terakhir di tabel panas."""
+    return business_time.today() - timedelta(days=keep_days)
@@ -0,0 +1,89 @@
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from flask import current_app, has_app_context
+from sqlalchemy import func, text
+
+# =====================================================
+# WAKTU BISNIS (WIB) vs WAKTU TERSIMPAN
+# =====================================================
+# Kolom waktu transaksi (orders.transaction_date, sales_sessions.start_time/
+# end_time) disimpan naive dalam STORAGE_TIMEZONE (default: zona jam server,
+# sama seperti datetime.now() yang selama ini dipakai route). Laporan & "hari
+# ini" dihitung dalam BUSINESS_TIMEZONE (default Asia/Jakarta): batas hari/jam
+# WIB dikonversi ke waktu tersimpan lalu dipakai sebagai predikat rentang
+# (kolom >= awal AND kolom < akhir) agar index transaction_date terpakai.
+# Kolom log internal (created_at) tetap UTC.
+
+DEFAULT_BUSINESS_TIMEZONE = 'Asia/Jakarta'
+
+
+def business_tz():
+    name = current_app.config.get('BUSINESS_TIMEZONE') if has_app_context() else None
+    return ZoneInfo(name or DEFAULT_BUSINESS_TIMEZONE)
+
+
+def storage_tz():
+    name = current_app.config.get('STORAGE_TIMEZONE') if has_app_context() else None
+    return ZoneInfo(name) if name else datetime.now().astimezone().tzinfo
+
+
+def now():
+    """Waktu sekarang untuk disimpan ke kolom waktu transaksi (naive, STORAGE_TIMEZONE)."""
+    return datetime.now(storage_tz()).replace(tzinfo=None)
+
+
+def today():
+    """Tanggal hari ini menurut zona bisnis (WIB)."""
+    return datetime.now(business_tz()).date()
+
+
+def to_storage(value):
+    """datetime aware -> naive STORAGE_TIMEZONE (untuk disimpan / dibandingkan dengan kolom)."""
+    return value.astimezone(storage_tz()).replace(tzinfo=None)
+
+
+def from_storage(value):
+    """Nilai kolom (naive STORAGE_TIMEZONE) -> datetime aware zona bisnis."""
+    return value.replace(tzinfo=storage_tz()).astimezone(business_tz())
+
+
+def business_day(value):
+    """Hari bisnis dari nilai kolom waktu transaksi."""
+    return from_storage(value).date()
+
+
+def day_start(day):
+    """Awal hari bisnis `day` (00:00 WIB) dalam waktu tersimpan, untuk predikat rentang."""
+    return to_storage(datetime.combine(day, time.min, tzinfo=business_tz()))
+
+
+def to_utc(value):
+    """Input naive waktu bisnis -> naive UTC (untuk kolom created_at log)."""
+    aware = value.replace(tzinfo=business_tz())
+    return aware.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def from_utc(value):
+    """Nilai kolom UTC (created_at, taken_at) -> naive waktu bisnis untuk ditampilkan."""
+    return value.replace(tzinfo=timezone.utc).astimezone(business_tz()).replace(tzinfo=None)
+
+
+def _offset_seconds():
+    # Selisih zona bisnis - zona tersimpan (WIB/WITA/WIT & UTC tanpa DST = konstan)
+    reference = datetime.now(timezone.utc)
+    business = reference.astimezone(business_tz()).utcoffset()
+    stored = reference.astimezone(storage_tz()).utcoffset()
+    return int((business - stored) / timedelta(seconds=1))
+
+
+def day_expression(column, dialect_name):
+    """
+    Ekspresi SQL hari bisnis dari kolom waktu tersimpan, untuk GROUP BY saat
+    rebuild rollup (memindai rentang penuh, bukan jalur laporan).
+    """
+    offset = _offset_seconds()
+    if not offset:
+        return func.date(column)
+    if dialect_name == 'mysql':
+        return func.date(func.date_add(column, text(f'INTERVAL {offset} SECOND')))
+    return func.date(column, f'{offset:+d} seconds')
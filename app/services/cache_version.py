@@ -0,0 +1,132 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy import insert, delete, select, func, bindparam, event
+from app.extensions import db
+from app.models import CacheInvalidation
+
+# =====================================================
+# VERSI CACHE LINTAS WORKER
+# =====================================================
+# Cache in-process (BOM, struk, antrian dapur, dst) tahu datanya basi dengan
+# membandingkan versi lokal dengan MAX(id) di tabel cache_invalidations.
+# Poll ke DB maksimal sekali per CACHE_VERSION_POLL_SECONDS per worker.
+# bump() hanya mencatat nama di session; barisnya ditulis SETELAH transaksi
+# pemanggil commit, di transaksi pendek sendiri. Auto-increment dibagikan
+# urut insert, bukan urut commit: kalau ditulis di dalam transaksi, bump
+# transaksi A (id 10) yang commit belakangan bisa tertutup bump B (id 11)
+# yang sudah terbaca worker lain, sehingga tulisan A tidak pernah
+# meng-invalidate apa pun. Dengan menulis setelah commit, setiap versi yang
+# terbaca selalu lebih baru dari semua data yang bump-nya sudah dimulai.
+# Tabel dijaga tetap kecil oleh poll itu sendiri: tiap
+# CACHE_VERSION_PRUNE_SECONDS, thread latar menghapus baris yang lebih lama
+# dari versi terbaru (yang sudah commit) tiap nama di koneksinya sendiri, jadi
+# tidak ikut / menunggu transaksi request yang sedang bump.
+# Sengaja bukan UPDATE 1 baris per nama: baris itu akan dikunci oleh setiap
+# order sampai commit.
+
+DEFAULT_POLL_SECONDS = 1.0
+DEFAULT_PRUNE_SECONDS = 60.0
+invalidations_table = CacheInvalidation.__table__
+
+
+class VersionWatcher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._last_poll = 0.0
+        self._last_prune = time.monotonic() # prune pertama setelah 1 interval penuh
+
+    def current(self, name):
+        """Versi terbaru untuk `name` (0 jika belum pernah di-invalidate)."""
+        interval = current_app.config.get('CACHE_VERSION_POLL_SECONDS', DEFAULT_POLL_SECONDS)
+        if time.monotonic() - self._last_poll >= interval:
+            self.poll()
+        return self._versions.get(name, 0)
+
+    def poll(self):
+        rows = db.session.query(CacheInvalidation.name, func.max(CacheInvalidation.id))\
+            .group_by(CacheInvalidation.name)\
+            .all()
+        prune_interval = current_app.config.get('CACHE_VERSION_PRUNE_SECONDS', DEFAULT_PRUNE_SECONDS)
+        with self._lock:
+            self._versions = dict(rows)
+            self._last_poll = time.monotonic()
+            prune_due = prune_interval > 0 and self._last_poll - self._last_prune >= prune_interval
+            if prune_due:
+                self._last_prune = self._last_poll
+        if prune_due and rows:
+            app = current_app._get_current_object()
+            threading.Thread(target=self._prune_in_background, args=(app,),
+                             name='cache-version-prune', daemon=True).start()
+
+    def _prune_in_background(self, app):
+        with app.app_context():
+            try:
+                prune()
+            except Exception as e:
+                app.logger.warning(f"Prune cache_invalidations gagal, diulang nanti: {e}")
+
+    def expire(self):
+        """Paksa poll berikutnya (dipakai setelah bump di worker ini)."""
+        self._last_poll = 0.0
+
+
+version_watcher = VersionWatcher()
+
+
+def prune():
+    """
+    Hapus baris lama: versi cukup MAX(id) per nama, jadi hanya baris terbaru
+    tiap nama yang perlu disimpan. Koneksi & transaksi sendiri: MAX(id) yang
+    dipakai hanya dari baris yang sudah commit. Return jumlah baris dihapus.
+    """
+    with db.engine.begin() as connection:
+        latest = connection.execute(
+            select(invalidations_table.c.name, func.max(invalidations_table.c.id))
+            .group_by(invalidations_table.c.name)
+        ).all()
+        if not latest:
+            return 0
+        return connection.execute(
+            delete(invalidations_table)
+            .where(invalidations_table.c.name == bindparam('target_name'))
+            .where(invalidations_table.c.id < bindparam('latest_id')),
+            [{'target_name': name, 'latest_id': latest_id} for name, latest_id in latest]
+        ).rowcount
+
+
+PENDING_KEY = 'cache_version_pending'
+
+
+def bump(*names):
+    """
+    Tandai cache `names` basi di semua worker. Ditulis setelah transaksi
+    pemanggil commit (dibuang jika transaksinya di-rollback).
+    """
+    db.session.info.setdefault(PENDING_KEY, set()).update(names)
+
+
+def _write(names):
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(insert(invalidations_table), [{'name': name} for name in sorted(names)])
+    except Exception as e:
+        # Data pemanggil sudah commit: jangan gagalkan request, cache menyusul di bump berikutnya
+        current_app.logger.error(f"Bump versi cache {sorted(names)} gagal: {e}")
+    version_watcher.expire()
+
+
+@event.listens_for(db.session, 'after_commit')
+def _after_commit(session):
+    if session.get_nested_transaction() is not None:
+        return # Commit SAVEPOINT: transaksi luar belum selesai
+    names = session.info.pop(PENDING_KEY, None)
+    if names:
+        _write(names)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _after_rollback(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,65 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import insert, delete
+from app.extensions import db
+from app.models import OrderConsumption, InventoryLog
+from app.services import stock
+from app.services.bom_cache import ingredient_demand
+
+# =====================================================
+# KONSUMSI BAHAN PER ORDER (UNTUK VOID / HAPUS)
+# =====================================================
+# Saat posting, kebutuhan bahan order (hasil resep saat itu) disimpan
+# sebagai 1 baris JSON. Pembatalan cukup membaca baris itu: 1 UPDATE stok
+# set-based + 1 bulk insert log, berapapun ukuran order/resepnya.
+# Order lama (sebelum tabel ini ada) jatuh ke perhitungan dari resep aktif.
+
+
+def encode(demand):
+    return json.dumps({str(i): str(demand[i]) for i in sorted(demand)}, separators=(',', ':'))
+
+
+def decode(movements):
+    return {int(i): Decimal(qty) for i, qty in json.loads(movements).items()}
+
+
+def record(posted):
+    """Simpan konsumsi bahan untuk [(order, plan), ...] dengan 1 bulk insert."""
+    rows = [{'order_id': order.id, 'movements': encode(plan.demand)} for order, plan in posted if plan.demand]
+    if rows:
+        db.session.execute(insert(OrderConsumption), rows)
+
+
+def consumed(order):
+    """{ingredient_id: qty} yang dipotong saat order dibuat."""
+    row = db.session.get(OrderConsumption, order.id)
+    if row is not None:
+        return decode(row.movements)
+    return ingredient_demand([(item.product_id, item.quantity) for item in order.items])
+
+
+def reverse(order, user_id, change_type='adjustment'):
+    """Kembalikan stok order ke gudang + catat log. Return {ingredient_id: qty}."""
+    restore_qty = consumed(order)
+    if not restore_qty:
+        return restore_qty
+
+    # Tambah stok balik (UPDATE atomik)
+    stock.restore(restore_qty)
+
+    # Catat Log Pengembalian (1 bulk insert)
+    now = datetime.utcnow()
+    db.session.execute(insert(InventoryLog), [{
+        'ingredient_id': ingredient_id,
+        'user_id': user_id,
+        'change_type': change_type,
+        'quantity_change': restore_qty[ingredient_id],
+        'created_at': now
+    } for ingredient_id in sorted(restore_qty)])
+    return restore_qty
+
+
+def forget(order_id):
+    """Hapus catatan konsumsi (order dihapus permanen)."""
+    db.session.execute(delete(OrderConsumption).where(OrderConsumption.order_id == order_id))
@@ -0,0 +1,270 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from sqlalchemy import insert, delete, func
+from app.extensions import db
+from app.models import Event
+from app.services import stock
+
+# =====================================================
+# EVENT REAL-TIME (OUTBOX + BROADCASTER SSE)
+# =====================================================
+# publish() menulis event ke tabel events di transaksi pemanggil, jadi event
+# hanya terkirim jika perubahan datanya ikut ter-commit. Tiap worker punya 1
+# thread broadcaster yang (hanya selama ada subscriber) membaca event baru
+# per EVENTS_POLL_SECONDS lalu membagikannya ke antrian tiap subscriber.
+# Subscriber yang antriannya penuh diputus; browser reconnect otomatis dengan
+# Last-Event-ID dan sisa event diputar ulang dari tabel.
+#
+# Riwayat yang tidak bisa diputar ulang utuh (lebih dari REPLAY_LIMIT event
+# atau sudah terhapus purge-events) tidak dikirim sebagian: client menerima
+# event resync dan wajib memuat ulang state lewat endpoint REST.
+#
+# EventSource tidak bisa mengirim header Authorization, jadi stream memakai
+# stream token (POST /events/token): bertanda tangan, berumur pendek
+# (EVENTS_TOKEN_SECONDS) dan hanya berlaku untuk stream. Access JWT tidak
+# pernah ditaruh di query string / access log.
+#
+# Stream SSE menahan koneksi HTTP lama: jalankan di worker gevent
+# (lihat README) agar subscriber idle tidak memakan 1 thread OS masing-masing.
+
+ORDER_CREATED = 'order_created'
+STATUS_CHANGED = 'status_changed'
+PAID = 'paid'
+VOIDED = 'voided'
+DELETED = 'deleted'
+LOW_STOCK = 'low_stock'
+RESYNC = 'resync'
+
+ALL_EVENTS = frozenset([ORDER_CREATED, STATUS_CHANGED, PAID, VOIDED, DELETED, LOW_STOCK])
+ROLE_EVENTS = {
+    'admin': ALL_EVENTS,
+    'cashier': ALL_EVENTS,
+    'kitchen': ALL_EVENTS - {PAID},
+}
+
+DEFAULT_POLL_SECONDS = 0.5
+# id event bisa ter-commit tidak berurutan (transaksi dengan id kecil commit
+# belakangan). Lubang id ditunggu selama ini sebelum dianggap rollback.
+GAP_GRACE_SECONDS = 5.0
+MAX_TRACKED_GAPS = 1000
+DEFAULT_SUBSCRIBER_QUEUE = 256
+REPLAY_LIMIT = 1000
+DEFAULT_TOKEN_SECONDS = 60
+STREAM_TOKEN_SALT = 'events-stream'
+
+
+# ---------- sisi penulis (di transaksi request) ----------
+def publish(event_type, payload):
+    publish_many([(event_type, payload)])
+
+
+def publish_many(events):
+    """Tulis [(event_type, payload dict), ...] dengan 1 bulk insert."""
+    if not events:
+        return
+    now = datetime.utcnow()
+    db.session.execute(insert(Event), [{
+        'event_type': event_type,
+        'payload': json.dumps(payload, separators=(',', ':')),
+        'created_at': now
+    } for event_type, payload in events])
+    broadcaster.wake()
+
+
+def order_payload(order):
+    return {
+        'order_id': order.id,
+        'invoice': order.invoice_no,
+        'status': order.status,
+        'payment': order.payment_method,
+        'customer': order.customer_name,
+        'total': float(order.total_amount)
+    }
+
+
+def publish_low_stock(demand):
+    """Event low_stock untuk bahan yang baru saja turun melewati batas menipis."""
+    crossed = stock.crossed_low(demand)
+    publish_many([(LOW_STOCK, {'ingredient_id': ingredient_id, 'name': name, 'stock': float(qty)})
+                  for ingredient_id, name, qty in crossed])
+
+
+def purge_older_than(days):
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = db.session.execute(delete(Event).where(Event.created_at < cutoff)).rowcount
+    db.session.commit()
+    return deleted
+
+
+def replay(after_id, until_id, event_types):
+    """Event (after_id, until_id] dari tabel untuk resume via Last-Event-ID.
+
+    None jika riwayat tidak bisa diputar ulang utuh (melebihi REPLAY_LIMIT
+    atau sebagian sudah di-purge): client harus resync.
+    """
+    oldest = db.session.query(func.min(Event.id)).scalar()
+    if oldest is not None and oldest > after_id + 1 and after_id < until_id:
+        return None # Event setelah after_id sudah terhapus
+    rows = db.session.query(Event.id, Event.event_type, Event.payload)\
+        .filter(Event.id > after_id, Event.id <= until_id, Event.event_type.in_(event_types))\
+        .order_by(Event.id)\
+        .limit(REPLAY_LIMIT + 1)\
+        .all()
+    if len(rows) > REPLAY_LIMIT:
+        return None
+    return [tuple(row) for row in rows]
+
+
+def resync_event(event_id):
+    """Pengganti backlog yang tidak utuh; id menggeser Last-Event-ID browser ke posisi subscribe."""
+    return format_sse(event_id, RESYNC, json.dumps({'last_event_id': event_id}, separators=(',', ':')))
+
+
+# ---------- stream token (pengganti access JWT di query string) ----------
+def _token_serializer(app):
+    return URLSafeTimedSerializer(app.config['SECRET_KEY'], salt=STREAM_TOKEN_SALT)
+
+
+def make_stream_token(app, user_id, role):
+    return _token_serializer(app).dumps({'uid': user_id, 'role': role})
+
+
+def read_stream_token(app, token):
+    """Claims {'uid', 'role'} dari stream token, None jika palsu/kedaluwarsa."""
+    max_age = app.config.get('EVENTS_TOKEN_SECONDS', DEFAULT_TOKEN_SECONDS)
+    try:
+        return _token_serializer(app).loads(token, max_age=max_age)
+    except (SignatureExpired, BadSignature):
+        return None
+
+
+def format_sse(event_id, event_type, payload):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+# ---------- sisi pembaca (broadcaster per worker) ----------
+class Subscriber:
+    def __init__(self, event_types, start_id, maxsize):
+        self.event_types = event_types
+        self.start_id = start_id
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+
+class Broadcaster:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._subscribers = set()
+        self._thread = None
+        self._pid = None
+        self._app = None
+        self.last_id = 0
+        self._gaps = {} # id yang terlewati -> waktu pertama terlihat
+        self.stats = {'subscribers': 0, 'delivered': 0, 'dropped_subscribers': 0, 'polls': 0}
+
+    def subscribe(self, app, event_types):
+        """Daftarkan subscriber (dipanggil di request). Event id > start_id dikirim ke antriannya."""
+        with self._lock:
+            if not self._subscribers:
+                # Broadcaster idle: mulai dari event terbaru (riwayat lewat replay)
+                self.last_id = db.session.query(func.coalesce(func.max(Event.id), 0)).scalar()
+                self._gaps.clear()
+            subscriber = Subscriber(event_types, self.last_id,
+                                    app.config.get('EVENTS_SUBSCRIBER_QUEUE', DEFAULT_SUBSCRIBER_QUEUE))
+            self._subscribers.add(subscriber)
+            self.stats['subscribers'] = len(self._subscribers)
+        self._ensure_thread(app)
+        self._wakeup.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            self.stats['subscribers'] = len(self._subscribers)
+
+    def wake(self):
+        """Event baru di worker ini: poll lebih cepat (setelah commit terbaca)."""
+        self._wakeup.set()
+
+    def _ensure_thread(self, app):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._app = app
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='sse-broadcaster', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        interval = self._app.config.get('EVENTS_POLL_SECONDS', DEFAULT_POLL_SECONDS)
+        while True:
+            if not self._subscribers:
+                self._wakeup.wait() # Tanpa subscriber: tidak ada query sama sekali
+            self._wakeup.wait(timeout=interval)
+            self._wakeup.clear()
+            if not self._subscribers:
+                continue
+            with self._app.app_context():
+                try:
+                    self._poll()
+                except Exception as e:
+                    db.session.rollback()
+                    self._app.logger.warning(f"Broadcaster SSE gagal membaca event: {e}")
+                finally:
+                    db.session.remove()
+
+    def _poll(self):
+        now = time.monotonic()
+        base = db.session.query(Event.id, Event.event_type, Event.payload)
+        rows = base.filter(Event.id > self.last_id).order_by(Event.id).limit(REPLAY_LIMIT).all()
+        late = []
+        if self._gaps:
+            late = base.filter(Event.id.in_(list(self._gaps))).order_by(Event.id).all()
+        # Fan-out di bawah lock: subscriber baru tidak bisa terselip di tengah batch
+        with self._lock:
+            self.stats['polls'] += 1
+            fresh = []
+            for row in late:
+                if self._gaps.pop(row[0], None) is not None:
+                    fresh.append(row)
+            for row in rows:
+                event_id = row[0]
+                if event_id <= self.last_id:
+                    continue # Sudah dibagikan / di bawah posisi reset
+                if len(self._gaps) < MAX_TRACKED_GAPS:
+                    for missing in range(self.last_id + 1, min(event_id, self.last_id + 1 + MAX_TRACKED_GAPS)):
+                        self._gaps.setdefault(missing, now)
+                self.last_id = event_id
+                fresh.append(row)
+            # Lubang yang terlalu lama = transaksi rollback, lupakan
+            for missing, seen in list(self._gaps.items()):
+                if now - seen > GAP_GRACE_SECONDS:
+                    del self._gaps[missing]
+
+            for event_id, event_type, payload in fresh:
+                for subscriber in self._subscribers:
+                    if subscriber.overflowed or event_type not in subscriber.event_types:
+                        continue
+                    try:
+                        subscriber.queue.put_nowait((event_id, event_type, payload))
+                        self.stats['delivered'] += 1
+                    except queue.Full:
+                        # Terlalu lambat: putuskan, client resume dari Last-Event-ID
+                        subscriber.overflowed = True
+                        try:
+                            subscriber.queue.get_nowait() # Beri ruang untuk tanda putus
+                        except queue.Empty:
+                            pass
+                        subscriber.queue.put_nowait(None)
+                        self.stats['dropped_subscribers'] += 1
+
+
+broadcaster = Broadcaster()
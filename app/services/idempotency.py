@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import IdempotencyKey
+
+# =====================================================
+# IDEMPOTENCY-KEY (ANTI DOBEL SAAT CLIENT RETRY)
+# =====================================================
+# Alur per request bertanda 'Idempotency-Key':
+# 1. Cek cache memori (respons yang sudah selesai) -> langsung replay.
+# 2. Sisipkan baris placeholder di transaksi request. Baris ini ikut commit
+#    bersama perubahan Order/Stok/Shift milik route, jadi efek bisnis dan
+#    "kunci sudah dipakai" selalu tersimpan bersamaan. Retry yang datang
+#    bersamaan akan bentrok di unique (user_id, key).
+# 3. Setelah route selesai, respons 2xx disimpan ke baris tsb (+ cache memori).
+#    Respons gagal: placeholder yang belum commit ikut hilang saat rollback,
+#    jadi client boleh mencoba lagi. Jika placeholder ternyata sudah commit
+#    (route sempat commit sebagian efeknya, mis. chunk batch order), respons
+#    gagal itu yang disimpan: retry tidak boleh mengulang efek yang tersimpan.
+# Hash body request ikut disimpan; kunci yang sama dengan body berbeda ditolak
+# (422), bukan di-replay dengan respons milik body lain.
+
+DEFAULT_TTL_HOURS = 24
+DEFAULT_CACHE_SIZE = 10000
+PURGE_BATCH_SIZE = 1000
+
+StoredResponse = tuple # (endpoint, request_hash, status_code, body)
+PARTIAL_FAILURE_BODY = json.dumps({
+    'message': 'Request gagal setelah sebagian perubahan tersimpan. Cek data sebelum mengirim ulang dengan Idempotency-Key baru.'
+})
+
+
+class IdempotencyConflict(Exception):
+    """Kunci sedang diproses request lain, atau dipakai untuk endpoint lain."""
+
+
+class IdempotencyMismatch(Exception):
+    """Kunci sudah dipakai untuk body request yang berbeda."""
+
+
+class IdempotencyStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = OrderedDict() # (user_id, key) -> (expires_at, StoredResponse)
+        self.stats = {'lookups': 0, 'memory_hits': 0, 'db_hits': 0, 'lookup_ms': 0.0}
+
+    # ---------- cache memori ----------
+    def _cache_get(self, cache_key):
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if not entry:
+                return None
+            if entry[0] <= datetime.utcnow():
+                del self._cache[cache_key]
+                return None
+            self._cache.move_to_end(cache_key)
+            return entry[1]
+
+    def _cache_put(self, cache_key, expires_at, stored):
+        limit = current_app.config.get('IDEMPOTENCY_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+        with self._lock:
+            self._cache[cache_key] = (expires_at, stored)
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > limit:
+                self._cache.popitem(last=False)
+
+    def _record(self, start, memory_hit=False, db_hit=False):
+        with self._lock:
+            self.stats['lookups'] += 1
+            self.stats['memory_hits'] += int(memory_hit)
+            self.stats['db_hits'] += int(db_hit)
+            self.stats['lookup_ms'] += (time.perf_counter() - start) * 1000
+
+    # ---------- alur utama ----------
+    def begin(self, user_id, key, endpoint, request_hash):
+        """
+        Return StoredResponse jika request ini replay, atau id placeholder
+        (int) jika request baru dan route boleh dijalankan.
+        """
+        start = time.perf_counter()
+        cache_key = (user_id, key)
+
+        stored = self._cache_get(cache_key)
+        if stored:
+            self._record(start, memory_hit=True)
+            return self._check(stored, endpoint, request_hash)
+
+        ttl = timedelta(hours=current_app.config.get('IDEMPOTENCY_TTL_HOURS', DEFAULT_TTL_HOURS))
+        now = datetime.utcnow()
+        placeholder = IdempotencyKey(user_id=user_id, key=key, endpoint=endpoint, request_hash=request_hash,
+                                     created_at=now, expires_at=now + ttl)
+        try:
+            db.session.add(placeholder)
+            db.session.flush()
+            self._record(start)
+            return placeholder.id
+        except IntegrityError:
+            db.session.rollback()
+
+        row = db.session.execute(
+            select(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        ).scalar_one_or_none()
+        self._record(start, db_hit=row is not None)
+
+        if row is None or row.expires_at <= now:
+            # Baris kedaluwarsa (belum di-purge) atau baru saja dihapus: pakai ulang
+            if row is not None:
+                db.session.delete(row)
+                db.session.commit()
+            return self.begin(user_id, key, endpoint, request_hash)
+
+        stored = (row.endpoint, row.request_hash, row.status_code, row.response_body)
+        self._check(stored, endpoint, request_hash)
+        if row.response_body is None:
+            raise IdempotencyConflict('Request dengan Idempotency-Key ini sedang/sudah diproses, coba lagi sebentar.')
+
+        self._cache_put(cache_key, row.expires_at, stored)
+        return stored
+
+    def _check(self, stored, endpoint, request_hash):
+        if stored[0] != endpoint:
+            raise IdempotencyConflict('Idempotency-Key ini sudah dipakai untuk endpoint lain.')
+        if stored[1] is not None and stored[1] != request_hash:
+            raise IdempotencyMismatch('Idempotency-Key ini sudah dipakai untuk isi request yang berbeda.')
+        return stored
+
+    def complete(self, placeholder_id, user_id, key, endpoint, request_hash, status_code, body):
+        """Simpan respons ke placeholder (commit terpisah yang kecil)."""
+        row = db.session.get(IdempotencyKey, placeholder_id)
+        if row is None:
+            # Route me-rollback transaksinya sendiri (placeholder ikut hilang) lalu
+            # commit lagi, mis. chunk batch berikutnya: tulis ulang kuncinya
+            ttl = timedelta(hours=current_app.config.get('IDEMPOTENCY_TTL_HOURS', DEFAULT_TTL_HOURS))
+            now = datetime.utcnow()
+            row = IdempotencyKey(user_id=user_id, key=key, endpoint=endpoint, request_hash=request_hash,
+                                 created_at=now, expires_at=now + ttl)
+            db.session.add(row)
+        row.status_code = status_code
+        row.response_body = body
+        stored = (endpoint, request_hash, status_code, body)
+        expires_at = row.expires_at
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback() # Kunci sudah diambil retry lain
+            return
+        self._cache_put((user_id, key), expires_at, stored)
+
+    def abandon(self, placeholder_id, user_id, key, endpoint, request_hash,
+                status_code=500, body=PARTIAL_FAILURE_BODY):
+        """
+        Route gagal. Placeholder yang belum commit hilang bersama rollback, jadi
+        client boleh mengulang. Placeholder yang sudah commit berarti sebagian
+        efek route tersimpan: respons gagal ini disimpan sebagai hasil kunci.
+        """
+        db.session.rollback()
+        if db.session.get(IdempotencyKey, placeholder_id) is None:
+            return
+        self.complete(placeholder_id, user_id, key, endpoint, request_hash, status_code, body)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['cached'] = len(self._cache)
+        return stats
+
+
+idempotency_store = IdempotencyStore()
+
+
+def purge_expired(batch_size=PURGE_BATCH_SIZE):
+    """Hapus kunci kedaluwarsa per batch (memakai index expires_at). Return jumlah."""
+    total = 0
+    now = datetime.utcnow()
+    while True:
+        ids = db.session.execute(
+            select(IdempotencyKey.id).where(IdempotencyKey.expires_at < now).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return total
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+        db.session.commit()
+        total += len(ids)
@@ -0,0 +1,66 @@
+import threading
+from sqlalchemy import func
+from app.extensions import db
+from app.models import Order, OrderItem, Product
+from app.services.cache_version import version_watcher
+
+# =====================================================
+# ANTRIAN DAPUR (MEMO PER VERSI)
+# =====================================================
+# Antrian dihitung dengan 1 query GROUP BY (order, produk) lalu disimpan di
+# memori worker. Order baru, ganti status, void & hapus memanggil
+# cache_version.bump('kitchen'); selama versi sama, poll layar dapur tidak
+# menyentuh tabel orders sama sekali.
+
+KITCHEN_VERSION = 'kitchen'
+OPEN_STATUSES = ('pending', 'cooking')
+
+
+class KitchenQueue:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None # (versi, tasks)
+
+    def tasks(self):
+        version = version_watcher.current(KITCHEN_VERSION)
+        state = self._state
+        if state is not None and state[0] == version:
+            return state[1]
+
+        with self._lock:
+            if self._state is None or self._state[0] != version:
+                self._state = (version, self._build())
+            return self._state[1]
+
+    def reset(self):
+        self._state = None
+
+    def _build(self):
+        rows = db.session.query(
+            Product.name, Order.id, Order.invoice_no, Order.status, Order.customer_name,
+            func.sum(OrderItem.quantity)
+        ).join(OrderItem, OrderItem.order_id == Order.id)\
+            .join(Product, Product.id == OrderItem.product_id)\
+            .filter(Order.status.in_(OPEN_STATUSES))\
+            .group_by(Order.id, Order.transaction_date, Order.invoice_no, Order.status,
+                      Order.customer_name, Product.id, Product.name)\
+            .order_by(Order.transaction_date.asc(), Order.id.asc())\
+            .all()
+
+        kitchen_tasks = {}
+        listed = set() # (menu, order_id): 1 invoice tidak muncul 2x di menu yg sama
+        for menu_name, order_id, invoice_no, status, customer_name, qty in rows:
+            task = kitchen_tasks.setdefault(menu_name, {'total_qty': 0, 'orders': []})
+            task['total_qty'] += int(qty)
+            if (menu_name, order_id) not in listed:
+                listed.add((menu_name, order_id))
+                task['orders'].append({
+                    'id': order_id,           # PENTING: Untuk tombol klik
+                    'invoice': invoice_no,
+                    'status': status,
+                    'customer': customer_name # PENTING: Untuk warna tombol
+                })
+        return kitchen_tasks
+
+
+kitchen_queue = KitchenQueue()
@@ -0,0 +1,281 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+# =====================================================
+# METRIK PER ENDPOINT (LATENSI, SQL & TUNGGU POOL)
+# =====================================================
+# Hook before/after_request mengukur latensi tiap route (histogram per
+# endpoint Flask, mis. 'sales.create_order'). Event engine SQLAlchemy
+# menghitung jumlah & waktu statement SQL milik request yang sedang jalan
+# (thread-local, digabung sekali di after_request); SQL di luar request
+# (flusher, startup, CLI) masuk endpoint '(background)'. Pool koneksi diganti
+# TimedQueuePool agar lama menunggu koneksi ikut terukur.
+#
+# Antar worker gunicorn: tiap proses menyimpan angkanya di memori lalu thread
+# latar menulis <pid>.json ke METRICS_DIR tiap METRICS_FLUSH_SECONDS.
+# /admin/metrics menjumlahkan semua file (format teks Prometheus). File worker
+# yang sudah mati tetap dibaca agar counter tidak turun; worker baru dengan
+# pid sama melanjutkan angka dari file lamanya. `flask reset-metrics`
+# mengosongkan direktori (mis. saat deploy).
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+BACKGROUND = '(background)'
+UNMATCHED = '(unmatched)'
+DEFAULT_FLUSH_SECONDS = 5.0
+
+# nama: (tipe, label, bucket histogram, keterangan)
+DEFINITIONS = {
+    'http_requests_total': ('counter', ('endpoint', 'method', 'status'), None,
+                            'Jumlah request per endpoint, method & status HTTP.'),
+    'http_request_duration_seconds': ('histogram', ('endpoint', 'method'), LATENCY_BUCKETS,
+                                      'Latensi request per endpoint.'),
+    'db_statements_total': ('counter', ('endpoint',), None,
+                            'Jumlah statement SQL per endpoint.'),
+    'db_statement_seconds_total': ('counter', ('endpoint',), None,
+                                   'Total waktu eksekusi statement SQL per endpoint.'),
+    'db_pool_checkout_wait_seconds': ('histogram', (), POOL_WAIT_BUCKETS,
+                                      'Waktu menunggu koneksi dari pool.'),
+    'response_cache_requests_total': ('counter', ('endpoint', 'result'), None,
+                                      'Request ber-@cached_response per endpoint: hit / miss.'),
+    'response_cache_evictions_total': ('counter', ('backend',), None,
+                                       'Entri cache respon yang dibuang karena penuh.'),
+}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool yang mencatat lama checkout (antri + buka koneksi baru bila perlu)."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            metrics.observe('db_pool_checkout_wait_seconds', (), time.perf_counter() - start)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._values = {name: {} for name in DEFINITIONS}
+        self._app = None
+        self._dir = None
+        self._pid = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._listening = False
+
+    def init_app(self, app):
+        """Pasang hook request & pool bertimer. Panggil SEBELUM db.init_app."""
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        self._app = app
+        self._dir = app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+        self._pid = os.getpid()
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).setdefault('poolclass', TimedQueuePool)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            atexit.register(self.shutdown)
+            self._listening = True
+
+    # ---------- sisi request ----------
+    def _before_request(self):
+        self._local.sql = [0, 0.0]
+        self._local.start = time.perf_counter()
+
+    def _after_request(self, response):
+        elapsed = time.perf_counter() - self._local.start
+        statements, sql_seconds = self._local.sql
+        self._local.sql = None
+        endpoint = request.endpoint or UNMATCHED
+        method = request.method
+        with self._lock:
+            self._inc('http_requests_total', (endpoint, method, str(response.status_code)), 1)
+            self._observe('http_request_duration_seconds', (endpoint, method), elapsed)
+            if statements:
+                self._inc('db_statements_total', (endpoint,), statements)
+                self._inc('db_statement_seconds_total', (endpoint,), sql_seconds)
+        self._ensure_thread()
+        return response
+
+    def record_sql(self, seconds):
+        current = getattr(self._local, 'sql', None)
+        if current is not None:
+            current[0] += 1
+            current[1] += seconds
+            return
+        with self._lock:
+            self._inc('db_statements_total', (BACKGROUND,), 1)
+            self._inc('db_statement_seconds_total', (BACKGROUND,), seconds)
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self._inc(name, labels, amount)
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            self._observe(name, labels, value)
+
+    # ---------- penyimpanan (panggil dengan _lock) ----------
+    def _inc(self, name, labels, amount):
+        values = self._values[name]
+        values[labels] = values.get(labels, 0) + amount
+
+    def _observe(self, name, labels, value):
+        buckets = DEFINITIONS[name][2]
+        counts = self._values[name].get(labels)
+        if counts is None:
+            # bucket non-kumulatif (+Inf di akhir) lalu total nilai
+            counts = self._values[name][labels] = [0] * (len(buckets) + 1) + [0.0]
+        counts[bisect_left(buckets, value)] += 1
+        counts[-1] += value
+
+    # ---------- berbagi antar worker ----------
+    def _path(self, pid):
+        return os.path.join(self._dir, f'{pid}.json')
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # Proses hasil fork (preload): angka induk bukan milik worker ini
+                self._values = {name: {} for name in DEFINITIONS}
+                self._pid = os.getpid()
+            # Lanjutkan angka worker lama yang kebetulan ber-pid sama agar counter tidak turun
+            _merge(self._values, _read(self._path(self._pid)))
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='metrics-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        interval = self._app.config.get('METRICS_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except OSError as e:
+                self._app.logger.warning(f"Metrik gagal ditulis, diulang nanti: {e}")
+
+    def flush(self):
+        """Tulis angka proses ini ke <pid>.json (atomic replace)."""
+        if self._dir is None:
+            return
+        with self._lock:
+            payload = {name: [[*labels, value] for labels, value in values.items()]
+                       for name, values in self._values.items()}
+        os.makedirs(self._dir, exist_ok=True)
+        path = self._path(os.getpid())
+        with open(path + '.tmp', 'w') as handle:
+            json.dump(payload, handle, separators=(',', ':'))
+        os.replace(path + '.tmp', path)
+
+    def shutdown(self):
+        if self._thread is not None and self._pid == os.getpid():
+            self._stop.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            self.flush()
+        except OSError:
+            pass
+
+    def collect(self):
+        """Gabungan angka semua worker: {nama: {label: nilai}}."""
+        self.flush()
+        combined = {name: {} for name in DEFINITIONS}
+        for path in glob.glob(os.path.join(self._dir, '*.json')):
+            _merge(combined, _read(path))
+        return combined
+
+    def reset(self):
+        """Kosongkan angka proses ini & semua file worker. Return jumlah file dihapus."""
+        with self._lock:
+            self._values = {name: {} for name in DEFINITIONS}
+        removed = 0
+        for path in glob.glob(os.path.join(self._dir, '*.json')):
+            os.remove(path)
+            removed += 1
+        return removed
+
+    def render(self):
+        """Format teks Prometheus (exposition format 0.0.4)."""
+        lines = []
+        for name, values in self.collect().items():
+            kind, label_names, buckets, description = DEFINITIONS[name]
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(values.items()):
+                pairs = list(zip(label_names, labels))
+                if kind == 'counter':
+                    lines.append(f'{name}{_labels(pairs)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), value[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(pairs + [("le", _number(bound))])} {cumulative}')
+                lines.append(f'{name}_sum{_labels(pairs)} {_number(value[-1])}')
+                lines.append(f'{name}_count{_labels(pairs)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _read(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _merge(target, payload):
+    for name, entries in payload.items():
+        if name not in target:
+            continue
+        values = target[name]
+        for entry in entries:
+            labels, value = tuple(entry[:-1]), entry[-1]
+            current = values.get(labels)
+            if current is None:
+                values[labels] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                values[labels] = [a + b for a, b in zip(current, value)]
+            else:
+                values[labels] = current + value
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    if isinstance(value, str):
+        return value
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+metrics = Metrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics.record_sql(time.perf_counter() - context._metrics_start)
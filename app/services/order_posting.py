@@ -0,0 +1,222 @@
+from collections import namedtuple
+from decimal import Decimal
+from sqlalchemy import insert
+from app.extensions import db
+from app.models import Product, Ingredient, Order, OrderItem, InventoryLog
+from app.services import stock, shift_ledger, consumption, sales_rollup, business_time
+from app.services.bom_cache import bom_cache
+from app.services.invoice import invoice_allocator
+
+# =====================================================
+# ENGINE POSTING ORDER (SET-BASED)
+# =====================================================
+# Semua produk & bahan untuk 1 keranjang diambil dengan jumlah query yang
+# tetap (tidak tergantung banyaknya baris keranjang); resep dari BOM cache.
+# Kebutuhan bahan dijumlahkan dulu per bahan, baru dicek & dipotong sekali
+# per bahan.
+
+PlannedLine = namedtuple('PlannedLine', ['product_id', 'quantity', 'price_at_sale', 'cogs_at_sale'])
+OrderPlan = namedtuple('OrderPlan', ['lines', 'demand', 'total_amount', 'ingredients'])
+Catalog = namedtuple('Catalog', ['products', 'boms', 'ingredients'])
+
+
+class OrderPostingError(Exception):
+    """Keranjang tidak valid (produk tidak ada / qty salah)."""
+
+
+def parse_cart(items_req):
+    """Ubah [{'product_id': 1, 'qty': 2}, ...] menjadi list (product_id, qty)."""
+    lines = []
+    for item in items_req:
+        try:
+            product_id = int(item['product_id'])
+            qty = int(item['qty'])
+        except (KeyError, TypeError, ValueError):
+            raise OrderPostingError(f"Format item tidak valid: {item}")
+        if qty < 1:
+            raise OrderPostingError(f"Qty produk ID {product_id} harus lebih dari 0")
+        lines.append((product_id, qty))
+    return lines
+
+
+def load_catalog(product_ids):
+    """Produk, BOM & bahan (avg_cost) untuk sekumpulan produk: 2 query."""
+    products = {p.id: p for p in Product.query.filter(Product.id.in_(product_ids)).all()}
+
+    boms = bom_cache.get_many(products.keys())
+    ingredient_ids = {line.ingredient_id for bom in boms.values() for line in bom}
+    ingredients = {}
+    if ingredient_ids:
+        ingredients = {i.id: i for i in Ingredient.query.filter(Ingredient.id.in_(ingredient_ids)).all()}
+
+    return Catalog(products, boms, ingredients)
+
+
+def plan_order(lines, catalog=None):
+    """Hitung harga, HPP & total kebutuhan bahan untuk keranjang (2 query)."""
+    catalog = catalog or load_catalog({product_id for product_id, _ in lines})
+
+    for product_id, _ in lines:
+        if product_id not in catalog.products:
+            raise OrderPostingError(f"Produk ID {product_id} tidak ditemukan")
+
+    # HPP per porsi & agregasi kebutuhan bahan lintas baris keranjang
+    planned = []
+    demand = {}
+    total_amount = Decimal('0')
+    for product_id, qty in lines:
+        menu_cogs = Decimal('0')
+        for line in catalog.boms[product_id]:
+            demand[line.ingredient_id] = demand.get(line.ingredient_id, Decimal('0')) + line.quantity_needed * qty
+            menu_cogs += Decimal(catalog.ingredients[line.ingredient_id].avg_cost or 0) * line.quantity_needed
+
+        price_at_sale = Decimal(catalog.products[product_id].price)
+        planned.append(PlannedLine(product_id, qty, price_at_sale, menu_cogs))
+        total_amount += price_at_sale * qty
+
+    return OrderPlan(planned, demand, total_amount, catalog.ingredients)
+
+
+def write_order_rows(posted, user_id):
+    """Tulis OrderItem & InventoryLog (atau jurnal) untuk [(order, plan), ...] dengan 2 bulk insert."""
+    db.session.execute(insert(OrderItem), [{
+        'order_id': order.id,
+        'product_id': line.product_id,
+        'quantity': line.quantity,
+        'price_at_sale': line.price_at_sale,
+        'cogs_at_sale': line.cogs_at_sale
+    } for order, plan in posted for line in plan.lines])
+
+    # Konsumsi bahan per order (untuk void/hapus tanpa menghitung ulang resep)
+    consumption.record(posted)
+
+    log_rows = [{
+        'ingredient_id': ingredient_id,
+        'user_id': user_id,
+        'change_type': 'production',
+        'quantity_change': -plan.demand[ingredient_id]
+    } for order, plan in posted for ingredient_id in sorted(plan.demand)]
+    if log_rows:
+        db.session.execute(insert(InventoryLog), log_rows)
+
+
+def apply_order_plan(order, plan, user_id):
+    """Potong stok lalu tulis OrderItem & InventoryLog dengan bulk insert."""
+    # Potong stok atomik & bersyarat (1 UPDATE, lihat services.stock)
+    stock.deduct(plan.demand)
+    write_order_rows([(order, plan)], user_id)
+
+
+def _new_order(user_id, active_session, plan, payment_method, customer_name, transaction_date, invoice_no=None):
+    return Order(
+        invoice_no=invoice_no or invoice_allocator.next_invoice(transaction_date),
+        user_id=user_id,
+        session_id=active_session.id,
+        payment_method=payment_method,
+        status='pending',
+        customer_name=customer_name,
+        total_amount=plan.total_amount,
+        transaction_date=transaction_date
+    )
+
+
+def _add_to_shift(active_session, posted):
+    # Catat Penjualan di buku besar Shift ini (hanya yang langsung lunas)
+    shift_ledger.record_sales(active_session.id, [order for order, plan in posted])
+
+
+def post_order(user_id, active_session, items_req, payment_method='cash',
+               customer_name='Pelanggan Umum', transaction_date=None, catalog=None):
+    """
+    Posting 1 order lengkap di transaksi aktif (tanpa commit):
+    invoice, header order, potong stok, item & log, total shift & rollup harian.
+    Dipakai oleh POST /sales/orders dan /sales/orders/batch.
+    """
+    transaction_date = transaction_date or business_time.now()
+    plan = plan_order(parse_cart(items_req), catalog)
+
+    order = _new_order(user_id, active_session, plan, payment_method, customer_name, transaction_date)
+    db.session.add(order)
+    db.session.flush() # Agar order.id terbentuk
+
+    apply_order_plan(order, plan, user_id)
+    _add_to_shift(active_session, [(order, plan)])
+    sales_rollup.record_sales([(order, plan)])
+
+    return order, plan
+
+
+# =====================================================
+# POSTING BANYAK ORDER SEKALIGUS (BATCH / OFFLINE)
+# =====================================================
+def post_order_chunk(user_id, active_session, entries):
+    """
+    Posting 1 chunk order di transaksi aktif (tanpa commit).
+    entries: [(transaction_date, items_req, payment_method, customer_name), ...]
+    Return list sejajar entries berisi (order, plan) atau Exception.
+
+    Jalur cepat: katalog dimuat sekali per chunk, stok dipotong dengan 1 UPDATE
+    bersyarat untuk total kebutuhan chunk, item & log ditulis dengan 2 bulk
+    insert. Jika stok chunk tidak cukup, chunk diulang per order (savepoint)
+    agar hanya order yang kekurangan stok yang gagal.
+    """
+    results = [None] * len(entries)
+
+    # A. Validasi keranjang & katalog bersama
+    carts = {}
+    for index, (_, items_req, _, _) in enumerate(entries):
+        try:
+            carts[index] = parse_cart(items_req)
+        except OrderPostingError as e:
+            results[index] = e
+    catalog = load_catalog({product_id for lines in carts.values() for product_id, _ in lines})
+
+    plans = {}
+    for index, lines in carts.items():
+        try:
+            plans[index] = plan_order(lines, catalog)
+        except OrderPostingError as e:
+            results[index] = e
+    if not plans:
+        return results # Semua order chunk ditolak validasi: tidak ada yang ditulis
+
+    # B. Jalur cepat: 1 potong stok untuk seluruh chunk
+    total_demand = {}
+    for plan in plans.values():
+        for ingredient_id, qty in plan.demand.items():
+            total_demand[ingredient_id] = total_demand.get(ingredient_id, Decimal('0')) + qty
+
+    try:
+        with db.session.begin_nested():
+            stock.deduct(total_demand)
+            invoices = invoice_allocator.next_invoices([entries[index][0] for index in plans])
+            posted = []
+            for (index, plan), invoice_no in zip(plans.items(), invoices):
+                transaction_date, _, payment_method, customer_name = entries[index]
+                order = _new_order(user_id, active_session, plan, payment_method, customer_name,
+                                   transaction_date, invoice_no)
+                db.session.add(order)
+                posted.append((index, order, plan))
+            db.session.flush()
+
+            write_order_rows([(order, plan) for _, order, plan in posted], user_id)
+            _add_to_shift(active_session, [(order, plan) for _, order, plan in posted])
+            sales_rollup.record_sales([(order, plan) for _, order, plan in posted])
+
+        for index, order, plan in posted:
+            results[index] = (order, plan)
+        return results
+
+    except stock.InsufficientStockError:
+        pass
+
+    # C. Jalur lambat: stok chunk kurang, posting satu per satu (urut waktu)
+    for index, plan in plans.items():
+        transaction_date, items_req, payment_method, customer_name = entries[index]
+        try:
+            with db.session.begin_nested():
+                results[index] = post_order(user_id, active_session, items_req, payment_method,
+                                            customer_name, transaction_date, catalog)
+        except Exception as e:
+            results[index] = e
+    return results
@@ -0,0 +1,72 @@
+import base64
+from datetime import datetime
+from flask import request
+from sqlalchemy import tuple_
+
+# =====================================================
+# KEYSET PAGINATION (transaction_date, id)
+# =====================================================
+# Halaman berikutnya dicari dengan WHERE (tanggal, id) < (cursor) memakai
+# index komposit, bukan OFFSET. Halaman ke-1000 sama murahnya dengan
+# halaman pertama. Cursor dikirim balik lewat header 'X-Next-Cursor'.
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class PaginationError(ValueError):
+    """Parameter cursor/limit tidak valid (dibalas 400 oleh route)."""
+
+
+def encode_cursor(transaction_date, row_id):
+    raw = f"{transaction_date.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        stamp, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(stamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise PaginationError('Cursor tidak valid.')
+
+
+def page_args(default_limit=DEFAULT_LIMIT, max_limit=MAX_LIMIT):
+    """
+    Baca ?cursor=&limit= dari request. Return (cursor | None, limit).
+    default_limit=None: tanpa ?limit= & ?cursor= tidak dipaginasi (limit None).
+    """
+    cursor = request.args.get('cursor')
+    if default_limit is None:
+        if 'limit' not in request.args and not cursor:
+            return None, None
+        default_limit = DEFAULT_LIMIT
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except ValueError:
+        raise PaginationError('limit harus angka.')
+    if limit < 1:
+        raise PaginationError('limit minimal 1.')
+
+    return (decode_cursor(cursor) if cursor else None), min(limit, max_limit)
+
+
+def keyset_page(query, date_column, id_column, cursor, limit):
+    """
+    Ambil 1 halaman terbaru-dulu dari `query` (limit None = semua baris).
+    Return (rows, next_cursor | None). Baris harus punya atribut kolom tsb.
+    """
+    if cursor:
+        query = query.filter(tuple_(date_column, id_column) < cursor)
+    query = query.order_by(date_column.desc(), id_column.desc())
+    if limit is None:
+        return query.all(), None
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, date_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
@@ -0,0 +1,63 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import current_app
+from app.services.cache_version import version_watcher
+
+# =====================================================
+# CACHE STRUK (PAYLOAD JADI + ETAG)
+# =====================================================
+# invoice_no -> (etag, body JSON). Hanya struk yang sudah lunas/dibatalkan
+# yang disimpan: isinya tidak berubah lagi kecuali di-void atau dihapus.
+# Void/hapus memanggil invalidate() (worker ini) + bump('receipts') agar
+# worker lain mengosongkan cache-nya pada poll versi berikutnya.
+
+RECEIPT_VERSION = 'receipts'
+DEFAULT_CACHE_SIZE = 2000
+
+
+def make_etag(body):
+    """ETag kuat (tanpa tanda kutip) dari isi payload: byte-identik = ETag sama."""
+    return hashlib.sha1(body).hexdigest()
+
+
+class ReceiptCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+
+    def get(self, invoice_no):
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get(invoice_no)
+            if entry is not None:
+                self._entries.move_to_end(invoice_no)
+            return entry
+
+    def put(self, invoice_no, etag, body):
+        limit = current_app.config.get('RECEIPT_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+        with self._lock:
+            self._entries[invoice_no] = (etag, body)
+            self._entries.move_to_end(invoice_no)
+            while len(self._entries) > limit:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, invoice_no):
+        with self._lock:
+            self._entries.pop(invoice_no, None)
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def _check_version(self):
+        version = version_watcher.current(RECEIPT_VERSION)
+        if version != self._version:
+            with self._lock:
+                self._entries.clear()
+                self._version = version
+
+
+receipt_cache = ReceiptCache()
@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app, request
+from app.services import business_time
+from app.services.cache_version import version_watcher
+from app.services.metrics import metrics
+
+# =====================================================
+# CACHE RESPON GET BERTAG (DASHBOARD, MENU, STOK, LAPORAN)
+# =====================================================
+# @cached_response(tag, ...) menyimpan respons 200 per URL (path + query
+# string). Tag = nama versi di cache_invalidations (services.cache_version):
+# route tulis memanggil bump(tag) di transaksinya, entri yang disimpan dengan
+# versi tag lama otomatis dianggap basi. Worker lain melihat bump paling lambat
+# CACHE_VERSION_POLL_SECONDS, worker yang menulis langsung.
+#
+# Backend (RESPONSE_CACHE_BACKEND):
+# - 'memory': LRU per worker (RESPONSE_CACHE_SIZE entri).
+# - 'sqlite': file SQLite lokal (RESPONSE_CACHE_PATH) dipakai bersama semua
+#   worker di 1 host; entri terlama dibuang saat melebihi RESPONSE_CACHE_SIZE.
+# - 'off': tanpa cache.
+# Hit/miss/eviction: snapshot() per worker & counter di /admin/metrics.
+
+ORDERS_TAG = 'orders'
+INGREDIENTS_TAG = 'ingredients'
+PRODUCTS_TAG = 'products'
+RECIPES_TAG = 'recipes'
+USERS_TAG = 'users'
+EXPENSES_TAG = 'expenses'
+
+DEFAULT_BACKEND = 'memory'
+DEFAULT_CACHE_SIZE = 500
+TRIM_EVERY = 50 # backend sqlite: cek jumlah entri tiap n penyimpanan
+
+Entry = namedtuple('Entry', ['versions', 'expires_at', 'status', 'mimetype', 'body'])
+
+
+class MemoryBackend:
+    name = 'memory'
+
+    def __init__(self, max_entries):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        """Simpan entri. Return jumlah entri lain yang dibuang."""
+        evicted = 0
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SqliteBackend:
+    name = 'sqlite'
+
+    def __init__(self, path, max_entries):
+        self._path = path
+        self._max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stores = 0
+
+    def _connection(self):
+        # 1 koneksi per thread & per proses (koneksi tidak boleh ikut fork)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=1.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS response_cache ('
+                'key TEXT PRIMARY KEY, versions TEXT NOT NULL, expires_at REAL, '
+                'status INTEGER NOT NULL, mimetype TEXT, body BLOB NOT NULL, stored_at REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_response_cache_stored_at ON response_cache (stored_at)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT versions, expires_at, status, mimetype, body FROM response_cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        versions, expires_at, status, mimetype, body = row
+        return Entry(tuple(json.loads(versions)), expires_at, status, mimetype, body)
+
+    def set(self, key, entry):
+        connection = self._connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO response_cache (key, versions, expires_at, status, mimetype, body, stored_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (key, json.dumps(entry.versions), entry.expires_at, entry.status, entry.mimetype, entry.body, time.time())
+        )
+        with self._lock:
+            self._stores += 1
+            if self._stores % TRIM_EVERY:
+                return 0
+        return connection.execute(
+            'DELETE FROM response_cache WHERE key IN ('
+            'SELECT key FROM response_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)', (self._max_entries,)
+        ).rowcount
+
+    def clear(self):
+        self._connection().execute('DELETE FROM response_cache')
+
+
+class ResponseCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._backend = None
+        self._settings = None
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'errors': 0}
+
+    def _get_backend(self):
+        config = current_app.config
+        kind = config.get('RESPONSE_CACHE_BACKEND', DEFAULT_BACKEND)
+        size = config.get('RESPONSE_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+        path = config.get('RESPONSE_CACHE_PATH') or os.path.join(current_app.instance_path, 'response_cache.db')
+        settings = (kind, size, path)
+        if settings != self._settings:
+            with self._lock:
+                if settings != self._settings:
+                    if kind == 'memory':
+                        self._backend = MemoryBackend(size)
+                    elif kind == 'sqlite':
+                        self._backend = SqliteBackend(path, size)
+                    else:
+                        self._backend = None
+                    self._settings = settings
+        return self._backend
+
+    def serve(self, tags, ttl, view, per_day=False):
+        """Layani respons dari cache jika versi semua tag masih sama, jika tidak jalankan `view`."""
+        backend = self._get_backend()
+        if backend is None:
+            return view()
+
+        key = request.full_path
+        if per_day:
+            key = f"{business_time.today().isoformat()}|{key}"
+        # Versi dibaca SEBELUM view jalan: tulis yang terjadi di tengah membuat entri ini basi
+        versions = tuple(version_watcher.current(tag) for tag in tags)
+        try:
+            entry = backend.get(key)
+        except sqlite3.Error as e:
+            entry = None
+            self._error(e)
+
+        if entry is not None and entry.versions == versions and \
+                (entry.expires_at is None or entry.expires_at > time.time()):
+            self._count('hits', request.endpoint, 'hit')
+            response = current_app.response_class(entry.body, status=entry.status, mimetype=entry.mimetype)
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        self._count('misses', request.endpoint, 'miss')
+        response = current_app.make_response(view())
+        if response.status_code == 200 and not response.is_streamed:
+            entry = Entry(versions, time.time() + ttl if ttl else None, response.status_code,
+                          response.mimetype, response.get_data())
+            try:
+                evicted = backend.set(key, entry)
+            except sqlite3.Error as e:
+                self._error(e)
+            else:
+                with self._lock:
+                    self.stats['stores'] += 1
+                    self.stats['evictions'] += evicted
+                if evicted:
+                    metrics.inc('response_cache_evictions_total', (backend.name,), evicted)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+
+    def _count(self, stat, endpoint, result):
+        with self._lock:
+            self.stats[stat] += 1
+        metrics.inc('response_cache_requests_total', (endpoint, result), 1)
+
+    def _error(self, e):
+        with self._lock:
+            self.stats['errors'] += 1
+        current_app.logger.warning(f"Cache respon gagal diakses, dilewati: {e}")
+
+    def reset(self):
+        """Kosongkan cache (mis. setelah database dibuat ulang di benchmark)."""
+        backend = self._backend
+        if backend is not None:
+            backend.clear()
+        with self._lock:
+            self._backend = None
+            self._settings = None
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+response_cache = ResponseCache()
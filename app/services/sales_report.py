@@ -0,0 +1,113 @@
+from bisect import bisect_right
+from datetime import datetime, time, timedelta, timezone
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import func, and_, union_all, select
+from app.extensions import db
+from app.models import Order, OrderArchive, DailySalesRollup
+from app.services import business_time, sales_rollup
+
+# =====================================================
+# LAPORAN PENJUALAN PER JAM / HARI / MINGGU / BULAN (WIB)
+# =====================================================
+# Bucket dihitung di zona bisnis (BUSINESS_TIMEZONE) dan selalu diisi lengkap:
+# periode tanpa penjualan tetap muncul dengan angka 0.
+# - 'day' / 'week' / 'month': dibaca dari daily_sales_rollup (PK hari, maks
+#   ~366 baris per tahun) lalu dijumlahkan per minggu (Senin) / bulan di
+#   Python, jadi rentang bertahun-tahun tidak menyentuh tabel orders.
+# - 'hour': batas jam WIB dikonversi ke waktu tersimpan, baris order dibaca
+#   dengan predikat rentang transaction_date (index) dari tabel panas/arsip
+#   lalu dimasukkan ke bucket dengan bisect. Rentang dibatasi
+#   REPORT_HOURLY_MAX_DAYS hari.
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+DEFAULT_HOURLY_MAX_DAYS = 31
+
+
+def hourly_max_days():
+    return current_app.config.get('REPORT_HOURLY_MAX_DAYS', DEFAULT_HOURLY_MAX_DAYS)
+
+
+def first_day():
+    """Hari bisnis pertama yang punya data rollup (None = belum ada penjualan)."""
+    return db.session.query(func.min(DailySalesRollup.day)).scalar()
+
+
+def _bucket_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def _empty(label):
+    return {'period': label, 'total_transactions': 0, 'revenue': Decimal('0')}
+
+
+def _daily_series(start_day, end_day, granularity):
+    series = []
+    index = {}
+    bucket = _bucket_start(start_day, granularity)
+    while bucket <= end_day:
+        index[bucket] = len(series)
+        series.append(_empty(bucket.strftime('%Y-%m-%d')))
+        bucket = _next_bucket(bucket, granularity)
+
+    for day, (revenue, trx, _) in sales_rollup.by_day(start_day, end_day).items():
+        row = series[index[_bucket_start(day, granularity)]]
+        row['total_transactions'] += trx
+        row['revenue'] += revenue
+    return series
+
+
+def _hourly_series(start_day, end_day):
+    # Jam dilangkahkan di UTC agar benar juga untuk zona ber-DST (1 jam = 1 bucket)
+    tz = business_time.business_tz()
+    start = datetime.combine(start_day, time.min, tzinfo=tz).astimezone(timezone.utc)
+    end = datetime.combine(end_day + timedelta(days=1), time.min, tzinfo=tz).astimezone(timezone.utc)
+    series = []
+    bounds = []
+    moment = start
+    while moment < end:
+        series.append(_empty(moment.astimezone(tz).strftime('%Y-%m-%dT%H:00')))
+        bounds.append(business_time.to_storage(moment))
+        moment += timedelta(hours=1)
+    stop = business_time.to_storage(end)
+
+    parts = []
+    for model in (Order, OrderArchive):
+        parts.append(select(model.transaction_date, model.total_amount).where(and_(
+            model.transaction_date >= bounds[0], model.transaction_date < stop,
+            model.status != 'cancelled', model.payment_method != 'pending'
+        )))
+    for transaction_date, total_amount in db.session.execute(union_all(*parts)):
+        row = series[bisect_right(bounds, transaction_date) - 1]
+        row['total_transactions'] += 1
+        row['revenue'] += Decimal(total_amount)
+    return series
+
+
+def build(start_day, end_day, granularity='day'):
+    """
+    Deret penjualan lunas [start_day, end_day] (hari bisnis, inklusif):
+    [{'period', 'total_transactions', 'revenue'}, ...] urut waktu, tanpa lubang.
+    Minggu/bulan diberi label hari pertamanya; hari di luar rentang tidak dihitung.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity harus salah satu dari: {', '.join(GRANULARITIES)}")
+    if end_day < start_day:
+        raise ValueError('end_date tidak boleh sebelum start_date')
+    if granularity == 'hour':
+        if (end_day - start_day).days + 1 > hourly_max_days():
+            raise ValueError(f'Laporan per jam maksimal {hourly_max_days()} hari')
+        return _hourly_series(start_day, end_day)
+    return _daily_series(start_day, end_day, granularity)
@@ -0,0 +1,192 @@
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import insert, delete, func, case, and_
+from sqlalchemy.dialects import mysql, sqlite
+from app.extensions import db
+from app.services import business_time
+from app.models import Order, OrderItem, OrderArchive, OrderItemArchive, DailySalesRollup
+
+# =====================================================
+# ROLLUP PENJUALAN HARIAN (DIRAWAT TRANSAKSIONAL)
+# =====================================================
+# daily_sales_rollup = 1 baris per (hari bisnis order, metode bayar; hari
+# dihitung di BUSINESS_TIMEZONE lewat services.business_time). Setiap jalur
+# yang mengubah angka laporan (order baru/batch, pelunasan, void, hapus)
+# menambah/mengurangi baris yang sama di transaksi yang sama lewat upsert
+# increment (INSERT ... ON DUPLICATE KEY / ON CONFLICT), jadi dashboard &
+# laporan cukup membaca beberapa baris, bukan memindai tabel orders.
+# `flask rebuild-sales-rollup` menghitung ulang dari orders + orders_archive.
+
+rollup_table = DailySalesRollup.__table__
+FIELDS = ('revenue', 'trx_count', 'cogs', 'void_count', 'void_amount')
+
+
+def as_date(value):
+    # func.date() = date di MySQL, string 'YYYY-MM-DD' di SQLite
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def _zero():
+    return {'revenue': Decimal('0'), 'trx_count': 0, 'cogs': Decimal('0'),
+            'void_count': 0, 'void_amount': Decimal('0')}
+
+
+def apply(deltas):
+    """Tambahkan {(day, payment_method): {field: delta}} ke rollup (1 upsert executemany)."""
+    rows = []
+    for (day, method), values in deltas.items():
+        row = _zero()
+        row.update(values)
+        if any(row[field] for field in FIELDS):
+            rows.append({'day': day, 'payment_method': method, **row})
+    if not rows:
+        return
+
+    if db.engine.dialect.name == 'mysql':
+        statement = mysql.insert(rollup_table)
+        statement = statement.on_duplicate_key_update(
+            {field: rollup_table.c[field] + statement.inserted[field] for field in FIELDS}
+        )
+    else:
+        statement = sqlite.insert(rollup_table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['day', 'payment_method'],
+            set_={field: rollup_table.c[field] + statement.excluded[field] for field in FIELDS}
+        )
+    db.session.execute(statement, rows)
+
+
+def _order_cogs(order):
+    return Decimal(db.session.query(func.sum(OrderItem.quantity * OrderItem.cogs_at_sale))
+                   .filter(OrderItem.order_id == order.id).scalar() or 0)
+
+
+def _sale(order, cogs, sign=1):
+    return {'revenue': sign * Decimal(order.total_amount), 'trx_count': sign, 'cogs': sign * cogs}
+
+
+def _key(order):
+    return business_time.business_day(order.transaction_date), order.payment_method
+
+
+# =====================================================
+# JALUR TRANSAKSI
+# =====================================================
+def record_sales(posted):
+    """Order baru [(order, plan), ...]: yang langsung lunas masuk omzet (HPP dari plan)."""
+    deltas = {}
+    for order, plan in posted:
+        if order.payment_method == 'pending':
+            continue
+        cogs = sum((line.cogs_at_sale * line.quantity for line in plan.lines), Decimal('0'))
+        current = deltas.setdefault(_key(order), _zero())
+        for field, value in _sale(order, cogs).items():
+            current[field] += value
+    apply(deltas)
+
+
+def record_payment(order):
+    """Open bill dilunasi: omzet masuk ke hari order & metode bayar barunya."""
+    if order.status == 'cancelled':
+        # Open bill yang sudah di-void: hanya hitungan void yang pindah metode bayar
+        day = business_time.business_day(order.transaction_date)
+        amount = Decimal(order.total_amount)
+        apply({(day, 'pending'): {'void_count': -1, 'void_amount': -amount},
+               _key(order): {'void_count': 1, 'void_amount': amount}})
+        return
+    apply({_key(order): _sale(order, _order_cogs(order))})
+
+
+def record_void(order, was_paid):
+    """Order dibatalkan: keluarkan dari omzet (jika sudah lunas) & hitung sebagai void."""
+    values = _sale(order, _order_cogs(order), sign=-1) if was_paid else {}
+    values.update({'void_count': 1, 'void_amount': Decimal(order.total_amount)})
+    apply({_key(order): values})
+
+
+def record_delete(order):
+    """Order dihapus permanen: hilang dari omzet / hitungan void."""
+    if order.status == 'cancelled':
+        apply({_key(order): {'void_count': -1, 'void_amount': -Decimal(order.total_amount)}})
+    elif order.payment_method != 'pending':
+        apply({_key(order): _sale(order, _order_cogs(order), sign=-1)})
+
+
+# =====================================================
+# BACA & BANGUN ULANG
+# =====================================================
+def by_day(start_day=None, end_day=None):
+    """{day: (revenue, trx_count, cogs)} untuk hari [start_day, end_day] (inklusif)."""
+    query = db.session.query(
+        DailySalesRollup.day, func.sum(DailySalesRollup.revenue),
+        func.sum(DailySalesRollup.trx_count), func.sum(DailySalesRollup.cogs)
+    )
+    if start_day is not None:
+        query = query.filter(DailySalesRollup.day >= start_day)
+    if end_day is not None:
+        query = query.filter(DailySalesRollup.day <= end_day)
+    rows = query.group_by(DailySalesRollup.day).order_by(DailySalesRollup.day).all()
+    return {as_date(day_value): (Decimal(revenue or 0), int(trx or 0), Decimal(cogs or 0))
+            for day_value, revenue, trx, cogs in rows}
+
+
+def _day_totals(order_model, item_model, start, end):
+    """{(day, payment_method): {field: total}} untuk order [start, end) di 1 pasang tabel."""
+    day = business_time.day_expression(order_model.transaction_date, db.engine.dialect.name)
+    paid = and_(order_model.status != 'cancelled', order_model.payment_method != 'pending')
+    cancelled = order_model.status == 'cancelled'
+    in_range = []
+    if start is not None:
+        in_range.append(order_model.transaction_date >= start)
+    if end is not None:
+        in_range.append(order_model.transaction_date < end)
+
+    totals = {}
+    rows = db.session.query(
+        day, order_model.payment_method,
+        func.sum(case((paid, order_model.total_amount), else_=0)),
+        func.sum(case((paid, 1), else_=0)),
+        func.sum(case((cancelled, 1), else_=0)),
+        func.sum(case((cancelled, order_model.total_amount), else_=0))
+    ).filter(*in_range).group_by(day, order_model.payment_method).all()
+    for day_value, method, revenue, trx, voids, void_amount in rows:
+        totals[(as_date(day_value), method)] = {
+            'revenue': Decimal(revenue or 0), 'trx_count': int(trx or 0), 'cogs': Decimal('0'),
+            'void_count': int(voids or 0), 'void_amount': Decimal(void_amount or 0)
+        }
+
+    cogs_rows = db.session.query(
+        day, order_model.payment_method, func.sum(item_model.quantity * item_model.cogs_at_sale)
+    ).join(order_model, order_model.id == item_model.order_id)\
+        .filter(paid, *in_range)\
+        .group_by(day, order_model.payment_method).all()
+    for day_value, method, cogs in cogs_rows:
+        totals.setdefault((as_date(day_value), method), _zero())['cogs'] = Decimal(cogs or 0)
+    return totals
+
+
+def rebuild(start_day=None, end_day=None):
+    """
+    Hitung ulang rollup untuk hari bisnis [start_day, end_day) (date, None = tanpa
+    batas) dari tabel panas + arsip, tanpa commit. Return jumlah baris rollup.
+    """
+    start = business_time.day_start(start_day) if start_day is not None else None
+    end = business_time.day_start(end_day) if end_day is not None else None
+    totals = _day_totals(Order, OrderItem, start, end)
+    for key, values in _day_totals(OrderArchive, OrderItemArchive, start, end).items():
+        current = totals.setdefault(key, _zero())
+        for field in FIELDS:
+            current[field] += values[field]
+
+    stale = delete(DailySalesRollup)
+    if start_day is not None:
+        stale = stale.where(DailySalesRollup.day >= start_day)
+    if end_day is not None:
+        stale = stale.where(DailySalesRollup.day < end_day)
+    db.session.execute(stale)
+    rows = [{'day': day_value, 'payment_method': method, **values}
+            for (day_value, method), values in totals.items()
+            if any(values[field] for field in FIELDS)] # open bill saja = baris nol, tidak perlu
+    if rows:
+        db.session.execute(insert(DailySalesRollup), rows)
+    return len(rows)
@@ -0,0 +1,249 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left
+import unicodedata
+from collections import namedtuple
+from app.extensions import db
+from app.models import Ingredient, Product
+from app.services.cache_version import version_watcher
+
+# =====================================================
+# INDEX PENCARIAN BAHAN & MENU (N-GRAM IN-PROCESS)
+# =====================================================
+# ilike('%kata%') tidak bisa memakai index B-tree, jadi tiap ketikan di kotak
+# pencarian = full table scan. Di sini nama bahan & menu dipecah jadi trigram
+# (3 huruf berurutan, kata diberi padding "  kata " seperti pg_trgm) dan
+# disimpan di memori worker: gram -> set(id). Query = irisan posting list lalu
+# diverifikasi substring, tanpa menyentuh database.
+# Tiap nama diindeks dalam 2 bentuk: kata asli (huruf kecil) & bentuk baku
+# (normalize), jadi "cokl" tetap menemukan "Coklat Batang" dan "cokelat"
+# juga; query dicocokkan asli-ke-asli dan baku-ke-baku.
+# Index dimuat ulang per versi 'catalog': admin yang menambah/mengubah/menghapus
+# bahan atau menu memanggil cache_version.bump('catalog').
+
+CATALOG_VERSION = 'catalog'
+
+# Ejaan lama / variasi penulisan -> ejaan baku (diterapkan ke nama DAN query)
+SPELLING_RULES = (
+    ('oe', 'u'),   # goela -> gula, soesoe -> susu
+    ('dj', 'j'),   # djahe -> jahe
+    ('tj', 'c'),   # tjabe -> cabe
+    ('nj', 'ny'),  # minjak -> minyak
+    ('sj', 'sy'),  # sjrup -> syrup
+    ('ch', 'kh'),  # chas -> khas
+)
+WORD_VARIANTS = {
+    'coklat': 'cokelat',
+    'telor': 'telur',
+    'sirop': 'sirup',
+    'syrup': 'sirup',
+    'sereh': 'serai',
+    'mie': 'mi',
+    'cabai': 'cabe',
+}
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+_REPEATED = re.compile(r'([a-z])\1+')
+
+_EMPTY = ((), frozenset())
+
+SearchDoc = namedtuple('SearchDoc', ['id', 'name', 'text', 'raw', 'category', 'is_active'])
+
+
+def tokens(text):
+    """Huruf kecil, tanpa aksen & tanda baca (ejaan apa adanya). Return list kata."""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii').lower()
+    return _NON_WORD.sub(' ', text).split()
+
+
+def normalize(text):
+    """tokens() + ejaan lama / variasi dibakukan. Return list kata."""
+    text = ' '.join(tokens(text))
+    for old, new in SPELLING_RULES:
+        text = text.replace(old, new)
+    words = []
+    for word in text.split():
+        word = _REPEATED.sub(r'\1', word) # kopii -> kopi, telorr -> telor
+        words.append(WORD_VARIANTS.get(word, word))
+    return words
+
+
+def _grams(word, padded=True):
+    if padded:
+        word = f"  {word} "
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def make_doc(row_id, name, category=None, is_active=True):
+    return SearchDoc(row_id, name, ' '.join(normalize(name)), ' '.join(tokens(name)), category, is_active)
+
+
+def _query_grams(word):
+    # Kata >= 3 huruf: trigram tanpa padding (cocok di tengah kata juga).
+    # Kata 1-2 huruf: gram awal-kata ("  t", " te") = pencarian prefix.
+    if len(word) >= 3:
+        return _grams(word, padded=False)
+    padded = f"  {word}"
+    return {padded[i:i + 3] for i in range(len(word))}
+
+
+class _Index:
+    """
+    Index trigram untuk satu jenis dokumen (bahan atau menu). Dokumen disimpan
+    urut teks ternormalisasi; posting list berisi posisi (urut juga), jadi hasil
+    bisa dipindai dari yang terbaik dan berhenti begitu `limit` terpenuhi.
+    Gram berasal dari kata baku DAN kata asli tiap nama.
+    """
+
+    def __init__(self, docs):
+        self.docs = sorted(docs, key=lambda doc: (doc.text, doc.name.lower(), doc.id))
+        self.texts = [doc.text for doc in self.docs]
+        # Teks asli urut + posisinya, untuk pencarian awalan nama dengan ejaan asli
+        raw_sorted = sorted((doc.raw, pos) for pos, doc in enumerate(self.docs))
+        self.raw_texts = [raw for raw, _ in raw_sorted]
+        self.raw_positions = [pos for _, pos in raw_sorted]
+        self.categories = {} # kategori ternormalisasi -> set(posisi)
+        postings = {}
+        for pos, doc in enumerate(self.docs):
+            for word in set(doc.text.split()) | set(doc.raw.split()):
+                for gram in _grams(word):
+                    postings.setdefault(gram, []).append(pos)
+            if doc.category is not None:
+                self.categories.setdefault(' '.join(normalize(doc.category)), set()).add(pos)
+        # gram -> (list posisi urut untuk dipindai, set untuk cek keanggotaan)
+        self.postings = {gram: (sorted(set(positions)), set(positions)) for gram, positions in postings.items()}
+
+    def _walk(self, grams, limit):
+        """Posisi yang memuat SEMUA gram, urut posisi (irisan set dihitung di C)."""
+        lists = sorted((self.postings.get(gram, _EMPTY) for gram in grams), key=lambda posting: len(posting[0]))
+        if len(lists) == 1:
+            return lists[0][0]
+        matched = lists[0][1].intersection(*(posting[1] for posting in lists[1:]))
+        if len(matched) <= 4 * limit:
+            return sorted(matched)
+        # Hasil banyak: pindai posting terpendek (sudah urut) & berhenti lebih awal
+        return (pos for pos in lists[0][0] if pos in matched)
+
+    def search(self, term, limit=None, active_only=False, category=None):
+        words = normalize(term)
+        allowed = None
+        if category is not None:
+            # Kategori hanya segelintir: cukup scan nama kategorinya
+            category = ' '.join(normalize(category))
+            allowed = set()
+            for name, members in self.categories.items():
+                if category in name:
+                    allowed |= members
+
+        def accept(pos):
+            return (allowed is None or pos in allowed) and (not active_only or self.docs[pos].is_active)
+
+        if not words:
+            positions = sorted(allowed) if allowed is not None else range(len(self.docs))
+            return [self.docs[pos].id for pos in positions if accept(pos)][:limit]
+
+        # Bentuk query: baku (dicocokkan ke teks baku) & asli (ke teks asli)
+        raw_words = tokens(term)
+        variants = [(words, ' '.join(words))]
+        if raw_words != words:
+            variants.append((raw_words, ' '.join(raw_words)))
+        limit = limit or len(self.docs)
+        found = []
+        taken = set()
+
+        def rank(pos):
+            return self._rank(pos, variants)
+
+        # Tingkat 0-1: nama diawali query (yang sama persis ikut paling depan) = bisect
+        heads = set()
+        for sorted_texts, positions, query in ((self.texts, None, variants[0][1]),
+                                               (self.raw_texts, self.raw_positions, variants[-1][1])):
+            index = bisect_left(sorted_texts, query)
+            while index < len(sorted_texts) and len(heads) < 2 * limit and sorted_texts[index].startswith(query):
+                heads.add(positions[index] if positions else index)
+                index += 1
+        for pos in sorted((pos for pos in heads if accept(pos)), key=lambda pos: (rank(pos), pos))[:limit]:
+            found.append(pos)
+            taken.add(pos)
+
+        # Tingkat 2: tiap kata query = awalan kata di nama. Tingkat 3: di tengah kata.
+        for tier in (2, 3):
+            walks = []
+            for variant_words, _ in variants:
+                grams = set().union(*(_query_grams(word) for word in variant_words))
+                if tier == 2:
+                    grams = grams.union(*(_query_grams(word[:2]) for word in variant_words))
+                walks.append(self._walk(grams, limit))
+            for pos in heapq.merge(*walks):
+                if len(found) >= limit:
+                    break
+                if pos not in taken and accept(pos) and rank(pos) == tier:
+                    found.append(pos)
+                    taken.add(pos)
+        return [self.docs[pos].id for pos in found]
+
+    def _rank(self, pos, variants):
+        """Peringkat terbaik: query baku vs teks baku, query asli vs teks asli."""
+        doc = self.docs[pos]
+        ranks = [_rank(doc.text, *variants[0])]
+        if len(variants) > 1 or doc.raw != doc.text:
+            ranks.append(_rank(doc.raw, *variants[-1]))
+        ranks = [value for value in ranks if value is not None]
+        return min(ranks) if ranks else None
+
+
+def _rank(text, words, query):
+    """0 = sama persis, 1 = awalan nama, 2 = awalan tiap kata, 3 = di tengah kata. None = tidak cocok."""
+    padded = f" {text}"
+    if any(f" {word}" not in padded if len(word) < 3 else word not in text for word in words):
+        return None # gram cocok tapi bukan substring (false positive trigram)
+    if text == query:
+        return 0
+    if text.startswith(query):
+        return 1
+    if all(f" {word}" in padded for word in words):
+        return 2
+    return 3
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None # (versi, {'ingredients': _Index, 'products': _Index})
+
+    def ingredients(self, term, limit=None):
+        """ID bahan yang cocok dengan `term`, urut relevansi."""
+        return self._ensure()['ingredients'].search(term, limit=limit)
+
+    def products(self, term=None, category=None, limit=None, active_only=True):
+        """ID menu yang cocok dengan `term` dan/atau `category`, urut relevansi."""
+        return self._ensure()['products'].search(term or '', limit=limit, active_only=active_only,
+                                                 category=category)
+
+    def reset(self):
+        self._state = None
+
+    def _ensure(self):
+        version = version_watcher.current(CATALOG_VERSION)
+        state = self._state
+        if state is not None and state[0] == version:
+            return state[1]
+
+        with self._lock:
+            if self._state is None or self._state[0] != version:
+                self._state = (version, self._load())
+            return self._state[1]
+
+    def _load(self):
+        ingredients = db.session.query(Ingredient.id, Ingredient.name).all()
+        products = db.session.query(Product.id, Product.name, Product.category, Product.is_active).all()
+        return {
+            'ingredients': _Index(make_doc(row.id, row.name) for row in ingredients),
+            'products': _Index(
+                make_doc(row.id, row.name, row.category or '', bool(row.is_active)) for row in products
+            ),
+        }
+
+
+search_index = SearchIndex()
@@ -0,0 +1,59 @@
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import insert, update, func
+from app.extensions import db
+from app.models import ShiftLedger, SalesSession
+
+# =====================================================
+# BUKU BESAR SHIFT (APPEND-ONLY)
+# =====================================================
+# Tiap uang masuk/keluar shift dicatat sebagai baris baru, bukan
+# read-modify-write ke sales_sessions.total_system. Kasir yang bertransaksi
+# bersamaan tidak lagi antre (atau saling timpa) di 1 baris sesi.
+# total_system hanya ditulis saat shift ditutup (snapshot dari ledger).
+
+
+def record_sales(session_id, orders, entry_type='sale'):
+    """Catat order yang langsung lunas (bulk, 1 INSERT). Order 'pending' dilewati."""
+    now = datetime.utcnow()
+    rows = [{
+        'session_id': session_id,
+        'order_id': order.id,
+        'payment_method': order.payment_method,
+        'amount': order.total_amount,
+        'entry_type': entry_type,
+        'created_at': now
+    } for order in orders if order.payment_method != 'pending']
+    if rows:
+        db.session.execute(insert(ShiftLedger), rows)
+
+
+def record(order, amount, entry_type):
+    """
+    Catat 1 mutasi shift untuk `order` (pelunasan, void, hapus).
+    Jika shift order sudah ditutup, snapshot total_system ikut dikoreksi
+    dengan increment atomik (tanpa membaca nilainya dulu).
+    """
+    if not order.session_id or not amount:
+        return
+    db.session.execute(insert(ShiftLedger), [{
+        'session_id': order.session_id,
+        'order_id': order.id,
+        'payment_method': order.payment_method,
+        'amount': amount,
+        'entry_type': entry_type,
+        'created_at': datetime.utcnow()
+    }])
+    db.session.execute(
+        update(SalesSession)
+        .where(SalesSession.id == order.session_id, SalesSession.end_time.isnot(None))
+        .values(total_system=SalesSession.total_system + amount)
+    )
+
+
+def totals(session_id):
+    """Subtotal per metode bayar: {'cash': Decimal, 'qris': Decimal, ...} (1 query)."""
+    rows = db.session.query(ShiftLedger.payment_method, func.sum(ShiftLedger.amount)) \
+        .filter(ShiftLedger.session_id == session_id) \
+        .group_by(ShiftLedger.payment_method).all()
+    return {method: Decimal(total or 0) for method, total in rows}
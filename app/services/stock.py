@@ -0,0 +1,353 @@
+import threading
+import time
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import update, select, case, func, bindparam
+from app.extensions import db
+from app.models import Ingredient
+
+# =====================================================
+# LAYER MUTASI STOK (SATU-SATUNYA JALAN UBAH current_stock)
+# =====================================================
+# Semua perubahan stok dilakukan dengan UPDATE atomik di database
+# (current_stock = current_stock +/- :q), bukan baca-ubah-tulis di Python.
+# Pengurangan stok memakai guard "AND current_stock >= :q" sehingga dua kasir
+# yang berebut bahan terakhir tidak bisa sama-sama lolos (oversell).
+# Semua bahan 1 transaksi diubah dalam satu UPDATE ... WHERE id IN (...),
+# sehingga row lock diambil sekali jalan dalam urutan primary key.
+# Flag is_low (stok < reorder_point) ikut dihitung di UPDATE yang sama.
+
+ingredients_table = Ingredient.__table__
+
+DEFAULT_LOCK_WAIT_MS = 5
+
+
+class InsufficientStockError(Exception):
+    """Stok bahan tidak cukup untuk dipotong."""
+
+
+# =====================================================
+# COUNTER KONTENSI PER BAHAN
+# =====================================================
+class ContentionStats:
+    """
+    Counter per bahan (jumlah UPDATE yang menyentuhnya, ditolak karena bahan
+    INI kurang, ikut di UPDATE yang menunggu lock) + counter per statement
+    (jumlah, ditolak, menunggu lock, total waktu). Waktu dicatat sekali per
+    statement: 1 UPDATE multi-bahan tidak bisa dipecah per baris.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._statements = self._empty_statements()
+
+    @staticmethod
+    def _empty_statements():
+        return {'count': 0, 'rejections': 0, 'lock_waits': 0, 'total_wait_ms': 0.0}
+
+    def record(self, ingredient_ids, elapsed_ms, rejected=False, short_ids=()):
+        lock_wait_ms = current_app.config.get('STOCK_LOCK_WAIT_MS', DEFAULT_LOCK_WAIT_MS)
+        # UPDATE yang lama hampir selalu berarti menunggu row lock transaksi lain
+        waited = elapsed_ms >= lock_wait_ms
+        with self._lock:
+            statements = self._statements
+            statements['count'] += 1
+            statements['total_wait_ms'] += elapsed_ms
+            if rejected:
+                statements['rejections'] += 1
+            if waited:
+                statements['lock_waits'] += 1
+            for ingredient_id in ingredient_ids:
+                stat = self._stats.setdefault(ingredient_id, {'updates': 0, 'rejections': 0, 'lock_waits': 0})
+                stat['updates'] += 1
+                if ingredient_id in short_ids:
+                    stat['rejections'] += 1
+                if waited:
+                    stat['lock_waits'] += 1
+
+    def snapshot(self):
+        """Return ({ingredient_id: counter}, counter statement)."""
+        with self._lock:
+            return ({ingredient_id: dict(stat) for ingredient_id, stat in self._stats.items()},
+                    dict(self._statements))
+
+
+contention_stats = ContentionStats()
+
+
+def _execute_timed(statement):
+    start = time.perf_counter()
+    result = db.session.execute(statement)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return result, elapsed_ms
+
+
+def _execute_timed_many(statement, params):
+    start = time.perf_counter()
+    result = db.session.execute(statement, params)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return result, elapsed_ms
+
+
+# =====================================================
+# OPERASI STOK
+# =====================================================
+def _quantities(mapping, positive_only=False):
+    """Normalisasi {ingredient_id: qty} jadi Decimal, urut ID, buang qty 0."""
+    quantities = {}
+    for ingredient_id in sorted(mapping):
+        qty = Decimal(mapping[ingredient_id])
+        if qty > 0 or (qty != 0 and not positive_only):
+            quantities[ingredient_id] = qty
+    return quantities
+
+
+def _qty_case(quantities):
+    return case(
+        *[(ingredients_table.c.id == ingredient_id, qty) for ingredient_id, qty in quantities.items()]
+    )
+
+
+def _low_after(new_stock):
+    """
+    Nilai is_low untuk stok baru. Kolom ini WAJIB diset sebelum current_stock
+    (ordered_values): MySQL mengevaluasi SET dari kiri ke kanan.
+    """
+    return case((new_stock < ingredients_table.c.reorder_point, True), else_=False)
+
+
+def deduct(demand):
+    """
+    Potong stok {ingredient_id: qty} dalam SATU UPDATE bersyarat:
+        SET current_stock = current_stock - CASE id ... END
+        WHERE id IN (...) AND current_stock >= CASE id ... END
+    Jika ada bahan yang tidak cukup (rowcount kurang), raise
+    InsufficientStockError (pemanggil wajib rollback).
+    """
+    quantities = _quantities(demand, positive_only=True)
+    if not quantities:
+        return
+
+    qty = _qty_case(quantities)
+    # Savepoint: jika ditolak, potongan bahan lain di UPDATE ini dibatalkan
+    # dulu agar stok di transaksi ini bisa dibaca apa adanya untuk diagnosis
+    savepoint = db.session.begin_nested()
+    result, elapsed_ms = _execute_timed(
+        update(ingredients_table)
+        .where(ingredients_table.c.id.in_(quantities.keys()))
+        .where(ingredients_table.c.current_stock >= qty)
+        .ordered_values(
+            (ingredients_table.c.is_low, _low_after(ingredients_table.c.current_stock - qty)),
+            (ingredients_table.c.current_stock, ingredients_table.c.current_stock - qty)
+        )
+    )
+    if result.rowcount == len(quantities):
+        savepoint.commit()
+        contention_stats.record(quantities, elapsed_ms)
+        return
+
+    savepoint.rollback()
+    short = _short_ingredients(quantities)
+    contention_stats.record(quantities, elapsed_ms, rejected=True, short_ids={row[0] for row in short})
+    if short:
+        ingredient_id, name, current_stock, needed = short[0]
+        if name is None:
+            raise InsufficientStockError(f"Bahan ID {ingredient_id} tidak ditemukan")
+        raise InsufficientStockError(f"Stok '{name}' tidak cukup! Sisa: {current_stock}, Butuh: {needed}")
+    # Stok di transaksi ini sebenarnya cukup: baris berubah oleh transaksi lain di antara UPDATE & baca ulang
+    raise InsufficientStockError("Stok bahan tidak cukup (sedang dipakai transaksi lain), silakan ulangi.")
+
+
+def _short_ingredients(quantities):
+    """
+    Jalur gagal saja: baca ulang stok lewat db.session (transaksi ini, jadi
+    potongan order sebelumnya di chunk batch ikut terhitung).
+    Return [(ingredient_id, name atau None jika tidak ada, current_stock, qty)] yang kurang.
+    """
+    found = {
+        row.id: row for row in db.session.execute(
+            select(ingredients_table.c.id, ingredients_table.c.name, ingredients_table.c.current_stock)
+            .where(ingredients_table.c.id.in_(quantities.keys()))
+        )
+    }
+    short = []
+    for ingredient_id, qty in quantities.items():
+        row = found.get(ingredient_id)
+        if row is None:
+            short.append((ingredient_id, None, None, qty))
+        elif Decimal(row.current_stock or 0) < qty:
+            short.append((ingredient_id, row.name, row.current_stock, qty))
+    return short
+
+
+def restore(deltas):
+    """Tambah (atau kurangi) stok {ingredient_id: qty} dalam satu UPDATE atomik."""
+    quantities = _quantities(deltas)
+    if not quantities:
+        return
+
+    qty = _qty_case(quantities)
+    _, elapsed_ms = _execute_timed(
+        update(ingredients_table)
+        .where(ingredients_table.c.id.in_(quantities.keys()))
+        .ordered_values(
+            (ingredients_table.c.is_low, _low_after(ingredients_table.c.current_stock + qty)),
+            (ingredients_table.c.current_stock, ingredients_table.c.current_stock + qty)
+        )
+    )
+    contention_stats.record(quantities, elapsed_ms)
+
+
+def adjust(ingredient_id, qty_change):
+    """Penyesuaian manual (opname), boleh plus atau minus tanpa guard."""
+    restore({ingredient_id: qty_change})
+
+
+def adjust_many(deltas):
+    """
+    Penyesuaian massal (opname ribuan bahan): UPDATE by primary key yang
+    dieksekusi sekali sebagai executemany. CASE dengan ribuan cabang seperti
+    di restore() jadi O(n^2) untuk set sebesar ini.
+    """
+    quantities = _quantities(deltas)
+    if not quantities:
+        return
+
+    delta = bindparam('delta')
+    new_stock = ingredients_table.c.current_stock + delta
+    _, elapsed_ms = _execute_timed_many(
+        update(ingredients_table)
+        .where(ingredients_table.c.id == bindparam('ingredient_id'))
+        .ordered_values(
+            (ingredients_table.c.is_low, _low_after(new_stock)),
+            (ingredients_table.c.current_stock, new_stock)
+        ),
+        [{'ingredient_id': ingredient_id, 'delta': qty} for ingredient_id, qty in quantities.items()]
+    )
+    contention_stats.record(quantities, elapsed_ms)
+
+
+WASTE_KEYWORDS = ('busuk', 'rusak', 'buang')
+
+
+def classify_adjustment(qty_change, reason=None):
+    """change_type InventoryLog untuk penyesuaian: minus + alasan busuk/rusak/buang = 'waste'."""
+    reason_lower = (reason or '').lower()
+    if qty_change < 0 and any(keyword in reason_lower for keyword in WASTE_KEYWORDS):
+        return 'waste'
+    return 'adjustment'
+
+
+def purchase(ingredient_id, qty, price_per_unit):
+    """
+    Tambah stok pembelian sekaligus hitung ulang Weighted Average Cost
+    dalam satu UPDATE atomik.
+    """
+    qty = Decimal(qty)
+    price_per_unit = Decimal(price_per_unit)
+    stock = ingredients_table.c.current_stock
+    avg_cost = ingredients_table.c.avg_cost
+
+    new_avg_cost = case(
+        (stock + qty > 0, (stock * avg_cost + qty * price_per_unit) / (stock + qty)),
+        else_=price_per_unit
+    )
+
+    # avg_cost WAJIB diset sebelum current_stock: MySQL mengevaluasi SET
+    # dari kiri ke kanan memakai nilai yang sudah diperbarui.
+    _, elapsed_ms = _execute_timed(
+        update(ingredients_table)
+        .where(ingredients_table.c.id == ingredient_id)
+        .ordered_values((avg_cost, new_avg_cost), (ingredients_table.c.is_low, _low_after(stock + qty)),
+                        (stock, stock + qty))
+    )
+    contention_stats.record([ingredient_id], elapsed_ms)
+
+
+def purchase_many(lines):
+    """
+    Restock banyak bahan sekaligus (1 kiriman supplier).
+    lines = {ingredient_id: (qty, total_cost)} dalam satuan dasar.
+    Baris bahan dikunci SEKALI (SELECT ... FOR UPDATE urut id), avg_cost baru
+    dihitung dengan Decimal untuk semua bahan, lalu ditulis dalam SATU UPDATE.
+    Return {ingredient_id: row terkunci sebelum update} (id, name, current_stock, avg_cost).
+    """
+    quantities = _quantities({ingredient_id: qty for ingredient_id, (qty, _) in lines.items()}, positive_only=True)
+    if not quantities:
+        return {}
+
+    locked = {
+        row.id: row for row in db.session.execute(
+            select(ingredients_table.c.id, ingredients_table.c.name,
+                   ingredients_table.c.current_stock, ingredients_table.c.avg_cost)
+            .where(ingredients_table.c.id.in_(quantities.keys()))
+            .order_by(ingredients_table.c.id)
+            .with_for_update()
+        )
+    }
+
+    missing = [ingredient_id for ingredient_id in quantities if ingredient_id not in locked]
+    if missing:
+        raise ValueError(f"Bahan ID {', '.join(map(str, missing))} tidak ditemukan")
+
+    new_avg_costs = {}
+    for ingredient_id, qty in quantities.items():
+        row = locked[ingredient_id]
+        old_stock = Decimal(row.current_stock or 0)
+        total_cost = Decimal(lines[ingredient_id][1])
+        if old_stock + qty > 0:
+            avg = (old_stock * Decimal(row.avg_cost or 0) + total_cost) / (old_stock + qty)
+        else:
+            avg = total_cost / qty
+        new_avg_costs[ingredient_id] = avg.quantize(Decimal('0.01'))
+
+    stock = ingredients_table.c.current_stock
+    qty = _qty_case(quantities)
+    _, elapsed_ms = _execute_timed(
+        update(ingredients_table)
+        .where(ingredients_table.c.id.in_(quantities.keys()))
+        .ordered_values(
+            (ingredients_table.c.avg_cost, _qty_case(new_avg_costs)),
+            (ingredients_table.c.is_low, _low_after(stock + qty)),
+            (stock, stock + qty)
+        )
+    )
+    contention_stats.record(quantities, elapsed_ms)
+    return locked
+
+
+def set_reorder_point(ingredient_id, reorder_point):
+    """Ubah batas pesan ulang & hitung ulang is_low dari stok saat ini (atomik)."""
+    reorder_point = Decimal(reorder_point)
+    db.session.execute(
+        update(ingredients_table)
+        .where(ingredients_table.c.id == ingredient_id)
+        .ordered_values(
+            (ingredients_table.c.is_low, case((ingredients_table.c.current_stock < reorder_point, True), else_=False)),
+            (ingredients_table.c.reorder_point, reorder_point)
+        )
+    )
+
+
+def crossed_low(demand):
+    """
+    Bahan yang BARU SAJA turun di bawah reorder_point akibat deduct(demand)
+    di transaksi ini: stok sekarang < batas, stok sebelum potong >= batas.
+    Return [(ingredient_id, name, current_stock), ...] (1 SELECT by PK).
+    """
+    quantities = _quantities(demand, positive_only=True)
+    if not quantities:
+        return []
+    stock = ingredients_table.c.current_stock
+    return db.session.execute(
+        select(ingredients_table.c.id, ingredients_table.c.name, stock)
+        .where(ingredients_table.c.id.in_(quantities.keys()))
+        .where(ingredients_table.c.is_low == True)
+        .where(stock + _qty_case(quantities) >= ingredients_table.c.reorder_point)
+    ).all()
+
+
+def low_stock_count():
+    """Jumlah bahan menipis: COUNT di index is_low (hanya baris yang menipis yang disentuh)."""
+    return db.session.query(func.count(ingredients_table.c.id)).filter(ingredients_table.c.is_low == True).scalar()
@@ -0,0 +1,96 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from app.extensions import db
+from app.models import Ingredient, InventoryLog, InventoryLogArchive, StockSnapshot
+from app.services import archive
+
+# =====================================================
+# STOK PER TANGGAL (SNAPSHOT + REPLAY LOG)
+# =====================================================
+# Snapshot berkala (flask snapshot-stock, via cron saat toko tutup) menyimpan
+# qty & avg_cost semua bahan dalam 1 baris. Stok pada waktu X = snapshot
+# terakhir <= X, lalu inventory_logs (created_at di antara keduanya, index)
+# diputar ulang. avg_cost hanya berubah saat 'purchase', dihitung ulang dari
+# unit_cost log dengan rumus yang sama seperti stock.purchase(). Jika jendela
+# replay masuk ke periode yang sudah diarsipkan, inventory_logs_archive ikut
+# dibaca.
+
+CENT = Decimal('0.01')
+
+
+def take():
+    """Foto stok & avg_cost semua bahan saat ini. Return StockSnapshot (sudah commit)."""
+    rows = db.session.query(Ingredient.id, Ingredient.current_stock, Ingredient.avg_cost).all()
+    snapshot = StockSnapshot(
+        taken_at=datetime.utcnow(),
+        items=json.dumps({str(ingredient_id): [str(qty or 0), str(avg_cost or 0)]
+                          for ingredient_id, qty, avg_cost in rows}, separators=(',', ':'))
+    )
+    db.session.add(snapshot)
+    db.session.commit()
+    return snapshot
+
+
+def prune(keep):
+    """Sisakan `keep` snapshot terbaru. Return jumlah dihapus."""
+    keep_ids = [row_id for (row_id,) in db.session.query(StockSnapshot.id)
+                .order_by(StockSnapshot.taken_at.desc()).limit(keep).all()]
+    query = db.session.query(StockSnapshot)
+    if keep_ids:
+        query = query.filter(StockSnapshot.id.notin_(keep_ids))
+    deleted = query.delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def as_of(moment):
+    """
+    Rekonstruksi stok pada `moment`.
+    Return (state {ingredient_id: (qty, avg_cost)}, snapshot_at atau None, jumlah mutasi diputar).
+    """
+    base = db.session.query(StockSnapshot)\
+        .filter(StockSnapshot.taken_at <= moment)\
+        .order_by(StockSnapshot.taken_at.desc())\
+        .first()
+
+    state = {}
+    since = None
+    if base is not None:
+        since = base.taken_at
+        state = {int(ingredient_id): [Decimal(qty), Decimal(avg_cost)]
+                 for ingredient_id, (qty, avg_cost) in json.loads(base.items).items()}
+
+    movements = _movements(since, moment)
+    for ingredient_id, change_type, qty, unit_cost in movements:
+        current = state.setdefault(ingredient_id, [Decimal('0'), Decimal('0')])
+        if change_type == 'purchase' and unit_cost is not None:
+            stock, avg_cost = current
+            if stock + qty > 0:
+                current[1] = ((stock * avg_cost + qty * unit_cost) / (stock + qty)).quantize(CENT)
+            else:
+                current[1] = Decimal(unit_cost).quantize(CENT)
+        current[0] += qty
+
+    return {ingredient_id: tuple(values) for ingredient_id, values in state.items()}, since, len(movements)
+
+
+def _movements(since, until):
+    """Mutasi (since, until] urut waktu dari inventory_logs (+ arsip bila perlu)."""
+    log_models = [InventoryLog]
+    boundary = archive.log_cutoff_datetime()
+    if boundary is not None and (since is None or since < boundary):
+        log_models.append(InventoryLogArchive)
+
+    timeline = []
+    for model in log_models:
+        logs = db.session.query(
+            model.created_at, model.id, model.ingredient_id, model.change_type, model.quantity_change, model.unit_cost
+        ).filter(model.created_at <= until)
+        if since is not None:
+            logs = logs.filter(model.created_at > since)
+        timeline.extend((created_at, row_id, ingredient_id, change_type, Decimal(qty),
+                         Decimal(unit_cost) if unit_cost is not None else None)
+                        for created_at, row_id, ingredient_id, change_type, qty, unit_cost in logs.all())
+    timeline.sort(key=lambda entry: entry[:2])
+    return [entry[2:] for entry in timeline]
@@ -0,0 +1,55 @@
+"""
+Benchmark replay tablet offline: N order dikirim satu per satu ke
+POST /sales/orders vs sekali kirim ke POST /sales/orders/batch.
+
+Cara pakai (dari root project):
+    python -m benchmarks.bench_batch_orders [jumlah_order]
+"""
+import sys
+import time
+from flask_jwt_extended import create_access_token
+from .common import make_app, seed_catalog, seed_cashier
+
+ORDERS = 300
+
+
+def build_orders(product_ids, count):
+    return [{
+        'client_ref': f"tablet-1-{i}",
+        'client_time': f"2026-01-01 12:{(i // 60) % 60:02d}:{i % 60:02d}",
+        'payment_method': 'cash',
+        'items': [{'product_id': product_ids[(i + k) % len(product_ids)], 'qty': 1} for k in range(3)]
+    } for i in range(count)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else ORDERS
+    app = make_app()
+    client = app.test_client()
+
+    with app.app_context():
+        product_ids = seed_catalog()
+        user, _ = seed_cashier()
+        token = create_access_token(identity=str(user.id), additional_claims={'role': 'cashier'})
+    headers = {'Authorization': f"Bearer {token}"}
+    orders = build_orders(product_ids, count)
+
+    start = time.perf_counter()
+    for order in orders:
+        response = client.post('/sales/orders', headers=headers, json=order)
+        assert response.status_code == 201, response.get_json()
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response = client.post('/sales/orders/batch', headers=headers, json={'orders': orders})
+    batch = time.perf_counter() - start
+    assert response.get_json()['success'] == count, response.get_json()['message']
+
+    print(f"orders={count}")
+    print(f"sequential: {sequential:.2f}s ({count / sequential:,.0f} order/detik)")
+    print(f"batch:      {batch:.2f}s ({count / batch:,.0f} order/detik)")
+    print(f"speedup:    {sequential / batch:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark overhead Idempotency-Key di POST /sales/orders:
+tanpa header vs kunci baru vs replay (cache memori & tabel).
+
+Cara pakai (dari root project):
+    python -m benchmarks.bench_idempotency
+"""
+import itertools
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.services.idempotency import idempotency_store
+from .common import make_app, seed_catalog, seed_cashier, QueryCounter, percentile, timer
+
+ROUNDS = 300
+
+key_seq = itertools.count(1)
+
+
+def main():
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        product_ids = seed_catalog()
+        user, _ = seed_cashier()
+        token = create_access_token(identity=str(user.id), additional_claims={'role': 'cashier'})
+        counter = QueryCounter(db.engine)
+
+    auth = {'Authorization': f'Bearer {token}'}
+    body = {'items': [{'product_id': product_ids[0], 'qty': 1}, {'product_id': product_ids[1], 'qty': 2}]}
+
+    def post(headers):
+        response = client.post('/sales/orders', json=body, headers=headers)
+        assert response.status_code == 201, response.get_data(as_text=True)
+
+    replay_key = {**auth, 'Idempotency-Key': 'bench-replay'}
+    post(replay_key)
+
+    def replay_from_table(headers):
+        idempotency_store._cache.clear()
+        post(headers)
+
+    scenarios = [
+        ('tanpa header', lambda: post(auth)),
+        ('kunci baru', lambda: post({**auth, 'Idempotency-Key': f'bench-{next(key_seq)}'})),
+        ('replay (memori)', lambda: post(replay_key)),
+        ('replay (tabel)', lambda: replay_from_table(replay_key)),
+    ]
+
+    print(f"{'skenario':>16} {'queries':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, run in scenarios:
+        with counter.track():
+            run()
+        queries = counter.count
+
+        samples = []
+        for _ in range(ROUNDS):
+            with timer(samples):
+                run()
+
+        print(f"{name:>16} {queries:>8} {percentile(samples, 50):>8.2f} {percentile(samples, 99):>8.2f}")
+
+    stats = idempotency_store.snapshot()
+    print(f"lookup rata-rata: {stats['lookup_ms'] / stats['lookups']:.3f} ms "
+          f"({stats['memory_hits']} hit memori, {stats['db_hits']} hit tabel dari {stats['lookups']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Uji multi-proses penomoran invoice: beberapa worker memesan nomor bersamaan
+pada database SQLite bersama, lalu dicek tidak ada nomor dobel.
+
+Cara pakai (dari root project):
+    python -m benchmarks.bench_invoice_allocator [jumlah_worker] [invoice_per_worker]
+"""
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+WORKERS = 4
+PER_WORKER = 5000
+
+
+def allocate(args):
+    db_url, count = args
+    os.environ['TEST_DATABASE_URL'] = db_url
+    from app import create_app
+    from app.services.invoice import invoice_allocator
+
+    app = create_app('testing')
+    app.config['INVOICE_IN_TRANSACTION'] = False # Uji jalur blok per worker
+    with app.app_context():
+        start = time.perf_counter()
+        numbers = [invoice_allocator.next_invoice() for _ in range(count)]
+        return numbers, time.perf_counter() - start
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else WORKERS
+    per_worker = int(sys.argv[2]) if len(sys.argv) > 2 else PER_WORKER
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = f"sqlite:///{os.path.join(tmp, 'invoice.db')}"
+        os.environ['TEST_DATABASE_URL'] = db_url
+        from app import create_app
+        from app.extensions import db
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+
+        with Pool(workers) as pool:
+            results = pool.map(allocate, [(db_url, per_worker)] * workers)
+
+    all_numbers = [n for numbers, _ in results for n in numbers]
+    duplicates = len(all_numbers) - len(set(all_numbers))
+    slowest = max(elapsed for _, elapsed in results)
+
+    print(f"workers={workers} invoices={len(all_numbers)} duplicates={duplicates}")
+    print(f"throughput={len(all_numbers) / slowest:,.0f} invoice/detik")
+    sys.exit(1 if duplicates else 0)
+
+
+if __name__ == '__main__':
+    main()
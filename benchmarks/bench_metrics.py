@@ -0,0 +1,49 @@
+"""
+Benchmark biaya instrumentasi per request (app.services.metrics):
+latensi request ringan (1 SELECT) dengan METRICS_ENABLED aktif vs nonaktif.
+
+Cara pakai (dari root project):
+    python -m benchmarks.bench_metrics [jumlah_request]
+"""
+import sys
+import tempfile
+from config import TestingConfig
+from app.models import Ingredient
+from .common import make_app, percentile, timer
+
+
+def run(enabled, count):
+    TestingConfig.METRICS_ENABLED = enabled
+    TestingConfig.METRICS_DIR = tempfile.mkdtemp(prefix='bench-metrics-')
+    app = make_app()
+
+    @app.route('/bench-ping')
+    def bench_ping():
+        return {'ingredients': Ingredient.query.count()}
+
+    client = app.test_client()
+    for _ in range(200):
+        client.get('/bench-ping')
+    samples = []
+    for _ in range(count):
+        with timer(samples):
+            client.get('/bench-ping')
+    return samples
+
+
+def main(count=5000):
+    results = {}
+    # Listener engine terpasang global setelah run aktif pertama, jadi semua run mati lebih dulu
+    for enabled in (False, False, True, True):
+        results.setdefault(enabled, []).extend(run(enabled, count))
+    print(f"{'metrik':>8} {'p50 (us)':>10} {'p90 (us)':>10} {'rata2 (us)':>11}")
+    for enabled in (False, True):
+        samples = results[enabled]
+        print(f"{'aktif' if enabled else 'mati':>8} {percentile(samples, 50) * 1000:>10.1f} "
+              f"{percentile(samples, 90) * 1000:>10.1f} {sum(samples) / len(samples) * 1000:>11.1f}")
+    overhead = (percentile(results[True], 50) - percentile(results[False], 50)) * 1000
+    print(f"Selisih p50 per request: {overhead:.1f} us")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,60 @@
+"""
+Benchmark engine posting order: jumlah query & latency p50/p99 vs ukuran keranjang.
+
+Cara pakai (dari root project):
+    python -m benchmarks.bench_order_posting
+"""
+import itertools
+from datetime import datetime
+from app.extensions import db
+from app.models import Order
+from app.services.order_posting import plan_order, apply_order_plan
+from .common import make_app, seed_catalog, seed_cashier, QueryCounter, percentile, timer
+
+CART_SIZES = [1, 3, 6, 12, 24]
+ROUNDS = 200
+
+invoice_seq = itertools.count(1)
+
+
+def post_once(user, session, product_ids, cart_size):
+    lines = [(product_ids[i % len(product_ids)], 1) for i in range(cart_size)]
+    plan = plan_order(lines)
+    order = Order(
+        invoice_no=f"BENCH-{next(invoice_seq)}",
+        user_id=user.id,
+        session_id=session.id,
+        payment_method='cash',
+        status='pending',
+        total_amount=plan.total_amount,
+        transaction_date=datetime.now()
+    )
+    db.session.add(order)
+    db.session.flush()
+    apply_order_plan(order, plan, user.id)
+    db.session.commit()
+
+
+def main():
+    app = make_app()
+    with app.app_context():
+        product_ids = seed_catalog()
+        user, session = seed_cashier()
+        counter = QueryCounter(db.engine)
+
+        print(f"{'cart':>5} {'queries':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for cart_size in CART_SIZES:
+            with counter.track():
+                post_once(user, session, product_ids, cart_size)
+            queries = counter.count
+
+            samples = []
+            for _ in range(ROUNDS):
+                with timer(samples):
+                    post_once(user, session, product_ids, cart_size)
+
+            print(f"{cart_size:>5} {queries:>8} {percentile(samples, 50):>8.2f} {percentile(samples, 99):>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark pencarian typeahead bahan & menu: ilike('%term%') (full scan)
+vs index n-gram in-process (app.services.search_index).
+
+Cara pakai (dari root project):
+    python -m benchmarks.bench_search [jumlah_bahan]
+"""
+import sys
+from sqlalchemy import insert
+from app.extensions import db
+from app.models import Ingredient
+from app.services.search_index import search_index
+from .common import make_app, percentile, timer
+
+ROUNDS = 200
+
+WORDS = ['tepung', 'terigu', 'gula', 'pasir', 'aren', 'minyak', 'goreng', 'susu', 'kental', 'manis',
+         'cokelat', 'bubuk', 'kopi', 'arabika', 'robusta', 'telur', 'ayam', 'bawang', 'merah', 'putih',
+         'cabe', 'rawit', 'kecap', 'saus', 'tomat', 'keju', 'mentega', 'garam', 'merica', 'jahe']
+
+# Ketikan bertahap di kotak pencarian + ejaan lama
+QUERIES = ['t', 'te', 'tep', 'tepu', 'tepung ter', 'gula ar', 'oklat', 'goela', 'minjak', 'djahe', 'telor']
+
+
+def main(count=20000):
+    app = make_app()
+    with app.app_context():
+        rows = [{'name': f"{WORDS[i % len(WORDS)]} {WORDS[(i * 7 + 3) % len(WORDS)]} {i}", 'unit': 'gr',
+                 'current_stock': 100, 'avg_cost': 10}
+                for i in range(count)]
+        db.session.execute(insert(Ingredient), rows)
+        db.session.commit()
+
+        samples = []
+        with timer(samples):
+            search_index.ingredients('x')
+        print(f"{count} bahan, bangun index: {samples[0]:.1f} ms")
+
+        print(f"{'query':>12} {'hasil':>6} {'ilike p50':>10} {'index p50':>10} {'index p99':>10}")
+        for term in QUERIES:
+            like_samples, index_samples = [], []
+            for _ in range(ROUNDS // 10):
+                with timer(like_samples):
+                    Ingredient.query.with_entities(Ingredient.id).filter(Ingredient.name.ilike(f"%{term}%")).all()
+            for _ in range(ROUNDS):
+                with timer(index_samples):
+                    hits = search_index.ingredients(term, limit=app.config['SEARCH_RESULT_LIMIT'])
+            print(f"{term:>12} {len(hits):>6} {percentile(like_samples, 50):>10.2f} "
+                  f"{percentile(index_samples, 50):>10.3f} {percentile(index_samples, 99):>10.3f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
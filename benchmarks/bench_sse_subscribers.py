@@ -0,0 +1,114 @@
+"""
+Load test stream SSE: ratusan subscriber idle per worker.
+Mengukur koneksi DB yang dipegang saat idle & latency fan-out event.
+
+Cara pakai (dari root project):
+    python -m benchmarks.bench_sse_subscribers [jumlah_subscriber]
+
+Jika gevent terpasang, server memakai gevent (1 greenlet per koneksi,
+seperti `gunicorn -k gevent`). Tanpa gevent dipakai server threaded werkzeug
+(1 thread per koneksi) hanya untuk memeriksa kebenaran fan-out.
+"""
+try:
+    from gevent import monkey
+    monkey.patch_all()
+    HAS_GEVENT = True
+except ImportError:
+    HAS_GEVENT = False
+
+import sys
+import socket
+import threading
+import time
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.services.events import broadcaster, make_stream_token
+from .common import make_app, seed_catalog, seed_cashier, percentile
+
+SUBSCRIBERS = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+EVENTS = 20
+PORT = 5055
+
+
+def serve(app):
+    if HAS_GEVENT:
+        from gevent.pywsgi import WSGIServer
+        server = WSGIServer(('127.0.0.1', PORT), app, log=None)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        from werkzeug.serving import make_server, WSGIRequestHandler
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        server = make_server('127.0.0.1', PORT, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+def subscriber(token, received, ready):
+    sock = socket.create_connection(('127.0.0.1', PORT))
+    sock.sendall(f"GET /events/stream?token={token} HTTP/1.1\r\nHost: x\r\nAccept: text/event-stream\r\n\r\n".encode())
+    buffer = b''
+    ready.release()
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            return
+        buffer += data
+        while b'\n\n' in buffer:
+            block, buffer = buffer.split(b'\n\n', 1)
+            for line in block.split(b'\n'):
+                if line.startswith(b'id: '):
+                    received.append((int(line[4:]), time.perf_counter()))
+
+
+def main():
+    app = make_app()
+    with app.app_context():
+        product_ids = seed_catalog(products=5, ingredients=20)
+        user, _ = seed_cashier()
+        token = create_access_token(identity=str(user.id), additional_claims={'role': 'cashier'})
+        stream_token = make_stream_token(app, user.id, 'cashier')
+    serve(app)
+
+    ready = threading.Semaphore(0)
+    inboxes = [[] for _ in range(SUBSCRIBERS)]
+    for inbox in inboxes:
+        threading.Thread(target=subscriber, args=(stream_token, inbox, ready), daemon=True).start()
+    for _ in range(SUBSCRIBERS):
+        ready.acquire()
+    while broadcaster.stats['subscribers'] < SUBSCRIBERS:
+        time.sleep(0.05)
+
+    with app.app_context():
+        idle_connections = db.engine.pool.checkedout()
+    print(f"server: {'gevent' if HAS_GEVENT else 'werkzeug threaded'}, subscriber: {broadcaster.stats['subscribers']}")
+    print(f"koneksi DB dipegang saat idle: {idle_connections}")
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    sent = {}
+    for i in range(EVENTS):
+        start = time.perf_counter()
+        client.post('/sales/orders', json={'items': [{'product_id': product_ids[i % 5], 'qty': 1}]}, headers=headers)
+        sent[i] = start
+        time.sleep(0.05)
+
+    deadline = time.monotonic() + 10
+    while min(len(inbox) for inbox in inboxes) < EVENTS and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+    latencies = []
+    first_id = min(inbox[0][0] for inbox in inboxes if inbox)
+    for inbox in inboxes:
+        for event_id, received_at in inbox:
+            latencies.append((received_at - sent[event_id - first_id]) * 1000)
+    complete = sum(1 for inbox in inboxes if len(inbox) >= EVENTS)
+    print(f"subscriber menerima semua {EVENTS} event: {complete}/{SUBSCRIBERS}")
+    print(f"latency fan-out p50 {percentile(latencies, 50):.1f} ms, p99 {percentile(latencies, 99):.1f} ms")
+    print(f"broadcaster: {broadcaster.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Cek anggaran query per endpoint (@query_budget) & deteksi N+1.
+
+Tiap skenario dijalankan di SQLite lokal dengan data dummy pada 2 skala
+(jumlah baris hasil kecil vs besar). Jumlah statement SQL dihitung per
+request pada jalur dingin (cache in-process dikosongkan dulu). Gagal jika:
+  - jumlah query > anggaran yang dideklarasikan di route, atau
+  - jumlah query di skala besar > skala kecil (tumbuh per baris = N+1), atau
+  - endpoint punya anggaran tapi belum punya skenario di sini.
+
+Cara pakai (dari root project, mis. sebelum deploy / di CI):
+    python -m benchmarks.check_query_budgets
+Exit code 1 jika ada yang gagal.
+"""
+import sys
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.models import User, Ingredient
+from app.services.bom_cache import bom_cache
+from app.services.receipt_cache import receipt_cache
+from app.services.kitchen_queue import kitchen_queue
+from app.services.search_index import search_index
+from app.services.response_cache import response_cache
+from app.services.cache_version import version_watcher
+from app.services import business_time
+from .common import make_app, seed_catalog, seed_cashier, QueryCounter
+
+SMALL = 5
+LARGE = 25
+
+# (endpoint, role, url) - url boleh berisi {receipt} / {product} / {today} dari data seed
+SCENARIOS = [
+    ('sales.get_receipt', 'cashier', '/sales/orders/{receipt}'),
+    ('sales.get_pending_orders', 'cashier', '/sales/orders/pending'),
+    ('sales.get_order_history', 'cashier', '/sales/orders/history'),
+    ('sales.get_menu_list', 'cashier', '/sales/menu'),
+    ('sales.get_menu_list', 'cashier', '/sales/menu?q=menu'),
+    ('sales.sales_dashboard', 'cashier', '/sales/dashboard'),
+    ('production.production_queue', 'kitchen', '/production/queue'),
+    ('production.kitchen_dashboard', 'kitchen', '/production/dashboard'),
+    ('production.get_stocks', 'kitchen', '/production/stocks'),
+    ('production.get_ingredient_list', 'kitchen', '/production/ingredients'),
+    ('production.get_low_stock', 'kitchen', '/production/low-stock'),
+    ('admin.get_product_recipe', 'admin', '/admin/recipes/{product}'),
+    ('admin.get_ingredients', 'admin', '/admin/ingredients'),
+    ('admin.get_products', 'admin', '/admin/products'),
+    ('admin.get_all_users', 'admin', '/admin/users'),
+    ('admin.admin_dashboard', 'admin', '/admin/dashboard'),
+    ('admin.report_sales', 'admin', '/admin/reports/sales'),
+    ('admin.report_sales', 'admin', '/admin/reports/sales?granularity=hour&start_date={today}&end_date={today}'),
+]
+
+
+def seed(app, client, rows):
+    """Data dummy yang tiap daftarnya berisi `rows` baris. Return (token per role, parameter url)."""
+    with app.app_context():
+        product_ids = seed_catalog(products=rows, ingredients=rows * 2, recipe_size=rows)
+        cashier, _ = seed_cashier()
+        admin = User(full_name='Admin', username='admin_budget', password='-', role='admin')
+        kitchen = User(full_name='Dapur', username='dapur_budget', password='-', role='kitchen')
+        db.session.add_all([admin, kitchen] + [
+            User(full_name=f'Kasir {i}', username=f'kasir_{i}', password='-', role='cashier') for i in range(rows)
+        ])
+        db.session.add_all([
+            Ingredient(name=f'Bahan Menipis {i}', unit='gr', current_stock=0, reorder_point=10, is_low=True)
+            for i in range(rows)
+        ])
+        db.session.commit()
+        tokens = {role: {'Authorization': 'Bearer ' + create_access_token(
+            identity=str(user.id), additional_claims={'role': role})}
+            for role, user in (('cashier', cashier), ('admin', admin), ('kitchen', kitchen))}
+
+    # 1 order lunas berisi `rows` menu (struk) + `rows` open bill (daftar pending, riwayat, antrian dapur)
+    response = client.post('/sales/orders', headers=tokens['cashier'], json={
+        'items': [{'product_id': product_id, 'qty': 1} for product_id in product_ids],
+        'payment_method': 'cash'
+    })
+    receipt = response.get_json()['invoice']
+    for product_id in product_ids:
+        client.post('/sales/orders', headers=tokens['cashier'], json={
+            'items': [{'product_id': product_id, 'qty': 2}], 'payment_method': 'pending'
+        })
+    with app.app_context():
+        today = business_time.today().isoformat()
+    return tokens, {'receipt': receipt, 'product': product_ids[0], 'today': today}
+
+
+def measure(rows):
+    """Jumlah query per skenario pada skala `rows`. Return (app, {index: (count, status_code)})."""
+    app = make_app()
+    client = app.test_client()
+    tokens, params = seed(app, client, rows)
+
+    counts = {}
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+    for index, (_, role, url) in enumerate(SCENARIOS):
+        # Jalur dingin: cache in-process kosong & versi cache dibaca ulang
+        for cache in (bom_cache, receipt_cache, kitchen_queue, search_index, response_cache):
+            cache.reset()
+        version_watcher.expire()
+        with counter.track():
+            response = client.get(url.format(**params), headers=tokens[role])
+        counts[index] = (counter.count, response.status_code)
+    return app, counts
+
+
+def main():
+    app, small = measure(SMALL)
+    _, large = measure(LARGE)
+    budgets = {endpoint: getattr(view, 'query_budget', None) for endpoint, view in app.view_functions.items()}
+
+    failures = []
+    print(f"{'endpoint':<34} {'url':<28} {'anggaran':>8} {SMALL:>5} {LARGE:>5}  status")
+    for index, (endpoint, _, url) in enumerate(SCENARIOS):
+        budget = budgets.get(endpoint)
+        (small_count, small_status), (large_count, large_status) = small[index], large[index]
+        problems = []
+        if small_status != 200 or large_status != 200:
+            problems.append(f'HTTP {small_status}/{large_status}')
+        if budget is None:
+            problems.append('tanpa @query_budget')
+        elif max(small_count, large_count) > budget:
+            problems.append('melebihi anggaran')
+        if large_count > small_count:
+            problems.append('tumbuh per baris (N+1)')
+        print(f"{endpoint:<34} {url:<28} {budget if budget is not None else '-':>8} "
+              f"{small_count:>5} {large_count:>5}  {', '.join(problems) or 'ok'}")
+        if problems:
+            failures.append(endpoint)
+
+    covered = {endpoint for endpoint, _, _ in SCENARIOS}
+    for endpoint in sorted(endpoint for endpoint, budget in budgets.items() if budget is not None):
+        if endpoint not in covered:
+            print(f"{endpoint:<34} {'-':<28} {budgets[endpoint]:>8} {'-':>5} {'-':>5}  tanpa skenario")
+            failures.append(endpoint)
+
+    if failures:
+        print(f"GAGAL: {len(failures)} endpoint.")
+        return 1
+    print('Semua endpoint dalam anggaran query.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import create_app
+from app.extensions import db
+from app.models import User, SalesSession, Ingredient, Product, Recipe
+from app.services.bom_cache import bom_cache
+from app.services.receipt_cache import receipt_cache
+from app.services.kitchen_queue import kitchen_queue
+from app.services.search_index import search_index
+from app.services.response_cache import response_cache
+
+# =====================================================
+# UTILITAS BENCHMARK (SQLite lokal, data dummy)
+# =====================================================
+
+def make_app():
+    app = create_app('testing')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    bom_cache.reset()
+    receipt_cache.reset()
+    kitchen_queue.reset()
+    search_index.reset()
+    response_cache.reset()
+    return app
+
+
+def seed_catalog(products=50, ingredients=200, recipe_size=4, stock=10 ** 6):
+    """Isi bahan, produk & resep dummy. Return list ID produk."""
+    ings = [Ingredient(name=f"Bahan {i}", unit='gr', current_stock=stock, avg_cost=10)
+            for i in range(ingredients)]
+    db.session.add_all(ings)
+    db.session.flush()
+
+    product_ids = []
+    for p in range(products):
+        prod = Product(name=f"Menu {p}", price=15000, category='Food', is_active=True)
+        db.session.add(prod)
+        db.session.flush()
+        for r in range(recipe_size):
+            ing = ings[(p * recipe_size + r) % ingredients]
+            db.session.add(Recipe(product_id=prod.id, ingredient_id=ing.id, quantity_needed=5))
+        product_ids.append(prod.id)
+    db.session.commit()
+    return product_ids
+
+
+def seed_cashier(username='kasir_bench'):
+    """Buat user kasir + shift aktif. Return (user, session)."""
+    user = User(full_name='Kasir Bench', username=username, password='-', role='cashier')
+    db.session.add(user)
+    db.session.flush()
+    session = SalesSession(user_id=user.id, start_cash=0)
+    db.session.add(session)
+    db.session.commit()
+    return user, session
+
+
+class QueryCounter:
+    """Hitung jumlah statement SQL yang dieksekusi engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    @contextmanager
+    def track(self):
+        self.count = 0
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        try:
+            yield self
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@contextmanager
+def timer(samples):
+    start = time.perf_counter()
+    yield
+    samples.append((time.perf_counter() - start) * 1000)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 from datetime import timedelta  # <--- WAJIB DITAMBAHKAN
 
@@ -22,6 +23,69 @@ class Config:
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Jumlah nomor invoice yang dipesan sekaligus oleh tiap worker
+    INVOICE_BLOCK_SIZE = int(os.getenv('INVOICE_BLOCK_SIZE', 20))
+    # None = otomatis (nomor diambil di transaksi request hanya untuk SQLite)
+    INVOICE_IN_TRANSACTION = None
+
+    # Batch order dari tablet offline: maksimal order per request & per commit
+    ORDER_BATCH_MAX = int(os.getenv('ORDER_BATCH_MAX', 500))
+    ORDER_BATCH_CHUNK = int(os.getenv('ORDER_BATCH_CHUNK', 50))
+
+    # Restock batch (1 kiriman supplier): maksimal baris per request
+    RESTOCK_BATCH_MAX = int(os.getenv('RESTOCK_BATCH_MAX', 500))
+
+    # Stock opname massal: maksimal baris per lembar hitung
+    OPNAME_MAX_LINES = int(os.getenv('OPNAME_MAX_LINES', 10000))
+
+    # UPDATE stok yang lebih lama dari ini (ms) dihitung sebagai 'menunggu lock'
+    STOCK_LOCK_WAIT_MS = float(os.getenv('STOCK_LOCK_WAIT_MS', 5))
+
+    # Interval (detik) tiap worker mengecek versi cache in-process (BOM, dll)
+    CACHE_VERSION_POLL_SECONDS = float(os.getenv('CACHE_VERSION_POLL_SECONDS', 1.0))
+    # Interval (detik) poll tsb sekalian membuang baris cache_invalidations lama (0 = hanya via CLI)
+    CACHE_VERSION_PRUNE_SECONDS = float(os.getenv('CACHE_VERSION_PRUNE_SECONDS', 60.0))
+
+    # Header Idempotency-Key: umur kunci (jam) & jumlah respons di cache memori
+    IDEMPOTENCY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_TTL_HOURS', 24))
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 10000))
+
+    # Pencarian bahan (?q=): maksimal hasil per query, urut relevansi
+    SEARCH_RESULT_LIMIT = int(os.getenv('SEARCH_RESULT_LIMIT', 50))
+
+    # Arsip (flask archive-orders): order & log lebih tua dari n hari pindah ke tabel *_archive
+    ARCHIVE_KEEP_DAYS = int(os.getenv('ARCHIVE_KEEP_DAYS', 90))
+
+    # Zona waktu: laporan & "hari ini" dihitung di BUSINESS_TIMEZONE; kolom waktu
+    # transaksi disimpan naive di STORAGE_TIMEZONE (kosong = zona jam server).
+    # Setelah mengubah salah satunya jalankan `flask rebuild-sales-rollup`.
+    BUSINESS_TIMEZONE = os.getenv('BUSINESS_TIMEZONE', 'Asia/Jakarta')
+    STORAGE_TIMEZONE = os.getenv('STORAGE_TIMEZONE')
+    # /admin/reports/sales?granularity=hour: rentang maksimal (hari)
+    REPORT_HOURLY_MAX_DAYS = int(os.getenv('REPORT_HOURLY_MAX_DAYS', 31))
+
+    # Cache respon GET bertag (@cached_response): 'memory' (LRU per worker),
+    # 'sqlite' (file lokal dipakai bersama semua worker di 1 host) atau 'off'
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 500))
+    RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH') # default <instance>/response_cache.db
+
+    # Jumlah struk (lunas/batal) yang disimpan di cache memori per worker
+    RECEIPT_CACHE_SIZE = int(os.getenv('RECEIPT_CACHE_SIZE', 2000))
+
+    # Stream SSE /events/stream: interval baca event baru, antrian per subscriber
+    # & umur stream token (detik) dari POST /events/token
+    EVENTS_POLL_SECONDS = float(os.getenv('EVENTS_POLL_SECONDS', 0.5))
+    EVENTS_SUBSCRIBER_QUEUE = int(os.getenv('EVENTS_SUBSCRIBER_QUEUE', 256))
+    EVENTS_TOKEN_SECONDS = int(os.getenv('EVENTS_TOKEN_SECONDS', 60))
+
+    # Metrik /admin/metrics: tiap worker menulis angkanya ke METRICS_DIR
+    # (default <instance>/metrics, kosongkan dengan `flask reset-metrics` saat deploy)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+    METRICS_DIR = os.getenv('METRICS_DIR')
+    METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 5.0))
+
+
 class DevelopmentConfig(Config):
     """Konfigurasi untuk saat kita coding (Development)"""
     DEBUG = True
@@ -33,9 +97,19 @@ class ProductionConfig(Config):
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
 
+class TestingConfig(Config):
+    """Konfigurasi untuk benchmark & pengecekan lokal (SQLite, tanpa MySQL)"""
+    TESTING = True
+    # File sementara (bukan :memory:) supaya koneksi terpisah tetap melihat DB yang sama
+    SQLALCHEMY_DATABASE_URI = os.getenv(
+        'TEST_DATABASE_URL',
+        f"sqlite:///{os.path.join(tempfile.gettempdir(), 'simproject_test.db')}"
+    )
+
 # Dictionary untuk mapping nama konfigurasi
 config_by_name = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""Orders payment_method + transaction_date index
+
+Revision ID: a6c3e8f15d92
+Revises: e2a7c4d10f58
+Create Date: 2026-10-17 16:20:14.502881
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c3e8f15d92'
+down_revision = 'e2a7c4d10f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_payment_date', ['payment_method', 'transaction_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_payment_date')
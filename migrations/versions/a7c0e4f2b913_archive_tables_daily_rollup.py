@@ -0,0 +1,175 @@
+"""Archive tables & daily sales rollup
+
+Revision ID: a7c0e4f2b913
+Revises: f5b9d6e3a027
+Create Date: 2026-10-17 20:48:10.218734
+
+"""
+from datetime import date
+from decimal import Decimal
+from alembic import op
+import sqlalchemy as sa
+from app.services import business_time
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c0e4f2b913'
+down_revision = 'f5b9d6e3a027'
+branch_labels = None
+depends_on = None
+
+orders = sa.table('orders',
+    sa.column('id', sa.Integer()),
+    sa.column('status', sa.String(20)),
+    sa.column('payment_method', sa.String(20)),
+    sa.column('total_amount', sa.Numeric(15, 2)),
+    sa.column('transaction_date', sa.DateTime())
+)
+order_items = sa.table('order_items',
+    sa.column('order_id', sa.Integer()),
+    sa.column('quantity', sa.Integer()),
+    sa.column('cogs_at_sale', sa.Numeric(15, 2))
+)
+daily_sales_rollup = sa.table('daily_sales_rollup',
+    sa.column('day', sa.Date()),
+    sa.column('payment_method', sa.String(20)),
+    sa.column('revenue', sa.Numeric(15, 2)),
+    sa.column('trx_count', sa.Integer()),
+    sa.column('cogs', sa.Numeric(15, 2)),
+    sa.column('void_count', sa.Integer()),
+    sa.column('void_amount', sa.Numeric(15, 2))
+)
+
+
+def _as_date(value):
+    # func.date() = date di MySQL, string 'YYYY-MM-DD' di SQLite
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def _backfill_rollup():
+    # Agregasi yang sama dengan services.sales_rollup.rebuild (hari bisnis WIB),
+    # agar dashboard & laporan tidak nol untuk hari sebelum deploy
+    connection = op.get_bind()
+    day = business_time.day_expression(orders.c.transaction_date, connection.dialect.name)
+    paid = sa.and_(orders.c.status != 'cancelled', orders.c.payment_method != 'pending')
+    cancelled = orders.c.status == 'cancelled'
+
+    totals = {}
+    for day_value, method, revenue, trx, voids, void_amount in connection.execute(
+        sa.select(
+            day, orders.c.payment_method,
+            sa.func.sum(sa.case((paid, orders.c.total_amount), else_=0)),
+            sa.func.sum(sa.case((paid, 1), else_=0)),
+            sa.func.sum(sa.case((cancelled, 1), else_=0)),
+            sa.func.sum(sa.case((cancelled, orders.c.total_amount), else_=0))
+        ).group_by(day, orders.c.payment_method)
+    ):
+        totals[(_as_date(day_value), method)] = {
+            'revenue': Decimal(revenue or 0), 'trx_count': int(trx or 0), 'cogs': Decimal('0'),
+            'void_count': int(voids or 0), 'void_amount': Decimal(void_amount or 0)
+        }
+
+    for day_value, method, cogs in connection.execute(
+        sa.select(day, orders.c.payment_method, sa.func.sum(order_items.c.quantity * order_items.c.cogs_at_sale))
+        .select_from(order_items.join(orders, orders.c.id == order_items.c.order_id))
+        .where(paid)
+        .group_by(day, orders.c.payment_method)
+    ):
+        totals[(_as_date(day_value), method)]['cogs'] = Decimal(cogs or 0)
+
+    rows = [{'day': day_value, 'payment_method': method, **values}
+            for (day_value, method), values in totals.items()
+            if values['trx_count'] or values['void_count']] # open bill saja = baris nol
+    if rows:
+        op.bulk_insert(daily_sales_rollup, rows)
+
+
+def upgrade():
+    op.create_table('daily_sales_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('payment_method', sa.String(length=20), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('trx_count', sa.Integer(), nullable=False),
+    sa.Column('cogs', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('void_count', sa.Integer(), nullable=False),
+    sa.Column('void_amount', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'payment_method')
+    )
+    _backfill_rollup()
+
+    op.create_table('archive_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cutoff', sa.Date(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('order_items', sa.Integer(), nullable=False),
+    sa.Column('inventory_logs', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archive_runs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archive_runs_cutoff'), ['cutoff'], unique=False)
+
+    op.create_table('orders_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('invoice_no', sa.String(length=50), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('total_amount', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('payment_method', sa.String(length=20), nullable=True),
+    sa.Column('customer_name', sa.String(length=100), nullable=True),
+    sa.Column('transaction_date', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    mysql_row_format='COMPRESSED'
+    )
+    with op.batch_alter_table('orders_archive', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_orders_archive_invoice_no'), ['invoice_no'], unique=False)
+        batch_op.create_index(batch_op.f('ix_orders_archive_transaction_date'), ['transaction_date'], unique=False)
+
+    op.create_table('order_items_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('price_at_sale', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('cogs_at_sale', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    mysql_row_format='COMPRESSED'
+    )
+    with op.batch_alter_table('order_items_archive', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_items_archive_order_id'), ['order_id'], unique=False)
+
+    op.create_table('inventory_logs_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('ingredient_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('change_type', sa.String(length=20), nullable=False),
+    sa.Column('quantity_change', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('unit_cost', sa.Numeric(precision=15, scale=4), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    mysql_row_format='COMPRESSED'
+    )
+    with op.batch_alter_table('inventory_logs_archive', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_inventory_logs_archive_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('inventory_logs_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_inventory_logs_archive_created_at'))
+
+    op.drop_table('inventory_logs_archive')
+    with op.batch_alter_table('order_items_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_items_archive_order_id'))
+
+    op.drop_table('order_items_archive')
+    with op.batch_alter_table('orders_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_orders_archive_transaction_date'))
+        batch_op.drop_index(batch_op.f('ix_orders_archive_invoice_no'))
+
+    op.drop_table('orders_archive')
+    with op.batch_alter_table('archive_runs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archive_runs_cutoff'))
+
+    op.drop_table('archive_runs')
+    op.drop_table('daily_sales_rollup')
@@ -0,0 +1,28 @@
+"""Invoice sequences
+
+Revision ID: b3c71e0f2a94
+Revises: a1a4ddd52296
+Create Date: 2026-10-17 12:40:11.203118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3c71e0f2a94'
+down_revision = 'a1a4ddd52296'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('invoice_sequences',
+    sa.Column('day', sa.String(length=8), nullable=False),
+    sa.Column('next_value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+
+
+def downgrade():
+    op.drop_table('invoice_sequences')
@@ -0,0 +1,32 @@
+"""Orders history indexes
+
+Revision ID: b7d4f9a26e03
+Revises: a6c3e8f15d92
+Create Date: 2026-10-17 16:52:37.881406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d4f9a26e03'
+down_revision = 'a6c3e8f15d92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_transaction_date', ['transaction_date'], unique=False)
+        batch_op.create_index('ix_orders_status_date', ['status', 'transaction_date'], unique=False)
+        batch_op.create_index('ix_orders_session_date', ['session_id', 'transaction_date'], unique=False)
+        batch_op.create_index('ix_orders_user_date', ['user_id', 'transaction_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_user_date')
+        batch_op.drop_index('ix_orders_session_date')
+        batch_op.drop_index('ix_orders_status_date')
+        batch_op.drop_index('ix_orders_transaction_date')
@@ -0,0 +1,26 @@
+"""Idempotency keys request hash
+
+Revision ID: c4e9a1d7b2f3
+Revises: a7c0e4f2b913
+Create Date: 2026-10-17 23:05:41.208316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e9a1d7b2f3'
+down_revision = 'a7c0e4f2b913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('request_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.drop_column('request_hash')
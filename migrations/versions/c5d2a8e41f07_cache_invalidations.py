@@ -0,0 +1,34 @@
+"""Cache invalidations
+
+Revision ID: c5d2a8e41f07
+Revises: b3c71e0f2a94
+Create Date: 2026-10-17 13:05:42.518290
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d2a8e41f07'
+down_revision = 'b3c71e0f2a94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cache_invalidations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('cache_invalidations', schema=None) as batch_op:
+        batch_op.create_index('ix_cache_invalidations_name_id', ['name', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('cache_invalidations', schema=None) as batch_op:
+        batch_op.drop_index('ix_cache_invalidations_name_id')
+
+    op.drop_table('cache_invalidations')
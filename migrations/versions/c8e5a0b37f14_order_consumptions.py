@@ -0,0 +1,28 @@
+"""Order consumptions
+
+Revision ID: c8e5a0b37f14
+Revises: b7d4f9a26e03
+Create Date: 2026-10-17 17:31:55.640129
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e5a0b37f14'
+down_revision = 'b7d4f9a26e03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('order_consumptions',
+    sa.Column('order_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('movements', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('order_id')
+    )
+
+
+def downgrade():
+    op.drop_table('order_consumptions')
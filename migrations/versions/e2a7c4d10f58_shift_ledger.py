@@ -0,0 +1,52 @@
+"""Shift ledger
+
+Revision ID: e2a7c4d10f58
+Revises: d8e4f1a92b36
+Create Date: 2026-10-17 15:02:47.118624
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c4d10f58'
+down_revision = 'd8e4f1a92b36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('shift_ledger',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('payment_method', sa.String(length=20), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('entry_type', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['sales_sessions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('shift_ledger', schema=None) as batch_op:
+        batch_op.create_index('ix_shift_ledger_session_method', ['session_id', 'payment_method'], unique=False)
+
+    # Shift yang masih buka: bawa total berjalan lama sebagai 1 baris 'legacy'
+    op.execute(
+        "INSERT INTO shift_ledger (session_id, order_id, payment_method, amount, entry_type, created_at) "
+        "SELECT id, NULL, 'legacy', total_system, 'legacy', CURRENT_TIMESTAMP FROM sales_sessions "
+        "WHERE end_time IS NULL AND total_system IS NOT NULL AND total_system <> 0"
+    )
+
+
+def downgrade():
+    # Kembalikan total berjalan shift yang masih buka ke kolom lama
+    op.execute(
+        "UPDATE sales_sessions SET total_system = "
+        "(SELECT COALESCE(SUM(amount), 0) FROM shift_ledger WHERE shift_ledger.session_id = sales_sessions.id) "
+        "WHERE end_time IS NULL"
+    )
+    with op.batch_alter_table('shift_ledger', schema=None) as batch_op:
+        batch_op.drop_index('ix_shift_ledger_session_method')
+
+    op.drop_table('shift_ledger')
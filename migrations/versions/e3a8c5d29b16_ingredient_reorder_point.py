@@ -0,0 +1,35 @@
+"""Ingredient reorder point & is_low
+
+Revision ID: e3a8c5d29b16
+Revises: d9f6b1c48a25
+Create Date: 2026-10-17 19:26:48.305512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a8c5d29b16'
+down_revision = 'd9f6b1c48a25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ingredients', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('reorder_point', sa.Numeric(precision=10, scale=2), server_default='5', nullable=True))
+        batch_op.add_column(sa.Column('is_low', sa.Boolean(), server_default=sa.false(), nullable=False))
+        batch_op.create_index(batch_op.f('ix_ingredients_is_low'), ['is_low'], unique=False)
+
+    # Batas lama (hard-code < 5) jadi nilai awal reorder_point semua bahan
+    op.execute(
+        "UPDATE ingredients SET is_low = CASE WHEN COALESCE(current_stock, 0) < reorder_point THEN 1 ELSE 0 END"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('ingredients', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ingredients_is_low'))
+        batch_op.drop_column('is_low')
+        batch_op.drop_column('reorder_point')
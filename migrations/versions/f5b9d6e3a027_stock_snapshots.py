@@ -0,0 +1,42 @@
+"""Stock snapshots & inventory log unit cost
+
+Revision ID: f5b9d6e3a027
+Revises: e3a8c5d29b16
+Create Date: 2026-10-17 20:12:31.604417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5b9d6e3a027'
+down_revision = 'e3a8c5d29b16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stock_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.Column('items', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stock_snapshots', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stock_snapshots_taken_at'), ['taken_at'], unique=False)
+
+    with op.batch_alter_table('inventory_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unit_cost', sa.Numeric(precision=15, scale=4), nullable=True))
+        batch_op.create_index(batch_op.f('ix_inventory_logs_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('inventory_logs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_inventory_logs_created_at'))
+        batch_op.drop_column('unit_cost')
+
+    with op.batch_alter_table('stock_snapshots', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stock_snapshots_taken_at'))
+
+    op.drop_table('stock_snapshots')